@@ -0,0 +1,159 @@
+"""
+Проверка согласованности кешей между процессами приложения через PostgreSQL LISTEN/NOTIFY.
+
+Запускаются два отдельных процесса uvicorn на разных портах с одной и той же БД из настроек model.config.
+Внимание: таблицы в этой БД пересоздаются, запускать только на отдельной базе для тестов.
+Проверяется, что после изменения сменного задания в первом процессе второй процесс
+перестает отдавать закешированный ответ, что смена пары НомерПартии и ДатаПартии видна индексу партий
+второго процесса, что аггрегация кода видна индексу кодов второго процесса, и что после перезапуска
+соединения слушателя кеши очищаются. Результат - JSON с задержкой доставки событий:
+
+    python -m benchmark.cache_coherence_check --first-port 8101 --second-port 8102
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import asyncpg
+import httpx
+
+from benchmark.load_test import make_shift_task
+from model import settings
+from model.insert_data_db import CreateTablesDataBase
+
+
+def start_worker(port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "CACHE_INVALIDATION_HEALTH_CHECK_INTERVAL": "1", "CACHE_INVALIDATION_RECONNECT_DELAY": "0.1"},
+    )
+
+
+async def wait_started(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            response = await client.get("/cache/stats")
+            if response.json()["cache_invalidation_listener"]["connected"]:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{client.base_url} не запустился за {timeout} секунд")
+        await asyncio.sleep(0.2)
+
+
+async def wait_for(check, timeout: float = 5.0) -> float:
+    """
+    Функция повторяет асинхронную проверку, пока она не вернет True
+    :param check: функция без аргументов, возвращающая корутину с bool
+    :param timeout: сколько секунд ждать
+    :return: сколько миллисекунд прошло до успешной проверки
+    """
+    started_at = time.perf_counter()
+    while not await check():
+        if time.perf_counter() - started_at > timeout:
+            raise AssertionError(f"Условие не выполнилось за {timeout} секунд")
+        await asyncio.sleep(0.005)
+    return round((time.perf_counter() - started_at) * 1000, 2)
+
+
+async def run_check(first: httpx.AsyncClient, second: httpx.AsyncClient) -> dict:
+    rng = random.Random(0)
+    party_data = datetime.date(2024, 1, 1)
+
+    response = await first.post("/shift_task", content=json.dumps([make_shift_task(1, party_data, rng)]))
+    response.raise_for_status()
+    #  таблицы пересозданы, id первого сменного задания - 1
+    shift_task_id = 1
+    response = await first.post("/unique_product_identifiers", content=json.dumps([
+        {"УникальныйКодПродукта": "coherence-code", "НомерПартии": 1, "ДатаПартии": party_data.isoformat()},
+    ]))
+    response.raise_for_status()
+
+    #  второй процесс кеширует ответ и код в своих индексах
+    etag = (await second.get(f"/shift_task/{shift_task_id}")).headers["ETag"]
+    await second.get(f"/shift_task/{shift_task_id}/verify", params={"unique_product_code": "coherence-code"})
+    assert (await second.get(f"/shift_task/{shift_task_id}")).headers["ETag"] == etag
+
+    results = {}
+    response = await first.put(f"/shift_task/{shift_task_id}", json={"team": "Бригада coherence"})
+    response.raise_for_status()
+
+    async def second_sees_update():
+        return (await second.get(f"/shift_task/{shift_task_id}")).headers["ETag"] != etag
+
+    results["shift_task_cache_ms"] = await wait_for(second_sees_update)
+
+    etag = (await second.get(f"/shift_task/{shift_task_id}")).headers["ETag"]
+    response = await first.put(f"/shift_task/{shift_task_id}", json={"party_number": 2})
+    response.raise_for_status()
+    #  смена пары приходит тем же событием, что и инвалидация ответа
+    results["batch_key_resolver_ms"] = await wait_for(second_sees_update)
+    response = await second.post("/unique_product_identifiers", content=json.dumps([
+        {"УникальныйКодПродукта": "coherence-old-key", "НомерПартии": 1, "ДатаПартии": party_data.isoformat()},
+    ]))
+    assert response.json()["inserted"] == 0, "второй процесс записал код в партию по устаревшей паре"
+
+    response = await first.post(f"/shift_task/{shift_task_id}/aggregate", json={"unique_product_code": "coherence-code"})
+    response.raise_for_status()
+
+    async def second_sees_aggregation():
+        response = await second.get(
+            f"/shift_task/{shift_task_id}/verify",
+            params={"unique_product_code": "coherence-code"},
+        )
+        return response.json()["is_aggregated"]
+
+    results["verification_index_ms"] = await wait_for(second_sees_aggregation)
+
+    #  обрыв соединений слушателей на стороне БД, после переподключения кеши очищаются
+    flushes = (await second.get("/cache/stats")).json()["cache_invalidation_listener"]["flushes"]
+    connection = await asyncpg.connect(dsn=settings.data_base_dsn)
+    try:
+        await connection.execute(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE application_name = $1",
+            "cache_invalidation_listener",
+        )
+    finally:
+        await connection.close()
+
+    async def second_flushed():
+        stats = (await second.get("/cache/stats")).json()["cache_invalidation_listener"]
+        return stats["flushes"] > flushes and stats["connected"]
+
+    results["reconnect_flush_ms"] = await wait_for(second_flushed, timeout=10.0)
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    await CreateTablesDataBase.create_tables()
+    workers = [start_worker(args.first_port), start_worker(args.second_port)]
+    try:
+        async with (
+            httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.first_port}") as first,
+            httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.second_port}") as second,
+        ):
+            await wait_started(first)
+            await wait_started(second)
+            results = await run_check(first, second)
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-port", type=int, default=8101)
+    parser.add_argument("--second-port", type=int, default=8102)
+    asyncio.run(main(parser.parse_args()))
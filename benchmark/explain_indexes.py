@@ -0,0 +1,92 @@
+"""
+Сравнение планов запросов до и после индексов из migrations/versions/0002_performance_indexes.py.
+
+Для каждого частого запроса DAO выполняется EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) в транзакции,
+которая откатывается, и печатается JSON с типами узлов плана, временем выполнения и прочитанными буферами.
+Порядок работы на большом наборе данных (например 10M кодов, см. генератор синтетических данных):
+
+    alembic downgrade 0001 && python -m benchmark.explain_indexes > before.json
+    alembic upgrade head && python -m benchmark.explain_indexes > after.json
+    diff before.json after.json
+"""
+import asyncio
+import datetime
+import json
+
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects import postgresql
+
+from dao import DaoShiftTaskRepository, DaoUniqueProductIdentifiersRepository
+from model import db_helper, ShiftTask, UniqueProductIdentifiers
+
+
+def collect_node_types(plan: dict) -> list[str]:
+    node_types = [f"{plan['Node Type']}{' on ' + plan['Index Name'] if 'Index Name' in plan else ''}"]
+    for child in plan.get("Plans", []):
+        node_types.extend(collect_node_types(child))
+    return node_types
+
+
+async def explain(connection, stmt) -> dict:
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    result = await connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"))
+    plan = result.scalar()[0]
+    return {
+        "nodes": collect_node_types(plan["Plan"]),
+        "execution_time_ms": plan["Execution Time"],
+        "shared_hit_blocks": plan["Plan"].get("Shared Hit Blocks"),
+        "shared_read_blocks": plan["Plan"].get("Shared Read Blocks"),
+    }
+
+
+async def main():
+    async with db_helper.engine.connect() as connection:
+        await connection.begin()
+        sample = (await connection.execute(
+            select(ShiftTask.id, ShiftTask.team, ShiftTask.date_time_shift_start).order_by(ShiftTask.id.desc()).limit(1)
+        )).one()
+        code = (await connection.execute(
+            select(UniqueProductIdentifiers.unique_product_code).where(
+                UniqueProductIdentifiers.shift_task_id == sample.id
+            ).limit(1)
+        )).scalar() or ""
+
+        queries = {
+            "list_by_team": DaoShiftTaskRepository.build_several_params_query(
+                several_params={"team": sample.team}, limit=10,
+            ),
+            "list_by_closing_status_keyset": DaoShiftTaskRepository.build_several_params_query(
+                several_params={"closing_status": False}, limit=10, after_id=sample.id // 2,
+            ),
+            "list_by_shift_start": DaoShiftTaskRepository.build_several_params_query(
+                several_params={"date_time_shift_start": sample.date_time_shift_start}, limit=10,
+            ),
+            "export_codes_of_task": DaoUniqueProductIdentifiersRepository.build_export_query(
+                several_params={"party_data": datetime.date.today()},
+            ),
+            "codes_of_task": select(UniqueProductIdentifiers).where(
+                UniqueProductIdentifiers.shift_task_id == sample.id
+            ),
+            "not_aggregated_codes_of_task": select(UniqueProductIdentifiers).where(
+                UniqueProductIdentifiers.shift_task_id == sample.id,
+                UniqueProductIdentifiers.is_aggregated.is_(False),
+            ),
+            "aggregate_code": update(UniqueProductIdentifiers).where(
+                UniqueProductIdentifiers.unique_product_code == code,
+                UniqueProductIdentifiers.shift_task_id == sample.id,
+                UniqueProductIdentifiers.is_aggregated.is_(False),
+            ).values(is_aggregated=True, aggregated_at=datetime.datetime.now()),
+        }
+
+        results = {}
+        for name, stmt in queries.items():
+            results[name] = await explain(connection, stmt)
+        #  EXPLAIN ANALYZE выполняет UPDATE на самом деле, поэтому транзакция откатывается
+        await connection.rollback()
+
+    await db_helper.engine.dispose()
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,227 @@
+"""
+Нагрузочный тест всех эндпойнтов приложения из main.py.
+
+Приложение запускается в этом же процессе через httpx.ASGITransport (вместе с lifespan),
+БД - локальный PostgreSQL из настроек model.config. Внимание: таблицы в этой БД пересоздаются,
+запускать только на отдельной базе для тестов. Перед тестом БД наполняется данными
+в заданном масштабе, генерация детерминирована от --seed.
+Результат - JSON с пропускной способностью и задержками p50/p95/p99 по каждому эндпойнту,
+который удобно сравнивать между коммитами:
+
+    python -m benchmark.load_test --tasks 10000 --codes-per-task 100 --requests 2000 --output before.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import subprocess
+import time
+
+import httpx
+
+from main import app
+from model.insert_data_db import CreateTablesDataBase
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def make_shift_task(party_number: int, party_data: datetime.date, rng: random.Random) -> dict:
+    shift_start = datetime.datetime.combine(party_data, datetime.time(rng.choice((8, 20))))
+    return {
+        "СтатусЗакрытия": rng.random() < 0.3,
+        "ПредставлениеЗаданияНаСмену": f"Задание на смену {party_number}",
+        "Линия": f"Т{rng.randint(1, 10)}",
+        "Смена": str(rng.randint(1, 3)),
+        "Бригада": f"Бригада №{rng.randint(1, 50)}",
+        "НомерПартии": party_number,
+        "ДатаПартии": party_data.isoformat(),
+        "Номенклатура": f"Номенклатура {rng.randint(1, 200)}",
+        "КодЕКН": str(rng.randint(100000, 999999)),
+        "ИдентификаторРЦ": rng.choice("ABCDEF"),
+        "ДатаВремяНачалаСмены": shift_start.isoformat(),
+        "ДатаВремяОкончанияСмены": (shift_start + datetime.timedelta(hours=12)).isoformat(),
+    }
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.start_date = datetime.date(2024, 1, 1)
+        self.shift_task_ids: list[int] = []
+        self.next_party_number = 0
+        self.next_code = 0
+
+    def new_party_keys(self, count: int) -> list[tuple[int, datetime.date]]:
+        keys = []
+        for _ in range(count):
+            keys.append((self.next_party_number, self.start_date + datetime.timedelta(days=self.next_party_number % 365)))
+            self.next_party_number += 1
+        return keys
+
+    def new_codes(self, party_key: tuple[int, datetime.date], count: int) -> list[dict]:
+        codes = []
+        for _ in range(count):
+            codes.append({
+                "УникальныйКодПродукта": f"code-{self.next_code:012d}",
+                "НомерПартии": party_key[0],
+                "ДатаПартии": party_key[1].isoformat(),
+            })
+            self.next_code += 1
+        return codes
+
+    async def seed(self):
+        await CreateTablesDataBase.create_tables()
+
+        party_keys = self.new_party_keys(self.args.tasks)
+        for start in range(0, len(party_keys), 1000):
+            chunk = [make_shift_task(number, data, self.rng) for number, data in party_keys[start:start + 1000]]
+            response = await self.client.post("/shift_task", content=json.dumps(chunk))
+            response.raise_for_status()
+
+        for start in range(0, len(party_keys), 100):
+            codes = []
+            for party_key in party_keys[start:start + 100]:
+                codes.extend(self.new_codes(party_key, self.args.codes_per_task))
+            response = await self.client.post("/unique_product_identifiers", content=json.dumps(codes))
+            response.raise_for_status()
+
+        #  id сменных заданий выдаются последовательно с 1
+        self.shift_task_ids = list(range(1, self.args.tasks + 1))
+        self.aggregation_codes = [
+            (shift_task_id, f"code-{(shift_task_id - 1) * self.args.codes_per_task + index:012d}")
+            for shift_task_id in self.shift_task_ids
+            for index in range(self.args.codes_per_task)
+        ]
+        self.rng.shuffle(self.aggregation_codes)
+
+    def scenarios(self) -> dict:
+        def get_by_id():
+            return self.client.get(f"/shift_task/{self.rng.choice(self.shift_task_ids)}")
+
+        def filtered_list():
+            params = {"team": f"Бригада №{self.rng.randint(1, 50)}", "limit": 50}
+            if self.rng.random() < 0.5:
+                params["after_id"] = self.rng.choice(self.shift_task_ids)
+            return self.client.get("/shift_task", params=params)
+
+        def bulk_upsert():
+            #  половина партий новые, половина перезаписывает существующие
+            party_keys = self.new_party_keys(self.args.batch_size // 2)
+            party_keys += [
+                (number - 1, self.start_date + datetime.timedelta(days=(number - 1) % 365))
+                for number in self.rng.sample(self.shift_task_ids, self.args.batch_size // 2)
+            ]
+            tasks = [make_shift_task(number, data, self.rng) for number, data in party_keys]
+            return self.client.post("/shift_task", content=json.dumps(tasks))
+
+        def code_ingestion():
+            party_number = self.rng.randrange(self.args.tasks)
+            party_key = (party_number, self.start_date + datetime.timedelta(days=party_number % 365))
+            return self.client.post(
+                "/unique_product_identifiers",
+                content=json.dumps(self.new_codes(party_key, self.args.batch_size)),
+            )
+
+        def aggregation():
+            shift_task_id, code = self.aggregation_codes.pop()
+            return self.client.post(
+                f"/shift_task/{shift_task_id}/aggregate",
+                json={"unique_product_code": code},
+            )
+
+        return {
+            "get_by_id": get_by_id,
+            "filtered_list": filtered_list,
+            "bulk_upsert": bulk_upsert,
+            "code_ingestion": code_ingestion,
+            "aggregation": aggregation,
+        }
+
+    async def run_scenario(self, make_request, requests: int) -> dict:
+        latencies = []
+        errors = 0
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started_at = time.perf_counter()
+                response = await make_request()
+                latencies.append(time.perf_counter() - started_at)
+                if response.status_code >= 400:
+                    errors += 1
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        elapsed = time.perf_counter() - started_at
+
+        latencies.sort()
+        return {
+            "requests": requests,
+            "errors": errors,
+            "throughput_rps": round(requests / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1000, help="количество сменных заданий в БД")
+    parser.add_argument("--codes-per-task", type=int, default=50, help="количество кодов продукции на задание")
+    parser.add_argument("--requests", type=int, default=1000, help="количество запросов на эндпойнт")
+    parser.add_argument("--concurrency", type=int, default=16, help="количество одновременных клиентов")
+    parser.add_argument("--batch-size", type=int, default=500, help="размер пачки для bulk эндпойнтов")
+    parser.add_argument("--scenarios", nargs="*", help="запускать только эти сценарии")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="файл для JSON отчета, по умолчанию stdout")
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+        load_test = LoadTest(client=client, args=args)
+        await load_test.seed()
+
+        #  lifespan запускается после наполнения БД, чтобы прогрев шел по уже созданным таблицам
+        async with app.router.lifespan_context(app):
+            results = {}
+            for name, make_request in load_test.scenarios().items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                requests = args.requests
+                if name == "aggregation":
+                    requests = min(requests, len(load_test.aggregation_codes))
+                results[name] = await load_test.run_scenario(make_request, requests)
+
+    report = {
+        "revision": git_revision(),
+        "parameters": vars(args),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
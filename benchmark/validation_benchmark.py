@@ -0,0 +1,98 @@
+"""
+Микробенчмарк проверки тела POST /shift_task.
+Сравнивает ручной разбор каждого поля (как было в add_shift_task) с проверкой всей пачки
+через закешированный TypeAdapter(list[ShiftTaskCreateDTO]).validate_json, который сразу возвращает словари,
+и отбрасывание часового пояса, как в DaoShiftTaskRepository.bulk_upsert_shift_tasks.
+
+Запуск: python -m benchmark.validation_benchmark --items 10000 --repeat 5
+"""
+import argparse
+import datetime
+import json
+import time
+
+from dto import shift_task_create_list_adapter
+
+
+def make_payload(items: int) -> bytes:
+    task_list = [
+        {
+            "СтатусЗакрытия": index % 2 == 0,
+            "ПредставлениеЗаданияНаСмену": f"Задание на смену {index}",
+            "Линия": "Т2",
+            "Смена": "1",
+            "Бригада": "Бригада №4",
+            "НомерПартии": index,
+            "ДатаПартии": "2024-01-30",
+            "Номенклатура": "Какая то номенклатура",
+            "КодЕКН": "456678",
+            "ИдентификаторРЦ": "A",
+            "ДатаВремяНачалаСмены": "2024-01-30T20:00:00+05:00",
+            "ДатаВремяОкончанияСмены": "2024-01-31T08:00:00+05:00",
+        }
+        for index in range(items)
+    ]
+    return json.dumps(task_list, ensure_ascii=False).encode()
+
+
+def manual_parse(body: bytes) -> list[dict]:
+    return [
+        {
+            "closing_status": task["СтатусЗакрытия"],
+            "view_task_to_shift": task["ПредставлениеЗаданияНаСмену"],
+            "line": task["Линия"],
+            "shift": task["Смена"],
+            "team": task["Бригада"],
+            "party_number": task["НомерПартии"],
+            "party_data": datetime.datetime.strptime(task["ДатаПартии"], "%Y-%m-%d").date(),
+            "nomenclature": task["Номенклатура"],
+            "code_ekn": task["КодЕКН"],
+            "id_of_the_rc": task["ИдентификаторРЦ"],
+            "date_time_shift_start": datetime.datetime.fromisoformat(
+                task["ДатаВремяНачалаСмены"]).replace(tzinfo=None),
+            "date_time_shift_end": datetime.datetime.fromisoformat(
+                task["ДатаВремяОкончанияСмены"]).replace(tzinfo=None),
+        }
+        for task in json.loads(body)
+    ]
+
+
+def type_adapter_parse(body: bytes) -> list[dict]:
+    return [
+        {
+            **task,
+            "date_time_shift_start": task["date_time_shift_start"].replace(tzinfo=None),
+            "date_time_shift_end": task["date_time_shift_end"].replace(tzinfo=None),
+        }
+        for task in shift_task_create_list_adapter.validate_json(body)
+    ]
+
+
+def measure(parse, body: bytes, items: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        parse(body)
+        best = min(best, time.perf_counter() - started_at)
+    return items / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = make_payload(args.items)
+    assert manual_parse(body) == type_adapter_parse(body)
+
+    results = {
+        "items": args.items,
+        "manual_items_per_second": round(measure(manual_parse, body, args.items, args.repeat)),
+        "type_adapter_items_per_second": round(measure(type_adapter_parse, body, args.items, args.repeat)),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
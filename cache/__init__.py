@@ -0,0 +1,24 @@
+__all__ = (
+    "BatchKeyResolver",
+    "batch_key_resolver",
+    "CacheInvalidationListener",
+    "cache_invalidation_listener",
+    "CacheInvalidationPublisher",
+    "cache_invalidation_publisher",
+    "ShiftTaskCache",
+    "shift_task_cache",
+    "VerificationIndex",
+    "verification_index",
+)
+
+
+from cache.batch_key_resolver import BatchKeyResolver
+from cache.batch_key_resolver import batch_key_resolver
+from cache.cache_invalidation_listener import CacheInvalidationListener
+from cache.cache_invalidation_listener import cache_invalidation_listener
+from cache.cache_invalidation_publisher import CacheInvalidationPublisher
+from cache.cache_invalidation_publisher import cache_invalidation_publisher
+from cache.shift_task_cache import ShiftTaskCache
+from cache.shift_task_cache import shift_task_cache
+from cache.verification_index import VerificationIndex
+from cache.verification_index import verification_index
@@ -0,0 +1,121 @@
+import datetime
+import time
+from collections import OrderedDict
+
+from model.config import settings
+
+
+class BatchKeyResolver:
+    """
+    Индекс в памяти для перевода пары (НомерПартии, ДатаПартии) в id сменного задания.
+    Заполняется при старте приложения, дополняется при создании партий,
+    несуществующие партии запоминаются на negative_ttl секунд, чтобы не ходить за ними в БД повторно.
+    Несуществующих партий хранится не больше negative_size, при переполнении вытесняются давно запомненные
+    """
+
+    def __init__(self, negative_ttl: float, negative_size: int):
+        """
+        :param negative_ttl: время в секундах, в течение которого партия считается несуществующей без запроса в БД
+        :param negative_size: максимальное количество запомненных несуществующих партий
+        """
+        self.negative_ttl = negative_ttl
+        self.negative_size = negative_size
+        self._ids: dict[tuple[int, datetime.date], int] = {}
+        self._missing: OrderedDict[tuple[int, datetime.date], float] = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def lookup_many(
+        self,
+        party_keys: set[tuple[int, datetime.date]],
+    ) -> tuple[dict[tuple[int, datetime.date], int], set[tuple[int, datetime.date]]]:
+        """
+        Метод ищет id сменных заданий в индексе без обращения к БД
+        :param party_keys: множество пар (НомерПартии, ДатаПартии)
+        :return: словарь найденных {(НомерПартии, ДатаПартии): id} и множество пар, которые нужно искать в БД
+        """
+        found = {}
+        unresolved = set()
+        now = time.monotonic()
+
+        for party_key in party_keys:
+            shift_task_id = self._ids.get(party_key)
+            if shift_task_id is not None:
+                found[party_key] = shift_task_id
+                self.hits += 1
+                continue
+
+            missing_until = self._missing.get(party_key)
+            if missing_until is not None:
+                if missing_until > now:
+                    self.negative_hits += 1
+                    continue
+                del self._missing[party_key]
+
+            unresolved.add(party_key)
+            self.misses += 1
+
+        return found, unresolved
+
+    def remember(self, party_key: tuple[int, datetime.date], shift_task_id: int) -> None:
+        """
+        Метод добавляет партию в индекс
+        :param party_key: пара (НомерПартии, ДатаПартии)
+        :param shift_task_id: айди сменного задания
+        :return: None
+        """
+        self._ids[party_key] = shift_task_id
+        self._missing.pop(party_key, None)
+
+    def remember_missing(self, party_keys) -> None:
+        """
+        Метод запоминает партии, которых нет в БД
+        :param party_keys: итерируемый объект с парами (НомерПартии, ДатаПартии)
+        :return: None
+        """
+        if self.negative_size <= 0:
+            return
+        missing_until = time.monotonic() + self.negative_ttl
+        for party_key in party_keys:
+            self._missing[party_key] = missing_until
+            self._missing.move_to_end(party_key)
+            if len(self._missing) > self.negative_size:
+                self._missing.popitem(last=False)
+
+    def forget(self, party_key: tuple[int, datetime.date]) -> None:
+        """
+        Метод удаляет партию из индекса
+        :param party_key: пара (НомерПартии, ДатаПартии)
+        :return: None
+        """
+        self._ids.pop(party_key, None)
+        self._missing.pop(party_key, None)
+
+    def clear(self) -> None:
+        """
+        Метод полностью очищает индекс
+        :return: None
+        """
+        self._ids.clear()
+        self._missing.clear()
+
+    def stats(self) -> dict:
+        """
+        Метод возвращает размер индекса и счетчики попаданий и промахов
+        :return: dict
+        """
+        return {
+            "size": len(self._ids),
+            "missing_size": len(self._missing),
+            "missing_max_size": self.negative_size,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+        }
+
+
+batch_key_resolver = BatchKeyResolver(
+    negative_ttl=settings.batch_key_negative_ttl,
+    negative_size=settings.batch_key_negative_cache_size,
+)
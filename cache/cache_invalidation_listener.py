@@ -0,0 +1,241 @@
+import asyncio
+import datetime
+import json
+import logging
+
+import asyncpg
+
+from cache.batch_key_resolver import BatchKeyResolver, batch_key_resolver
+from cache.cache_invalidation_publisher import cache_invalidation_publisher
+from cache.shift_task_cache import ShiftTaskCache, shift_task_cache
+from cache.verification_index import VerificationIndex, verification_index
+from model.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError)
+
+
+class CacheInvalidationListener:
+    """
+    Слушатель канала PostgreSQL LISTEN на отдельном соединении asyncpg вне пула.
+    События других процессов удаляют записи из shift_task_cache и обновляют batch_key_resolver
+    и verification_index. Пока соединения нет, события теряются, поэтому после каждого
+    переподключения кеши очищаются полностью. Обрыв соединения определяется по закрытию соединения
+    и проверочным запросом раз в health_check_interval секунд
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str,
+        origin: str,
+        shift_task_cache: ShiftTaskCache,
+        batch_key_resolver: BatchKeyResolver,
+        verification_index: VerificationIndex,
+        health_check_interval: float,
+        reconnect_delay: float,
+        max_reconnect_delay: float,
+    ):
+        """
+        :param dsn: адрес БД для asyncpg
+        :param channel: имя канала LISTEN
+        :param origin: идентификатор своего процесса, свои события пропускаются
+        :param shift_task_cache: кеш ответов по сменным заданиям
+        :param batch_key_resolver: индекс пар НомерПартии и ДатаПартии
+        :param verification_index: индекс уникальных кодов продукции
+        :param health_check_interval: раз в сколько секунд проверять соединение
+        :param reconnect_delay: задержка перед первой попыткой переподключения в секундах
+        :param max_reconnect_delay: максимальная задержка между попытками переподключения
+        """
+        self.dsn = dsn
+        self.channel = channel
+        self.origin = origin
+        self.shift_task_cache = shift_task_cache
+        self.batch_key_resolver = batch_key_resolver
+        self.verification_index = verification_index
+        self.health_check_interval = health_check_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._connection: asyncpg.Connection | None = None
+        self._lost = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        #  события, отложенные на время заполнения кешей при старте, None - события применяются сразу
+        self._held_events: list[dict] | None = None
+        self._flush_held = False
+        self.received = 0
+        self.applied = 0
+        self.reconnects = 0
+        self.flushes = 0
+
+    def hold_events(self) -> None:
+        """
+        Метод откладывает события других процессов до вызова release_events.
+        Кеши при старте заполняются из одного снимка БД перезаписью, и примененное во время заполнения
+        событие перезаписалось бы устаревшей строкой снимка, поэтому события применяются после заполнения
+        :return: None
+        """
+        self._held_events = []
+        self._flush_held = False
+
+    def release_events(self) -> None:
+        """
+        Метод применяет отложенные события по порядку получения и возвращает применение событий сразу.
+        Событие, уже учтенное в снимке, при повторном применении ничего не меняет.
+        Если во время заполнения соединение переподключалось, кеши сначала очищаются:
+        события за время без соединения потеряны и в снимке их может не быть
+        :return: None
+        """
+        held_events, self._held_events = self._held_events or [], None
+        if self._flush_held:
+            self._flush_held = False
+            self.flush()
+        for event in held_events:
+            self.apply(event)
+
+    async def start(self) -> None:
+        """
+        Метод подключается к каналу и запускает фоновую задачу, которая следит за соединением.
+        Вызывается до заполнения кешей при старте вместе с hold_events, чтобы не пропустить события
+        между снимком БД для заполнения и подпиской
+        :return: None
+        """
+        try:
+            await self.connect()
+        except CONNECTION_ERRORS:
+            logger.warning("Канал инвалидации кешей недоступен, подключение повторится в фоне", exc_info=True)
+        self._task = asyncio.create_task(self.run(), name="cache-invalidation-listener")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.close()
+
+    async def connect(self) -> None:
+        connection = await asyncpg.connect(
+            dsn=self.dsn,
+            timeout=self.health_check_interval,
+            server_settings={"application_name": "cache_invalidation_listener"},
+        )
+        self._lost.clear()
+        connection.add_termination_listener(self.handle_termination)
+        await connection.add_listener(self.channel, self.handle_notification)
+        self._connection = connection
+
+    async def close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None and not connection.is_closed():
+            connection.terminate()
+
+    def handle_termination(self, connection: asyncpg.Connection) -> None:
+        self._lost.set()
+
+    async def wait_lost(self) -> None:
+        """
+        Метод ждет обрыва соединения: закрытия соединения или неудачного проверочного запроса
+        :return: None
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), timeout=self.health_check_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.wait_for(self._connection.fetchval("SELECT 1"), timeout=self.health_check_interval)
+            except CONNECTION_ERRORS:
+                return
+
+    async def run(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            if self._connection is not None:
+                await self.wait_lost()
+                logger.warning("Соединение канала инвалидации кешей потеряно")
+                await self.close()
+
+            try:
+                await self.connect()
+            except CONNECTION_ERRORS:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            delay = self.reconnect_delay
+            self.reconnects += 1
+            #  события, отправленные пока соединения не было, потеряны
+            self.flush()
+
+    def handle_notification(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        self.received += 1
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Некорректное событие инвалидации кешей: %s", payload)
+            return
+        if event.get("origin") == self.origin:
+            return
+        if self._held_events is not None:
+            self._held_events.append(event)
+            return
+        self.apply(event)
+
+    def apply(self, event: dict) -> None:
+        """
+        Метод применяет событие другого процесса к локальным кешам
+        :param event: словарь с ключами shift_task_ids, forget, remember, aggregated, clear_verification_index
+        :return: None
+        """
+        if event.get("clear_verification_index"):
+            self.verification_index.clear()
+        self.shift_task_cache.invalidate_many(event.get("shift_task_ids", ()))
+        for party_number, party_data in event.get("forget", ()):
+            self.batch_key_resolver.forget((party_number, datetime.date.fromisoformat(party_data)))
+        for party_number, party_data, shift_task_id in event.get("remember", ()):
+            self.batch_key_resolver.remember((party_number, datetime.date.fromisoformat(party_data)), shift_task_id)
+        for code, shift_task_id in event.get("aggregated", ()):
+            self.verification_index.add(code, shift_task_id, True)
+        self.applied += 1
+
+    def flush(self) -> None:
+        """
+        Метод полностью очищает локальные кеши, они заново заполняются из БД при промахах
+        :return: None
+        """
+        self.shift_task_cache.clear()
+        self.batch_key_resolver.clear()
+        self.verification_index.clear()
+        self.flushes += 1
+        #  заполнение кешей при старте продолжает писать строки снимка, поэтому после него кеши очищаются еще раз
+        if self._held_events is not None:
+            self._flush_held = True
+
+    def stats(self) -> dict:
+        return {
+            "connected": self._connection is not None and not self._lost.is_set(),
+            "received": self.received,
+            "applied": self.applied,
+            "reconnects": self.reconnects,
+            "flushes": self.flushes,
+            "held": len(self._held_events) if self._held_events is not None else None,
+            "published": cache_invalidation_publisher.published,
+        }
+
+
+cache_invalidation_listener = CacheInvalidationListener(
+    dsn=settings.data_base_dsn,
+    channel=settings.cache_invalidation_channel,
+    origin=cache_invalidation_publisher.origin,
+    shift_task_cache=shift_task_cache,
+    batch_key_resolver=batch_key_resolver,
+    verification_index=verification_index,
+    health_check_interval=settings.cache_invalidation_health_check_interval,
+    reconnect_delay=settings.cache_invalidation_reconnect_delay,
+    max_reconnect_delay=settings.cache_invalidation_max_reconnect_delay,
+)
@@ -0,0 +1,114 @@
+import datetime
+import json
+import uuid
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from model.config import settings
+
+
+class CacheInvalidationPublisher:
+    """
+    Публикация событий инвалидации кешей в канал PostgreSQL NOTIFY для других процессов приложения.
+    pg_notify выполняется в транзакции записи, поэтому событие доставляется только после коммита,
+    а при откате не доставляется вовсе. Уведомление PostgreSQL ограничено 8000 байт,
+    поэтому большое событие делится на несколько уведомлений
+    """
+
+    MAX_PAYLOAD_SIZE = 7500
+
+    def __init__(self, channel: str, enabled: bool = True):
+        """
+        :param channel: имя канала NOTIFY
+        :param enabled: если False, события не публикуются
+        """
+        self.channel = channel
+        self.enabled = enabled
+        #  собственные события процесс уже применил к своим кешам и пропускает их при получении
+        self.origin = uuid.uuid4().hex
+        self.published = 0
+
+    def build_payloads(
+        self,
+        shift_task_ids=(),
+        forget=(),
+        remember=(),
+        aggregated=(),
+        clear_verification_index: bool = False,
+    ) -> list[str]:
+        """
+        Метод собирает событие в одно или несколько JSON уведомлений не больше MAX_PAYLOAD_SIZE байт
+        :param shift_task_ids: айди измененных сменных заданий
+        :param forget: пары (НомерПартии, ДатаПартии), которые больше не существуют
+        :param remember: тройки (НомерПартии, ДатаПартии, айди сменного задания) новых или измененных партий
+        :param aggregated: пары (уникальный код, айди сменного задания) аггрегированных кодов
+        :param clear_verification_index: True, если индекс кодов нужно очистить целиком
+        :return: список JSON строк
+        """
+        items = [("shift_task_ids", shift_task_id) for shift_task_id in shift_task_ids]
+        items += [("forget", [party_number, party_data.isoformat()]) for party_number, party_data in forget]
+        items += [
+            ("remember", [party_number, party_data.isoformat(), shift_task_id])
+            for party_number, party_data, shift_task_id in remember
+        ]
+        items += [("aggregated", [code, shift_task_id]) for code, shift_task_id in aggregated]
+
+        def new_event() -> dict:
+            return {"origin": self.origin, "shift_task_ids": [], "forget": [], "remember": [], "aggregated": []}
+
+        payloads = []
+        event = new_event()
+        base_size = len(json.dumps(event))
+        if clear_verification_index:
+            event["clear_verification_index"] = True
+        size = len(json.dumps(event))
+        for kind, item in items:
+            #  элемент списка занимает свой JSON и разделитель ", "
+            item_size = len(json.dumps(item)) + 2
+            if size + item_size > self.MAX_PAYLOAD_SIZE and size > base_size:
+                payloads.append(json.dumps(event))
+                event = new_event()
+                size = base_size
+            event[kind].append(item)
+            size += item_size
+        if size > base_size:
+            payloads.append(json.dumps(event))
+        return payloads
+
+    async def publish(
+        self,
+        session: AsyncSession,
+        shift_task_ids=(),
+        forget: list[tuple[int, datetime.date]] = (),
+        remember: list[tuple[int, datetime.date, int]] = (),
+        aggregated: list[tuple[str, int]] = (),
+        clear_verification_index: bool = False,
+    ) -> None:
+        """
+        Метод публикует событие в текущей транзакции сессии, вызывается до коммита
+        :param session: объект асинхронной сессии AsyncSession с открытой транзакцией записи
+        :param shift_task_ids: айди измененных сменных заданий
+        :param forget: пары (НомерПартии, ДатаПартии), которые больше не существуют
+        :param remember: тройки (НомерПартии, ДатаПартии, айди сменного задания)
+        :param aggregated: пары (уникальный код, айди сменного задания)
+        :param clear_verification_index: True, если индекс кодов нужно очистить целиком
+        :return: None
+        """
+        if not self.enabled:
+            return
+        for payload in self.build_payloads(
+            shift_task_ids=shift_task_ids,
+            forget=forget,
+            remember=remember,
+            aggregated=aggregated,
+            clear_verification_index=clear_verification_index,
+        ):
+            await session.execute(select(func.pg_notify(self.channel, payload)))
+            self.published += 1
+
+
+cache_invalidation_publisher = CacheInvalidationPublisher(
+    channel=settings.cache_invalidation_channel,
+    enabled=settings.cache_invalidation_enabled,
+)
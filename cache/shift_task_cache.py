@@ -0,0 +1,120 @@
+import time
+from collections import OrderedDict
+
+from model.config import settings
+
+
+class ShiftTaskCache:
+    """
+    Ограниченный по размеру LRU кеш с TTL для сериализованных ответов по сменным заданиям.
+    Ключ - id сменного задания и вариант названий полей, значение - готовый JSON ответа в байтах и версия задания.
+    Записи удаляются явно при изменении сменного задания, TTL страхует от пропущенной инвалидации
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        """
+        :param max_size: максимальное количество записей в кеше
+        :param ttl: время жизни записи в секундах
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[int, bool], tuple[float, tuple[bytes, int]]] = OrderedDict()
+        #  счетчик инвалидаций: ответ, прочитанный из БД до инвалидации, не должен попасть в кеш после нее
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, shift_task_id: int, by_alias: bool = True) -> tuple[bytes, int] | None:
+        """
+        Метод возвращает сериализованный ответ из кеша или None, если записи нет или она устарела
+        :param shift_task_id: айди сменного задания
+        :param by_alias: True - ответ с полями на русском языке, False - с внутренними названиями полей
+        :return: кортеж (ответ, версия) или None
+        """
+        key = (shift_task_id, by_alias)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self,
+        shift_task_id: int,
+        value: tuple[bytes, int],
+        by_alias: bool = True,
+        generation: int | None = None,
+    ) -> None:
+        """
+        Метод кладет сериализованный ответ в кеш, вытесняя самые давно использованные записи
+        :param shift_task_id: айди сменного задания
+        :param value: кортеж (сериализованный ответ, версия сменного задания)
+        :param by_alias: True - ответ с полями на русском языке, False - с внутренними названиями полей
+        :param generation: значение self.generation до чтения из БД, если с тех пор была инвалидация - запись не кладется
+        :return: None
+        """
+        if self.max_size <= 0 or (generation is not None and generation != self.generation):
+            return
+
+        key = (shift_task_id, by_alias)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, shift_task_id: int) -> None:
+        """
+        Метод удаляет запись по сменному заданию из кеша
+        :param shift_task_id: айди сменного задания
+        :return: None
+        """
+        self.generation += 1
+        self._entries.pop((shift_task_id, True), None)
+        self._entries.pop((shift_task_id, False), None)
+
+    def invalidate_many(self, shift_task_ids) -> None:
+        """
+        Метод удаляет из кеша записи по нескольким сменным заданиям
+        :param shift_task_ids: итерируемый объект с айди сменных заданий
+        :return: None
+        """
+        self.generation += 1
+        for shift_task_id in shift_task_ids:
+            self._entries.pop((shift_task_id, True), None)
+            self._entries.pop((shift_task_id, False), None)
+
+    def clear(self) -> None:
+        """
+        Метод полностью очищает кеш
+        :return: None
+        """
+        self.generation += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Метод возвращает счетчики попаданий, промахов и вытеснений
+        :return: dict
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+shift_task_cache = ShiftTaskCache(max_size=settings.shift_task_cache_size, ttl=settings.shift_task_cache_ttl)
@@ -0,0 +1,121 @@
+import sys
+
+from model.config import settings
+
+
+class VerificationIndex:
+    """
+    Индекс в памяти для проверки "принадлежит ли код продукции партии" без запроса в БД.
+    Ключ - уникальный код в байтах UTF-8, значение - id сменного задания со знаком:
+    отрицательный id означает, что код уже аггрегирован. Значения интернируются,
+    поэтому все коды одной партии ссылаются на один и тот же объект int, и на код приходится
+    только ключ и запись словаря. Количество кодов ограничено max_codes
+    """
+
+    def __init__(self, max_codes: int, enabled: bool = True):
+        """
+        :param max_codes: максимальное количество кодов в индексе
+        :param enabled: если False, индекс ничего не хранит и все проверки идут в БД
+        """
+        self.max_codes = max_codes
+        self.enabled = enabled
+        self._codes: dict[bytes, int] = {}
+        self._values: dict[int, int] = {}
+        self._keys_size = 0
+        #  False, если хотя бы один код не поместился в индекс
+        self.complete = True
+        self.hits = 0
+        self.misses = 0
+
+    def _intern(self, value: int) -> int:
+        return self._values.setdefault(value, value)
+
+    def add(self, unique_product_code: str, shift_task_id: int, is_aggregated: bool, overwrite: bool = True) -> bool:
+        """
+        Метод добавляет или обновляет код в индексе
+        :param unique_product_code: уникальный код продукции
+        :param shift_task_id: айди сменного задания
+        :param is_aggregated: аггрегирован ли код
+        :param overwrite: если False, код, который уже есть в индексе, не обновляется
+        :return: False, если индекс заполнен и код не добавлен
+        """
+        if not self.enabled:
+            return False
+        key = unique_product_code.encode()
+        if key in self._codes:
+            if not overwrite:
+                return True
+        else:
+            if len(self._codes) >= self.max_codes:
+                self.complete = False
+                return False
+            self._keys_size += sys.getsizeof(key)
+        self._codes[key] = self._intern(-shift_task_id if is_aggregated else shift_task_id)
+        return True
+
+    def add_many(self, rows) -> None:
+        """
+        Метод добавляет в индекс пачку кодов
+        :param rows: итерируемый объект с кортежами (уникальный код, айди сменного задания, аггрегирован ли)
+        :return: None
+        """
+        for unique_product_code, shift_task_id, is_aggregated in rows:
+            self.add(unique_product_code, shift_task_id, is_aggregated)
+
+    def mark_aggregated(self, unique_product_code: str) -> None:
+        key = unique_product_code.encode()
+        value = self._codes.get(key)
+        if value is not None and value > 0:
+            self._codes[key] = self._intern(-value)
+
+    def lookup(self, unique_product_code: str) -> tuple[int, bool] | None:
+        """
+        Метод ищет код в индексе
+        :param unique_product_code: уникальный код продукции
+        :return: кортеж (айди сменного задания, аггрегирован ли) или None, если кода нет в индексе
+        """
+        value = self._codes.get(unique_product_code.encode()) if self.enabled else None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return abs(value), value < 0
+
+    def remove(self, unique_product_code: str) -> None:
+        key = unique_product_code.encode()
+        if self._codes.pop(key, None) is not None:
+            self._keys_size -= sys.getsizeof(key)
+
+    def clear(self) -> None:
+        self._codes.clear()
+        self._values.clear()
+        self._keys_size = 0
+        self.complete = True
+
+    def memory_bytes(self) -> int:
+        """
+        Метод оценивает память индекса: таблица словаря, ключи и интернированные значения
+        :return: количество байт
+        """
+        values_size = sys.getsizeof(self._values) + sum(sys.getsizeof(value) for value in self._values)
+        return sys.getsizeof(self._codes) + self._keys_size + values_size
+
+    def stats(self) -> dict:
+        size = len(self._codes)
+        memory_bytes = self.memory_bytes()
+        return {
+            "enabled": self.enabled,
+            "size": size,
+            "max_codes": self.max_codes,
+            "complete": self.complete,
+            "memory_bytes": memory_bytes,
+            "bytes_per_code": round(memory_bytes / size, 1) if size else 0.0,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+verification_index = VerificationIndex(
+    max_codes=settings.verification_index_max_codes,
+    enabled=settings.verification_index_enabled,
+)
@@ -1,7 +1,9 @@
 __all__ = (
     "DaoShiftTaskRepository",
+    "DaoUniqueProductIdentifiersRepository",
 
 )
 
 
 from dao.dao_shift_tasks import DaoShiftTaskRepository
+from dao.dao_unique_product_identifiers import DaoUniqueProductIdentifiersRepository
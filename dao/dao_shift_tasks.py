@@ -1,9 +1,15 @@
-from sqlalchemy import Result, select, and_
+from sqlalchemy import Result, Select, select, update, delete, and_, case, exists, func, literal, null, tuple_
+from sqlalchemy import text, union_all
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 import datetime
+from cache import batch_key_resolver, cache_invalidation_publisher, shift_task_cache
 from dto import ErrorResponse
-from model.models import ShiftTask
+from metrics import track_dao_method
+from model.config import settings
+from model.models import ShiftTask, ShiftTaskArchive, ShiftTaskCounters, UniqueProductCode, UniqueProductIdentifiers
+from model.models import UniqueProductIdentifiersArchive
 
 
 class DaoShiftTaskRepository:
@@ -12,6 +18,7 @@ class DaoShiftTaskRepository:
     """
 
     @staticmethod
+    @track_dao_method
     async def find_all(session: AsyncSession) -> list[ShiftTask] | ErrorResponse:
         """
         Метод возвращает список объектов класса ShiftTask или объект ошибки ErrorResponse
@@ -27,17 +34,35 @@ class DaoShiftTaskRepository:
             response = ErrorResponse(code=500, message=f"База данных недоступна")
             return response
 
+    @classmethod
+    def get_warm_up_statements(cls) -> list:
+        """
+        Метод возвращает частые запросы к таблице shift_tasks для прогрева соединений при старте приложения
+        :return: список запросов
+        """
+        return [
+            select(ShiftTask).where(ShiftTask.id == 0),
+            cls.build_several_params_query(several_params={}, limit=10),
+            select(ShiftTask.id, ShiftTask.party_number, ShiftTask.party_data).where(
+                tuple_(ShiftTask.party_number, ShiftTask.party_data).in_([(0, datetime.date.min)])
+            ),
+        ]
+
     @staticmethod
-    async def find_by_id(session: AsyncSession, shift_task_id: int) -> ShiftTask | ErrorResponse:
+    @track_dao_method
+    async def find_by_id(session: AsyncSession, shift_task_id: int) -> ShiftTask | ShiftTaskArchive | ErrorResponse:
         """
-        Метод возвращает найденный объект класса ShiftTask если он найден в БД, иначе объект ErrorResponse
+        Метод возвращает найденный объект класса ShiftTask если он найден в БД, иначе объект ErrorResponse.
+        Если задания нет в shift_tasks, оно ищется в архиве shift_tasks_archive
         :param session: объект асинхронной сессии AsyncSession
         :param shift_task_id: айди сменного задания
-        :return: объект класса ShiftTask или ErrorResponse
+        :return: объект класса ShiftTask, ShiftTaskArchive или ErrorResponse
         """
         try:
             shift_task = await session.get(ShiftTask, shift_task_id)
-            if isinstance(shift_task, ShiftTask):
+            if shift_task is None:
+                shift_task = await session.get(ShiftTaskArchive, shift_task_id)
+            if shift_task is not None:
                 return shift_task
             else:
                 response = ErrorResponse(code=404, message=f"Сменное задание с id {shift_task_id} не найдено")
@@ -46,65 +71,200 @@ class DaoShiftTaskRepository:
             response = ErrorResponse(code=500, message=f"База данных недоступна")
             return response
 
+    #  колонки, которые можно изменить через update_shift_task (без closing_status, у него своя логика)
+    UPDATABLE_COLUMNS = frozenset((
+        "view_task_to_shift",
+        "work_center",
+        "line",
+        "shift",
+        "team",
+        "party_number",
+        "party_data",
+        "nomenclature",
+        "code_ekn",
+        "id_of_the_rc",
+        "date_time_shift_start",
+        "date_time_shift_end",
+    ))
+
+    @classmethod
+    def build_update_query(
+        cls,
+        shift_task_id: int,
+        update_data: dict,
+        now: datetime.datetime,
+        expected_version: int | None = None,
+    ):
+        """
+        Метод строит один запрос UPDATE ... RETURNING только по переданным полям.
+        Поле closed_at вычисляется в SQL от текущего значения closing_status: при закрытии партии -
+        время now, при открытии - null, иначе остается прежним. Версия задания увеличивается на 1
+        :param shift_task_id: айди сменного задания
+        :param update_data: словарь с полями для изменения
+        :param now: время закрытия партии
+        :param expected_version: ожидаемая версия задания, если None - версия не проверяется
+        :return: объект запроса Update
+        """
+        values = {column: value for column, value in update_data.items() if column in cls.UPDATABLE_COLUMNS}
+
+        if "closing_status" in update_data:
+            closing_status = update_data["closing_status"]
+            values["closing_status"] = closing_status
+            if closing_status:
+                values["closed_at"] = case((ShiftTask.closing_status.is_(False), now), else_=ShiftTask.closed_at)
+            else:
+                values["closed_at"] = case((ShiftTask.closing_status.is_(True), null()), else_=ShiftTask.closed_at)
+
+        values["version"] = ShiftTask.version + 1
+
+        stmt = update(ShiftTask).where(ShiftTask.id == shift_task_id).values(**values)
+        if expected_version is not None:
+            stmt = stmt.where(ShiftTask.version == expected_version)
+        return stmt.returning(ShiftTask)
+
+    @staticmethod
+    def build_move_codes_query(shift_task_id: int, old_party_data: datetime.date, new_party_data: datetime.date):
+        """
+        Метод строит запрос, который переносит коды продукции сменного задания в секцию новой ДатаПартии
+        и исправляет ДатаПартии этих кодов в реестре, все одним запросом с WITH ... UPDATE ... RETURNING
+        :param shift_task_id: айди сменного задания
+        :param old_party_data: прежняя ДатаПартии
+        :param new_party_data: новая ДатаПартии
+        :return: объект запроса Update
+        """
+        moved = update(UniqueProductIdentifiers).where(
+            UniqueProductIdentifiers.shift_task_id == shift_task_id,
+            UniqueProductIdentifiers.party_data == old_party_data,
+        ).values(
+            party_data=new_party_data,
+        ).returning(UniqueProductIdentifiers.unique_product_code).cte("moved")
+
+        stmt = update(UniqueProductCode).where(
+            UniqueProductCode.unique_product_code.in_(select(moved.c.unique_product_code))
+        ).values(
+            party_data=new_party_data,
+        ).execution_options(synchronize_session=False)
+        return stmt
+
+    @track_dao_method
     async def update_shift_task(
         self,
         session: AsyncSession,
         shift_task_id: int,
-        update_data: dict
+        update_data: dict,
+        expected_version: int | None = None,
     ) -> ShiftTask | ErrorResponse:
         """
-        Метод изменяет существующий объект класса ShiftTask.
+        Метод изменяет существующий объект класса ShiftTask одним запросом UPDATE ... RETURNING.
+        Если передана ожидаемая версия, а задание уже изменено другим запросом, возвращается ошибка 412.
         Возвращает объект класса ShiftTask если он найден в БД и успешно изменен, иначе объект ErrorResponse
         :param session: объект асинхронной сессии AsyncSession
         :param shift_task_id: айди сменного задания
         :param update_data: словарь с полями для изменения
+        :param expected_version: ожидаемая версия задания из заголовка If-Match, None - без проверки
         :return: объект класса ShiftTask или ErrorResponse
         """
+        stmt = self.build_update_query(
+            shift_task_id=shift_task_id,
+            update_data=update_data,
+            now=datetime.datetime.now(),
+            expected_version=expected_version,
+        )
+        changes_party_key = "party_number" in update_data or "party_data" in update_data
+        try:
+            #  прежняя пара НомерПартии и ДатаПартии нужна только для индекса партий,
+            #  поэтому читается лишь при ее изменении, строка блокируется до конца транзакции
+            old_party_key = None
+            if changes_party_key:
+                old_party_key = (await session.execute(
+                    select(ShiftTask.party_number, ShiftTask.party_data)
+                    .where(ShiftTask.id == shift_task_id)
+                    .with_for_update()
+                )).one_or_none()
+
+            result = await session.scalars(stmt, execution_options={"populate_existing": True})
+            shift_task = result.one_or_none()
+            #  коды продукции секционированы по ДатаПартии и переезжают вместе с партией
+            if (
+                shift_task is not None
+                and old_party_key is not None
+                and old_party_key.party_data != shift_task.party_data
+            ):
+                await session.execute(self.build_move_codes_query(
+                    shift_task_id=shift_task_id,
+                    old_party_data=old_party_key.party_data,
+                    new_party_data=shift_task.party_data,
+                ))
+            if shift_task is not None:
+                #  другие процессы получат событие только после коммита этой транзакции
+                await cache_invalidation_publisher.publish(
+                    session=session,
+                    shift_task_ids=[shift_task_id],
+                    forget=[tuple(old_party_key)] if old_party_key is not None else (),
+                    remember=(
+                        [(shift_task.party_number, shift_task.party_data, shift_task.id)]
+                        if old_party_key is not None else ()
+                    ),
+                )
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            response = ErrorResponse(code=409, message=f"Пара НомерПартии и ДатаПартии всегда уникальна!")
+            return response
+        except SQLAlchemyError:
+            await session.rollback()
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
 
-        shift_task = await self.find_by_id(session=session, shift_task_id=shift_task_id)
-
-        if isinstance(shift_task, ShiftTask):
-            if "closing_status" in update_data:
-                if shift_task.closing_status is False and update_data["closing_status"] is True:
-                    shift_task.closed_at = datetime.datetime.now()
-                if shift_task.closing_status is True and update_data["closing_status"] is False:
-                    shift_task.closed_at = None
-                shift_task.closing_status = update_data["closing_status"]
-
-            shift_task.view_task_to_shift = update_data["view_task_to_shift"] if "view_task_to_shift" in update_data \
-                else shift_task.view_task_to_shift
-
-            shift_task.work_center = update_data["work_center"] if "work_center" in update_data \
-                else shift_task.work_center
-
-            shift_task.line = update_data["line"] if "line" in update_data else shift_task.line
-            shift_task.shift = update_data["shift"] if "shift" in update_data else shift_task.shift
-            shift_task.team = update_data["team"] if "team" in update_data else shift_task.team
-            shift_task.party_number = update_data["party_number"] if "party_number" in update_data \
-                else shift_task.party_number
-            shift_task.party_data = update_data["party_data"] if "party_data" in update_data \
-                else shift_task.party_data
-            shift_task.nomenclature = update_data["nomenclature"] if "nomenclature" in update_data \
-                else shift_task.nomenclature
-            shift_task.code_ekn = update_data["code_ekn"] if "code_ekn" in update_data else shift_task.code_ekn
-            shift_task.id_of_the_rc = update_data["id_of_the_rc"] if "id_of_the_rc" in update_data \
-                else shift_task.id_of_the_rc
-
-            shift_task.date_time_shift_start = update_data["date_time_shift_start"] \
-                if ("date_time_shift_start" in update_data) else shift_task.date_time_shift_start
-
-            shift_task.date_time_shift_end = update_data["date_time_shift_end"] \
-                if ("date_time_shift_end" in update_data) else shift_task.date_time_shift_end
+        if shift_task is None:
+            return await self.get_update_error(
+                session=session,
+                shift_task_id=shift_task_id,
+                expected_version=expected_version,
+            )
 
-            session.add(shift_task)
-            await session.commit()
-            return shift_task
+        shift_task_cache.invalidate(shift_task_id)
+        if old_party_key is not None:
+            batch_key_resolver.forget(tuple(old_party_key))
+            batch_key_resolver.remember((shift_task.party_number, shift_task.party_data), shift_task.id)
+        return shift_task
 
-        else:
-            response = ErrorResponse(code=404, message=f"Сменное задание с id {shift_task_id} не найдено")
+    @staticmethod
+    @track_dao_method
+    async def get_update_error(
+        session: AsyncSession,
+        shift_task_id: int,
+        expected_version: int | None,
+    ) -> ErrorResponse:
+        """
+        Метод выбирает ошибку для UPDATE, который не изменил ни одной строки:
+        задания нет - 404, задание в архиве - 409, задание есть, но его версия уже другая - 412
+        :param session: объект асинхронной сессии AsyncSession
+        :param shift_task_id: айди сменного задания
+        :param expected_version: ожидаемая версия задания
+        :return: объект ErrorResponse
+        """
+        try:
+            version = None
+            if expected_version is not None:
+                version = await session.scalar(select(ShiftTask.version).where(ShiftTask.id == shift_task_id))
+            archived = version is None and await session.scalar(
+                select(ShiftTaskArchive.id).where(ShiftTaskArchive.id == shift_task_id)
+            ) is not None
+        except SQLAlchemyError:
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
             return response
+        if archived:
+            return ErrorResponse(code=409, message=f"Сменное задание с id {shift_task_id} в архиве и не изменяется")
+        if version is None:
+            return ErrorResponse(code=404, message=f"Сменное задание с id {shift_task_id} не найдено")
+        return ErrorResponse(
+            code=412,
+            message=f"Сменное задание с id {shift_task_id} изменено другим запросом, текущая версия {version}",
+        )
 
     @staticmethod
+    @track_dao_method
     async def find_by_party_number_and_party_data(
         session: AsyncSession,
         party_number: int,
@@ -140,6 +300,309 @@ class DaoShiftTaskRepository:
             response = ErrorResponse(code=500, message=f"База данных недоступна")
             return response
 
+    @staticmethod
+    @track_dao_method
+    async def find_ids_by_party_keys(
+        session: AsyncSession,
+        party_keys: set[tuple[int, datetime.date]],
+    ) -> dict[tuple[int, datetime.date], int] | ErrorResponse:
+        """
+        Метод находит id сменных заданий для набора пар НомерПартии и ДатаПартии.
+        Пары сначала ищутся в batch_key_resolver, в БД одним запросом уходят только неизвестные пары.
+        Возвращает словарь {(НомерПартии, ДатаПартии): id} только для существующих партий, иначе объект ErrorResponse
+        :param session: объект асинхронной сессии AsyncSession
+        :param party_keys: множество пар (НомерПартии, ДатаПартии)
+        :return: dict или ErrorResponse
+        """
+        found, unresolved = batch_key_resolver.lookup_many(party_keys)
+        if not unresolved:
+            return found
+
+        try:
+            stmt = select(ShiftTask.id, ShiftTask.party_number, ShiftTask.party_data).where(
+                tuple_(ShiftTask.party_number, ShiftTask.party_data).in_(list(unresolved))
+            )
+            result: Result = await session.execute(stmt)
+            for shift_task_id, party_number, party_data in result:
+                found[(party_number, party_data)] = shift_task_id
+                batch_key_resolver.remember((party_number, party_data), shift_task_id)
+        except SQLAlchemyError:
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
+
+        batch_key_resolver.remember_missing(party_key for party_key in unresolved if party_key not in found)
+        return found
+
+    @staticmethod
+    @track_dao_method
+    async def warm_up_batch_key_resolver(session: AsyncSession, yield_per: int = 10000) -> int | ErrorResponse:
+        """
+        Метод заполняет batch_key_resolver всеми парами НомерПартии и ДатаПартии из таблицы shift_tasks.
+        Записи читаются серверным курсором пачками по yield_per строк
+        :param session: объект асинхронной сессии AsyncSession
+        :param yield_per: размер пачки строк
+        :return: количество загруженных партий или ErrorResponse
+        """
+        loaded = 0
+        try:
+            stmt = select(ShiftTask.id, ShiftTask.party_number, ShiftTask.party_data).execution_options(
+                yield_per=yield_per
+            )
+            result = await session.stream(stmt)
+            async for rows in result.partitions():
+                for shift_task_id, party_number, party_data in rows:
+                    batch_key_resolver.remember((party_number, party_data), shift_task_id)
+                loaded += len(rows)
+        except SQLAlchemyError:
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
+
+        return loaded
+
+    @staticmethod
+    def build_archive_queries(shift_task_ids: list[int], now: datetime.datetime) -> tuple:
+        """
+        Метод строит два запроса WITH ... DELETE ... RETURNING INSERT ... SELECT, которые переносят
+        коды продукции и сами сменные задания в архивные таблицы, каждый за один проход
+        :param shift_task_ids: айди сменных заданий
+        :param now: время переноса в архив
+        :return: кортеж (запрос для кодов, запрос для заданий)
+        """
+        code_columns = [column.name for column in UniqueProductIdentifiersArchive.__table__.columns]
+        moved_codes = delete(UniqueProductIdentifiers).where(
+            UniqueProductIdentifiers.shift_task_id.in_(shift_task_ids)
+        ).returning(*(UniqueProductIdentifiers.__table__.c[name] for name in code_columns)).cte("moved_codes")
+        archive_codes = insert(UniqueProductIdentifiersArchive.__table__).from_select(
+            code_columns,
+            select(*(moved_codes.c[name] for name in code_columns)),
+            include_defaults=False,
+        )
+
+        task_columns = [column.name for column in ShiftTask.__table__.columns]
+        moved_tasks = delete(ShiftTask).where(
+            ShiftTask.id.in_(shift_task_ids)
+        ).returning(*ShiftTask.__table__.columns).cte("moved_tasks")
+        archive_tasks = insert(ShiftTaskArchive.__table__).from_select(
+            [*task_columns, "archived_at"],
+            select(*(moved_tasks.c[name] for name in task_columns), literal(now)),
+            include_defaults=False,
+        )
+        return archive_codes, archive_tasks
+
+    @staticmethod
+    def build_counters_increment_query():
+        """
+        Метод строит запрос INSERT ... ON CONFLICT DO UPDATE, который прибавляет к счетчикам сменного задания
+        количество новых и аггрегированных кодов и сдвигает границы времени аггрегации.
+        Строки передаются списком параметров при выполнении, запрос компилируется один раз
+        :return: объект запроса Insert
+        """
+        insert_stmt = insert(ShiftTaskCounters.__table__)
+        excluded = insert_stmt.excluded
+        counters = ShiftTaskCounters.__table__.c
+        #  least и greatest в PostgreSQL пропускают null
+        stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[counters.shift_task_id],
+            set_={
+                "total_codes": counters.total_codes + excluded.total_codes,
+                "aggregated_codes": counters.aggregated_codes + excluded.aggregated_codes,
+                "first_aggregated_at": func.least(counters.first_aggregated_at, excluded.first_aggregated_at),
+                "last_aggregated_at": func.greatest(counters.last_aggregated_at, excluded.last_aggregated_at),
+            },
+        )
+        return stmt
+
+    @classmethod
+    async def increment_counters(
+        cls,
+        session: AsyncSession,
+        total_codes: dict[int, int] | None = None,
+        aggregated_codes: dict[int, int] | None = None,
+        aggregated_at: datetime.datetime | None = None,
+    ) -> list[int]:
+        """
+        Метод изменяет счетчики кодов сменных заданий в текущей транзакции сессии, вызывается до коммита.
+        Строки изменяются в порядке id, чтобы параллельные транзакции не блокировали друг друга крест-накрест.
+        Ошибки БД не перехватываются, их обрабатывает метод, который ведет транзакцию
+        :param session: объект асинхронной сессии AsyncSession с открытой транзакцией записи
+        :param total_codes: словарь {айди сменного задания: сколько кодов загружено}
+        :param aggregated_codes: словарь {айди сменного задания: сколько кодов аггрегировано}
+        :param aggregated_at: время аггрегации
+        :return: айди сменных заданий, счетчики которых изменены
+        """
+        total_codes = total_codes or {}
+        aggregated_codes = aggregated_codes or {}
+        shift_task_ids = sorted(total_codes.keys() | aggregated_codes.keys())
+        if not shift_task_ids:
+            return []
+
+        await session.execute(
+            cls.build_counters_increment_query(),
+            [
+                {
+                    "shift_task_id": shift_task_id,
+                    "total_codes": total_codes.get(shift_task_id, 0),
+                    "aggregated_codes": aggregated_codes.get(shift_task_id, 0),
+                    "first_aggregated_at": aggregated_at if shift_task_id in aggregated_codes else None,
+                    "last_aggregated_at": aggregated_at if shift_task_id in aggregated_codes else None,
+                }
+                for shift_task_id in shift_task_ids
+            ],
+        )
+        return shift_task_ids
+
+    @staticmethod
+    def build_counters_repair_queries(shift_task_ids: list[int] | None = None) -> tuple:
+        """
+        Метод строит запросы, которые пересчитывают счетчики по рабочей и архивной таблицам кодов:
+        INSERT ... SELECT ... GROUP BY ... ON CONFLICT DO UPDATE изменяет только разошедшиеся строки,
+        DELETE удаляет строки заданий, у которых кодов нет
+        :param shift_task_ids: айди сменных заданий, None - все задания
+        :return: кортеж (запрос пересчета, запрос удаления), оба возвращают айди измененных заданий
+        """
+        hot_codes = select(
+            UniqueProductIdentifiers.shift_task_id,
+            UniqueProductIdentifiers.is_aggregated,
+            UniqueProductIdentifiers.aggregated_at,
+        )
+        archived_codes = select(
+            UniqueProductIdentifiersArchive.shift_task_id,
+            UniqueProductIdentifiersArchive.is_aggregated,
+            UniqueProductIdentifiersArchive.aggregated_at,
+        )
+        counters = ShiftTaskCounters.__table__.c
+        stale_conditions = [
+            ~exists().where(UniqueProductIdentifiers.shift_task_id == counters.shift_task_id),
+            ~exists().where(UniqueProductIdentifiersArchive.shift_task_id == counters.shift_task_id),
+        ]
+        if shift_task_ids is not None:
+            hot_codes = hot_codes.where(UniqueProductIdentifiers.shift_task_id.in_(shift_task_ids))
+            archived_codes = archived_codes.where(UniqueProductIdentifiersArchive.shift_task_id.in_(shift_task_ids))
+            stale_conditions.append(counters.shift_task_id.in_(shift_task_ids))
+
+        codes = union_all(hot_codes, archived_codes).subquery("codes")
+        counted = select(
+            codes.c.shift_task_id,
+            func.count(),
+            func.count().filter(codes.c.is_aggregated),
+            func.min(codes.c.aggregated_at),
+            func.max(codes.c.aggregated_at),
+        ).group_by(codes.c.shift_task_id)
+
+        column_names = ["shift_task_id", "total_codes", "aggregated_codes", "first_aggregated_at", "last_aggregated_at"]
+        insert_stmt = insert(ShiftTaskCounters.__table__).from_select(column_names, counted, include_defaults=False)
+        excluded = insert_stmt.excluded
+        repair_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[counters.shift_task_id],
+            set_={name: excluded[name] for name in column_names[1:]},
+            where=tuple_(*(counters[name] for name in column_names[1:])).is_distinct_from(
+                tuple_(*(excluded[name] for name in column_names[1:]))
+            ),
+        ).returning(counters.shift_task_id)
+
+        delete_stmt = delete(ShiftTaskCounters.__table__).where(*stale_conditions).returning(counters.shift_task_id)
+        return repair_stmt, delete_stmt
+
+    @track_dao_method
+    async def repair_counters(
+        self,
+        session: AsyncSession,
+        shift_task_ids: list[int] | None = None,
+    ) -> dict | ErrorResponse:
+        """
+        Метод пересчитывает счетчики кодов сменных заданий по самим кодам одной транзакцией.
+        На время пересчета таблица счетчиков блокируется от записи: загрузка и аггрегация кодов ждут,
+        зато их изменения, пришедшие во время пересчета, не теряются и не считаются дважды.
+        Возвращает словарь с количеством исправленных и удаленных строк счетчиков, иначе объект ErrorResponse
+        :param session: объект асинхронной сессии AsyncSession
+        :param shift_task_ids: айди сменных заданий, None - все задания
+        :return: dict {"repaired": int, "deleted": int} или ErrorResponse
+        """
+        repair_stmt, delete_stmt = self.build_counters_repair_queries(shift_task_ids=shift_task_ids)
+        try:
+            await session.execute(text(f"LOCK TABLE {ShiftTaskCounters.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+            repaired = (await session.scalars(repair_stmt)).all()
+            deleted = (await session.scalars(delete_stmt)).all()
+            await cache_invalidation_publisher.publish(session=session, shift_task_ids=[*repaired, *deleted])
+            await session.commit()
+        except SQLAlchemyError:
+            await session.rollback()
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
+
+        shift_task_cache.invalidate_many([*repaired, *deleted])
+        return {"repaired": len(repaired), "deleted": len(deleted)}
+
+    @track_dao_method
+    async def archive_closed_shift_tasks(
+        self,
+        session: AsyncSession,
+        closed_before: datetime.datetime,
+        batch_size: int,
+        max_codes: int,
+    ) -> dict | ErrorResponse:
+        """
+        Метод переносит в архив одну пачку сменных заданий, закрытых раньше closed_before, вместе с их кодами
+        продукции одной транзакцией. В пачку берется до batch_size заданий, пока сумма их кодов
+        по счетчикам shift_task_counters не превысит max_codes, первое задание берется всегда. Задания, заблокированные другими транзакциями, пропускаются,
+        поэтому архивацию можно запускать одновременно в нескольких процессах.
+        Возвращает словарь с количеством перенесенных заданий и кодов, иначе объект ErrorResponse
+        :param session: объект асинхронной сессии AsyncSession
+        :param closed_before: задания, закрытые раньше этого времени, переносятся в архив
+        :param batch_size: максимальное количество заданий в одной транзакции
+        :param max_codes: ограничение суммы кодов продукции в одной транзакции
+        :return: dict {"shift_tasks": int, "codes": int} или ErrorResponse
+        """
+        try:
+            candidates = (await session.execute(
+                select(ShiftTask.id, ShiftTask.party_number, ShiftTask.party_data).where(
+                    ShiftTask.closing_status.is_(True),
+                    ShiftTask.closed_at < closed_before,
+                ).order_by(ShiftTask.id).limit(batch_size).with_for_update(skip_locked=True)
+            )).all()
+            if not candidates:
+                await session.rollback()
+                return {"shift_tasks": 0, "codes": 0}
+
+            code_counts = dict((await session.execute(
+                select(ShiftTaskCounters.shift_task_id, ShiftTaskCounters.total_codes).where(
+                    ShiftTaskCounters.shift_task_id.in_([candidate.id for candidate in candidates])
+                )
+            )).all())
+            picked = []
+            codes = 0
+            for candidate in candidates:
+                count = code_counts.get(candidate.id, 0)
+                if picked and codes + count > max_codes:
+                    break
+                picked.append(candidate)
+                codes += count
+
+            shift_task_ids = [candidate.id for candidate in picked]
+            party_keys = [(candidate.party_number, candidate.party_data) for candidate in picked]
+            archive_codes, archive_tasks = self.build_archive_queries(
+                shift_task_ids=shift_task_ids,
+                now=datetime.datetime.now(),
+            )
+            archived_codes = (await session.execute(archive_codes)).rowcount
+            archived_tasks = (await session.execute(archive_tasks)).rowcount
+            await cache_invalidation_publisher.publish(
+                session=session,
+                shift_task_ids=shift_task_ids,
+                forget=party_keys,
+            )
+            await session.commit()
+        except SQLAlchemyError:
+            await session.rollback()
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
+
+        shift_task_cache.invalidate_many(shift_task_ids)
+        for party_key in party_keys:
+            batch_key_resolver.forget(party_key)
+        return {"shift_tasks": archived_tasks, "codes": archived_codes}
+
+    @track_dao_method
     async def create_shift_task(
         self,
         session: AsyncSession,
@@ -174,31 +637,30 @@ class DaoShiftTaskRepository:
         :return: объект класса ShiftTask | ErrorResponse
         """
 
-        shift_task = await self.find_by_party_number_and_party_data(
-            session=session,
-            party_number=party_number,
-            party_data=party_data,
-        )
+        shift_task_ids = await self.find_ids_by_party_keys(session=session, party_keys={(party_number, party_data)})
+        if not isinstance(shift_task_ids, dict):
+            return shift_task_ids
 
-        if isinstance(shift_task, ShiftTask):
+        shift_task_id = shift_task_ids.get((party_number, party_data))
+        if shift_task_id is not None:
             update_data = {
-                "СтатусЗакрытия": closing_status,
-                "ПредставлениеЗаданияНаСмену": view_task_to_shift,
-                "Линия": line,
-                "Смена": shift,
-                "Бригада": team,
-                "НомерПартии": party_number,
-                "ДатаПартии": party_data,
-                "Номенклатура": nomenclature,
-                "КодЕКН": code_ekn,
-                "ИдентификаторРЦ": id_of_the_rc,
-                "ДатаВремяНачалаСмены": date_time_shift_start,
-                "ДатаВремяОкончанияСмены": date_time_shift_end,
+                "closing_status": closing_status,
+                "view_task_to_shift": view_task_to_shift,
+                "line": line,
+                "shift": shift,
+                "team": team,
+                "party_number": party_number,
+                "party_data": party_data,
+                "nomenclature": nomenclature,
+                "code_ekn": code_ekn,
+                "id_of_the_rc": id_of_the_rc,
+                "date_time_shift_start": date_time_shift_start,
+                "date_time_shift_end": date_time_shift_end,
             }
 
             shift_task_to_return = await self.update_shift_task(
                 session=session,
-                shift_task_id=shift_task.id,
+                shift_task_id=shift_task_id,
                 update_data=update_data,
             )
 
@@ -223,8 +685,14 @@ class DaoShiftTaskRepository:
 
                 session.add(new_shift_task)
                 try:
+                    await session.flush()
+                    await cache_invalidation_publisher.publish(
+                        session=session,
+                        remember=[(party_number, party_data, new_shift_task.id)],
+                    )
                     await session.commit()
                     await session.refresh(new_shift_task)
+                    batch_key_resolver.remember((party_number, party_data), new_shift_task.id)
                     return new_shift_task
                 except IntegrityError:
                     response = ErrorResponse(
@@ -237,50 +705,235 @@ class DaoShiftTaskRepository:
                 response = ErrorResponse(code=500, message=f"База данных недоступна")
                 return response
 
+    #  колонки, которые перезаписываются при повторной загрузке партии с той же парой НомерПартии и ДатаПартии
+    UPSERT_COLUMNS = (
+        "closing_status",
+        "view_task_to_shift",
+        "line",
+        "shift",
+        "team",
+        "nomenclature",
+        "code_ekn",
+        "id_of_the_rc",
+        "date_time_shift_start",
+        "date_time_shift_end",
+    )
+
+    @classmethod
+    def build_upsert_query(cls, now: datetime.datetime):
+        """
+        Метод строит запрос INSERT ... ON CONFLICT (party_number, party_data) DO UPDATE ... RETURNING
+        для сменных заданий. Поле closed_at выставляется так же, как в update_shift_task:
+        при закрытии партии - текущее время, при открытии - null, иначе остается прежним.
+        Строки в запрос не встраиваются, а передаются списком параметров при выполнении,
+        поэтому запрос один и тот же для любой пачки и компилируется один раз
+        :param now: время закрытия партии
+        :return: объект запроса Insert
+        """
+        insert_stmt = insert(ShiftTask)
+        excluded = insert_stmt.excluded
+
+        set_columns = {column: excluded[column] for column in cls.UPSERT_COLUMNS}
+        set_columns["closed_at"] = case(
+            (and_(ShiftTask.closing_status.is_(False), excluded.closing_status.is_(True)), now),
+            (excluded.closing_status.is_(False), null()),
+            else_=ShiftTask.closed_at,
+        )
+        set_columns["version"] = ShiftTask.version + 1
+
+        stmt = insert_stmt.on_conflict_do_update(
+            constraint="unique_shift_task",
+            set_=set_columns,
+        ).returning(ShiftTask)
+        return stmt
+
+    @track_dao_method
+    async def bulk_upsert_shift_tasks(
+        self,
+        session: AsyncSession,
+        shift_task_list: list[dict],
+        batch_size: int | None = None,
+    ) -> list[ShiftTask] | ErrorResponse:
+        """
+        Метод записывает пачку сменных заданий в БД одной транзакцией.
+        Существующие партии с той же парой НомерПартии и ДатаПартии перезаписываются.
+        Запись идет пачками по batch_size заданий, каждая пачка - один запрос к БД.
+        Возвращает список объектов класса ShiftTask (по одному на каждую пару НомерПартии и ДатаПартии),
+        иначе объект ErrorResponse
+        :param session: объект асинхронной сессии AsyncSession
+        :param shift_task_list: список словарей с полями сменных заданий, время смены может быть с часовым поясом
+        :param batch_size: размер пачки, по умолчанию settings.shift_task_batch_size
+        :return: list объектов класса ShiftTask или ErrorResponse
+        """
+        batch_size = batch_size or settings.shift_task_batch_size
+
+        #  в одном INSERT ... ON CONFLICT строка не может обновиться дважды,
+        #  поэтому повторы партии внутри загрузки схлопываются, побеждает последнее задание.
+        #  Время смены хранится без часового пояса, смещение отбрасывается в этом же проходе по пачке
+        #  в новых словарях параметров, входной список не меняется
+        unique_tasks = {}
+        for task in shift_task_list:
+            unique_tasks[(task["party_number"], task["party_data"])] = {
+                **task,
+                "date_time_shift_start": task["date_time_shift_start"].replace(tzinfo=None),
+                "date_time_shift_end": task["date_time_shift_end"].replace(tzinfo=None),
+            }
+        task_list = list(unique_tasks.values())
+
+        now = datetime.datetime.now()
+        stmt = self.build_upsert_query(now=now)
+        execution_options = {"populate_existing": True, "insertmanyvalues_page_size": batch_size}
+        upserted_tasks = {}
+        try:
+            for start in range(0, len(task_list), batch_size):
+                result = await session.scalars(
+                    stmt,
+                    task_list[start:start + batch_size],
+                    execution_options=execution_options,
+                )
+                for shift_task in result.all():
+                    upserted_tasks[(shift_task.party_number, shift_task.party_data)] = shift_task
+            await cache_invalidation_publisher.publish(
+                session=session,
+                shift_task_ids=[shift_task.id for shift_task in upserted_tasks.values()],
+                remember=[
+                    (party_number, party_data, shift_task.id)
+                    for (party_number, party_data), shift_task in upserted_tasks.items()
+                ],
+            )
+            await session.commit()
+            shift_task_cache.invalidate_many(shift_task.id for shift_task in upserted_tasks.values())
+            for party_key, shift_task in upserted_tasks.items():
+                batch_key_resolver.remember(party_key, shift_task.id)
+        except IntegrityError:
+            await session.rollback()
+            response = ErrorResponse(code=409, message=f"Пара НомерПартии и ДатаПартии всегда уникальна!")
+            return response
+        except SQLAlchemyError:
+            await session.rollback()
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
+
+        return [upserted_tasks[key] for key in unique_tasks]
+
+    #  соответствие параметров фильтрации колонкам таблицы shift_tasks
+    FILTER_COLUMNS = {
+        "closing_status": ShiftTask.closing_status,
+        "party_number": ShiftTask.party_number,
+        "party_data": ShiftTask.party_data,
+        "shift": ShiftTask.shift,
+        "team": ShiftTask.team,
+        "nomenclature": ShiftTask.nomenclature,
+        "code_ekn": ShiftTask.code_ekn,
+        "id_of_the_rc": ShiftTask.id_of_the_rc,
+        "date_time_shift_start": ShiftTask.date_time_shift_start,
+        "date_time_shift_end": ShiftTask.date_time_shift_end,
+    }
+
+    @classmethod
+    def build_several_params_conditions(cls, several_params: dict) -> list:
+        """
+        Метод превращает параметры поискового запроса в список условий WHERE по таблице shift_tasks
+        :param several_params: словарь с параметрами поискового запроса
+        :return: список условий
+        """
+        return [
+            cls.FILTER_COLUMNS[param_name] == value
+            for param_name, value in several_params.items()
+            if param_name in cls.FILTER_COLUMNS
+        ]
+
+    #  колонки таблицы shift_tasks в выгрузке
+    EXPORT_COLUMNS = (
+        ShiftTask.id,
+        ShiftTask.closing_status,
+        ShiftTask.closed_at,
+        ShiftTask.view_task_to_shift,
+        ShiftTask.work_center,
+        ShiftTask.line,
+        ShiftTask.shift,
+        ShiftTask.team,
+        ShiftTask.party_number,
+        ShiftTask.party_data,
+        ShiftTask.nomenclature,
+        ShiftTask.code_ekn,
+        ShiftTask.id_of_the_rc,
+        ShiftTask.date_time_shift_start,
+        ShiftTask.date_time_shift_end,
+    )
+
+    @classmethod
+    def build_export_query(cls, several_params: dict) -> Select:
+        """
+        Метод строит запрос для выгрузки сменных заданий по нескольким параметрам.
+        Выбираются только колонки, без создания объектов ShiftTask
+        :param several_params: словарь с параметрами поискового запроса
+        :return: объект запроса Select
+        """
+        stmt = select(*cls.EXPORT_COLUMNS).where(
+            *cls.build_several_params_conditions(several_params)
+        ).order_by(ShiftTask.id)
+        return stmt
+
+    @classmethod
+    def build_several_params_query(
+        cls,
+        several_params: dict,
+        offset: int = 0,
+        limit: int | None = None,
+        after_id: int | None = None,
+    ) -> Select:
+        """
+        Метод строит SQL запрос к таблице shift_tasks по нескольким параметрам.
+        Каждый параметр превращается в условие WHERE, пагинация выполняется на уровне БД
+        :param several_params: словарь с параметрами поискового запроса
+        :param offset: количество пропускаемых записей
+        :param limit: максимальное количество возвращаемых записей
+        :param after_id: id последнего сменного задания предыдущей страницы (keyset пагинация)
+        :return: объект запроса Select
+        """
+        conditions = cls.build_several_params_conditions(several_params)
+
+        #  keyset пагинация по id: глубокие страницы не требуют пропуска offset записей
+        if after_id is not None:
+            conditions.append(ShiftTask.id > after_id)
+
+        stmt = select(ShiftTask).where(*conditions).order_by(ShiftTask.id)
+        if offset:
+            stmt = stmt.offset(offset)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stmt
+
+    @track_dao_method
     async def find_by_several_params(
         self,
         session: AsyncSession,
         several_params: dict,
+        offset: int = 0,
+        limit: int | None = None,
+        after_id: int | None = None,
     ) -> list[ShiftTask] | ErrorResponse:
         """
         Метод находит объекты класса ShiftTask по нескольким параметрам.
-        Возвращает список объектов класса ShiftTask если хотя бы один найден в БД, иначе объект ErrorResponse
+        Фильтрация и пагинация выполняются в БД, из БД берется только запрошенная страница.
+        Возвращает список объектов класса ShiftTask (возможно пустой), иначе объект ErrorResponse
         :param session: объект асинхронной сессии AsyncSession
         :param several_params: словарь с параметрами поискового запроса
+        :param offset: количество пропускаемых записей
+        :param limit: максимальное количество возвращаемых записей
+        :param after_id: id последнего сменного задания предыдущей страницы (keyset пагинация)
         :return: list объектов класса ShiftTask или ErrorResponse
         """
-
-        #  данное решение не является оптимальным с точки зрения использования памяти
-        #  так как из БД берутся все записи, а после происходит их фильтрация python методами
-        #  есть над чем подумать, чтобы фильтрация происходила сразу на уровне БД
-
-        results = await self.find_all(session=session)
-
-        if isinstance(results, list):
-
-            #  немного хардкодинга
-
-            if "closing_status" in several_params:
-                results = [task for task in results if task.closing_status == several_params["closing_status"]]
-            if "party_number" in several_params:
-                results = [task for task in results if task.party_number == several_params["party_number"]]
-            if "party_data" in several_params:
-                results = [task for task in results if task.party_data == several_params["party_data"]]
-            if "shift" in several_params:
-                results = [task for task in results if task.shift == several_params["shift"]]
-            if "team" in several_params:
-                results = [task for task in results if task.team == several_params["team"]]
-            if "nomenclature" in several_params:
-                results = [task for task in results if task.nomenclature == several_params["nomenclature"]]
-            if "code_ekn" in several_params:
-                results = [task for task in results if task.code_ekn == several_params["code_ekn"]]
-            if "id_of_the_rc" in several_params:
-                results = [task for task in results if task.id_of_the_rc == several_params["id_of_the_rc"]]
-            if "date_time_shift_start" in several_params:
-                results = [task for task in results
-                           if task.date_time_shift_start == several_params["date_time_shift_start"]]
-            if "date_time_shift_end" in several_params:
-                results = [task for task in results
-                           if task.date_time_shift_end == several_params["date_time_shift_end"]]
-
-        return results
+        try:
+            stmt = self.build_several_params_query(
+                several_params=several_params,
+                offset=offset,
+                limit=limit,
+                after_id=after_id,
+            )
+            result: Result = await session.execute(stmt)
+            return list(result.scalars().all())
+        except SQLAlchemyError:
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
@@ -0,0 +1,424 @@
+from sqlalchemy import Integer, Result, Select, String, and_, bindparam, column, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+import datetime
+from collections import Counter
+from cache import cache_invalidation_publisher, shift_task_cache, verification_index
+from dao.dao_shift_tasks import DaoShiftTaskRepository
+from dto import ErrorResponse
+from metrics import track_dao_method
+from model.config import settings
+from model.database import db_helper
+from model.models import ShiftTask, UniqueProductCode, UniqueProductIdentifiers, UniqueProductIdentifiersArchive
+
+
+class DaoUniqueProductIdentifiersRepository:
+    """
+    Класс для выполнения основных операций в БД над таблицей UniqueProductIdentifiers
+    """
+
+    @classmethod
+    def get_warm_up_statements(cls) -> list:
+        """
+        Метод возвращает частые запросы к таблице unique_product_identifiers для прогрева соединений
+        при старте приложения. Запросы ничего не меняют в БД: под условия не попадает ни одна строка
+        :return: список запросов
+        """
+        return [
+            cls.build_aggregate_pairs_query(pairs=[(0, "")], now=datetime.datetime.now()),
+            select(UniqueProductIdentifiers).join(
+                UniqueProductCode,
+                and_(
+                    UniqueProductCode.unique_product_code == UniqueProductIdentifiers.unique_product_code,
+                    UniqueProductCode.party_data == UniqueProductIdentifiers.party_data,
+                ),
+            ).where(UniqueProductCode.unique_product_code.in_([""])),
+        ]
+
+    #  колонки в выгрузке уникальных кодов продукции
+    EXPORT_COLUMNS = (
+        UniqueProductIdentifiers.id,
+        UniqueProductIdentifiers.unique_product_code,
+        UniqueProductIdentifiers.shift_task_id,
+        ShiftTask.party_number,
+        ShiftTask.party_data,
+        UniqueProductIdentifiers.is_aggregated,
+        UniqueProductIdentifiers.aggregated_at,
+    )
+
+    @classmethod
+    def build_export_query(cls, several_params: dict) -> Select:
+        """
+        Метод строит запрос для выгрузки уникальных кодов продукции всех сменных заданий,
+        подходящих под параметры поискового запроса GET /shift_task
+        :param several_params: словарь с параметрами поискового запроса по сменным заданиям
+        :return: объект запроса Select
+        """
+        conditions = DaoShiftTaskRepository.build_several_params_conditions(several_params)
+        #  фильтр по ДатаПартии повторяется по колонке секционированной таблицы,
+        #  чтобы PostgreSQL отбросил лишние секции еще при планировании запроса
+        if "party_data" in several_params:
+            conditions.append(UniqueProductIdentifiers.party_data == several_params["party_data"])
+
+        stmt = select(*cls.EXPORT_COLUMNS).join(
+            ShiftTask,
+            and_(
+                UniqueProductIdentifiers.shift_task_id == ShiftTask.id,
+                UniqueProductIdentifiers.party_data == ShiftTask.party_data,
+            ),
+        ).where(*conditions).order_by(UniqueProductIdentifiers.id)
+        return stmt
+
+    @staticmethod
+    @track_dao_method
+    async def bulk_insert_unique_product_identifiers(
+        session: AsyncSession,
+        product_list: list[dict],
+        batch_size: int | None = None,
+    ) -> dict | ErrorResponse:
+        """
+        Метод записывает пачку уникальных кодов продукции в БД одной транзакцией.
+        Все пары НомерПартии и ДатаПартии из пачки находятся одним запросом,
+        коды с несуществующей партией и уже существующие коды игнорируются.
+        Возвращает словарь с количеством записанных и проигнорированных кодов, иначе объект ErrorResponse
+        :param session: объект асинхронной сессии AsyncSession
+        :param product_list: список словарей с полями unique_product_code, party_number, party_data
+        :param batch_size: размер пачки, по умолчанию settings.unique_product_batch_size
+        :return: dict {"inserted": int, "ignored": int} или ErrorResponse
+        """
+        batch_size = batch_size or settings.unique_product_batch_size
+
+        party_keys = {(product["party_number"], product["party_data"]) for product in product_list}
+        shift_task_ids = await DaoShiftTaskRepository.find_ids_by_party_keys(session=session, party_keys=party_keys)
+        if not isinstance(shift_task_ids, dict):
+            return shift_task_ids
+
+        #  повторы кода внутри пачки схлопываются, в БД уходит первый из них
+        rows = {}
+        for product in product_list:
+            shift_task_id = shift_task_ids.get((product["party_number"], product["party_data"]))
+            if shift_task_id is not None and product["unique_product_code"] not in rows:
+                rows[product["unique_product_code"]] = {
+                    "unique_product_code": product["unique_product_code"],
+                    "shift_task_id": shift_task_id,
+                    "party_data": product["party_data"],
+                    "is_aggregated": False,
+                    "aggregated_at": None,
+                }
+        row_list = list(rows.values())
+
+        #  таблица кодов секционирована, поэтому код сначала записывается в реестр:
+        #  ON CONFLICT по первичному ключу реестра отбрасывает коды, которые уже есть в любой секции.
+        #  Строки передаются списком параметров, запросы компилируются один раз на всю загрузку
+        register_stmt = insert(UniqueProductCode).on_conflict_do_nothing(
+            index_elements=[UniqueProductCode.unique_product_code],
+        ).returning(UniqueProductCode.unique_product_code)
+        insert_stmt = insert(UniqueProductIdentifiers)
+        execution_options = {"insertmanyvalues_page_size": batch_size}
+
+        inserted_codes = []
+        try:
+            for start in range(0, len(row_list), batch_size):
+                result = await session.execute(
+                    register_stmt,
+                    [
+                        {"unique_product_code": row["unique_product_code"], "party_data": row["party_data"]}
+                        for row in row_list[start:start + batch_size]
+                    ],
+                    execution_options=execution_options,
+                )
+                registered_codes = result.scalars().all()
+                if registered_codes:
+                    await session.execute(insert_stmt, [rows[code] for code in registered_codes])
+                inserted_codes.extend(registered_codes)
+            #  счетчики кодов меняются в той же транзакции, что и сами коды
+            counted_shift_task_ids = await DaoShiftTaskRepository.increment_counters(
+                session=session,
+                total_codes=Counter(rows[code]["shift_task_id"] for code in inserted_codes),
+            )
+            await cache_invalidation_publisher.publish(session=session, shift_task_ids=counted_shift_task_ids)
+            await session.commit()
+        except SQLAlchemyError:
+            await session.rollback()
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
+
+        shift_task_cache.invalidate_many(counted_shift_task_ids)
+        for code in inserted_codes:
+            verification_index.add(code, rows[code]["shift_task_id"], False)
+
+        inserted = len(inserted_codes)
+        return {"inserted": inserted, "ignored": len(product_list) - inserted}
+
+    @staticmethod
+    @track_dao_method
+    async def warm_up_verification_index(session: AsyncSession, yield_per: int = 50000) -> int | ErrorResponse:
+        """
+        Метод заполняет verification_index всеми кодами из таблицы unique_product_identifiers.
+        Записи читаются серверным курсором пачками по yield_per строк, ORM объекты не создаются
+        :param session: объект асинхронной сессии AsyncSession
+        :param yield_per: размер пачки строк
+        :return: количество загруженных кодов или ErrorResponse
+        """
+        loaded = 0
+        try:
+            stmt = select(
+                UniqueProductIdentifiers.unique_product_code,
+                UniqueProductIdentifiers.shift_task_id,
+                UniqueProductIdentifiers.is_aggregated,
+            ).execution_options(yield_per=yield_per)
+            result = await session.stream(stmt)
+            async for rows in result.partitions():
+                verification_index.add_many(rows)
+                loaded += len(rows)
+        except SQLAlchemyError:
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
+
+        return loaded
+
+    @staticmethod
+    @track_dao_method
+    async def find_verification_entry(
+        session: AsyncSession,
+        unique_product_code: str,
+    ) -> tuple[int, bool] | ErrorResponse:
+        """
+        Метод находит сменное задание уникального кода и признак аггрегации.
+        Сначала код ищется в verification_index, в БД идет запрос только если кода нет в индексе,
+        код, которого нет в рабочей таблице, ищется в архиве. Найденный в БД код добавляется в индекс,
+        только если его там еще нет. Прочитанное с реплики, пока она может отставать от недавней записи,
+        в индекс не добавляется
+        :param session: объект асинхронной сессии AsyncSession
+        :param unique_product_code: уникальный код продукции
+        :return: кортеж (айди сменного задания, аггрегирован ли) или ErrorResponse
+        """
+        entry = verification_index.lookup(unique_product_code)
+        if entry is not None:
+            return entry
+
+        try:
+            stmt = select(
+                UniqueProductIdentifiers.shift_task_id,
+                UniqueProductIdentifiers.is_aggregated,
+            ).join(
+                UniqueProductCode, UniqueProductCode.party_data == UniqueProductIdentifiers.party_data,
+            ).where(
+                UniqueProductCode.unique_product_code == unique_product_code,
+                UniqueProductIdentifiers.unique_product_code == unique_product_code,
+            )
+            row = (await session.execute(stmt)).one_or_none()
+            if row is None:
+                row = (await session.execute(
+                    select(
+                        UniqueProductIdentifiersArchive.shift_task_id,
+                        UniqueProductIdentifiersArchive.is_aggregated,
+                    ).where(UniqueProductIdentifiersArchive.unique_product_code == unique_product_code)
+                )).one_or_none()
+        except SQLAlchemyError:
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
+
+        if row is None:
+            return ErrorResponse(code=404, message=f"Уникальный код продукции {unique_product_code} не найден")
+        #  код, попавший в индекс во время запроса, записан загрузкой или аггрегацией и свежее прочитанного
+        if not (db_helper.replica_router.is_replica(session) and db_helper.replica_router.wrote_recently()):
+            verification_index.add(unique_product_code, row.shift_task_id, row.is_aggregated, overwrite=False)
+        return row.shift_task_id, row.is_aggregated
+
+    @staticmethod
+    def get_aggregation_error(
+        product: UniqueProductIdentifiers | None,
+        shift_task_id: int,
+        unique_product_code: str,
+    ) -> ErrorResponse:
+        """
+        Метод возвращает объект ошибки ErrorResponse для кода продукции, который не удалось аггрегировать
+        :param product: найденный объект класса UniqueProductIdentifiers или None
+        :param shift_task_id: айди сменного задания, к которому аггрегируется код
+        :param unique_product_code: уникальный код продукции
+        :return: объект ErrorResponse
+        """
+        if product is None:
+            return ErrorResponse(code=404, message=f"Уникальный код продукции {unique_product_code} не найден")
+        if product.shift_task_id != shift_task_id:
+            return ErrorResponse(code=400, message="unique code is attached to another batch")
+        return ErrorResponse(code=400, message=f"unique code already used at {product.aggregated_at}")
+
+    @staticmethod
+    @track_dao_method
+    async def find_by_unique_product_codes(
+        session: AsyncSession,
+        unique_product_codes: list[str],
+    ) -> dict[str, UniqueProductIdentifiers] | ErrorResponse:
+        """
+        Метод одним запросом находит объекты класса UniqueProductIdentifiers по списку уникальных кодов.
+        Возвращает словарь {уникальный код: UniqueProductIdentifiers} только для существующих кодов,
+        иначе объект ErrorResponse
+        :param session: объект асинхронной сессии AsyncSession
+        :param unique_product_codes: список уникальных кодов продукции
+        :return: dict или ErrorResponse
+        """
+        try:
+            #  ДатаПартии из реестра позволяет прочитать для каждого кода только его секцию
+            stmt = select(UniqueProductIdentifiers).join(
+                UniqueProductCode,
+                and_(
+                    UniqueProductCode.unique_product_code == UniqueProductIdentifiers.unique_product_code,
+                    UniqueProductCode.party_data == UniqueProductIdentifiers.party_data,
+                ),
+            ).where(UniqueProductCode.unique_product_code.in_(unique_product_codes))
+            result: Result = await session.execute(stmt)
+            return {product.unique_product_code: product for product in result.scalars()}
+        except SQLAlchemyError:
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
+
+    @track_dao_method
+    async def aggregate_unique_product_code(
+        self,
+        session: AsyncSession,
+        shift_task_id: int,
+        unique_product_code: str,
+    ) -> UniqueProductIdentifiers | ErrorResponse:
+        """
+        Метод аггрегирует уникальный код продукции одним условным UPDATE ... RETURNING,
+        поэтому код не может быть аггрегирован дважды при одновременных запросах.
+        Дополнительный запрос к БД выполняется только если аггрегировать код не удалось, чтобы выбрать ошибку.
+        Возвращает объект класса UniqueProductIdentifiers если код аггрегирован, иначе объект ErrorResponse
+        :param session: объект асинхронной сессии AsyncSession
+        :param shift_task_id: айди сменного задания
+        :param unique_product_code: уникальный код продукции
+        :return: объект класса UniqueProductIdentifiers или ErrorResponse
+        """
+        results = await self.aggregate_unique_product_codes(
+            session=session,
+            shift_task_id=shift_task_id,
+            unique_product_codes=[unique_product_code],
+        )
+        if isinstance(results, list):
+            return results[0]
+        return results
+
+    @track_dao_method
+    async def aggregate_unique_product_codes(
+        self,
+        session: AsyncSession,
+        shift_task_id: int,
+        unique_product_codes: list[str],
+    ) -> list[UniqueProductIdentifiers | ErrorResponse] | ErrorResponse:
+        """
+        Метод аггрегирует пачку уникальных кодов продукции одного сменного задания одним условным UPDATE.
+        Для кодов, которые не удалось аггрегировать, ошибки выбираются одним дополнительным запросом.
+        Возвращает список результатов в порядке кодов во входном списке
+        (UniqueProductIdentifiers или ErrorResponse для каждого кода), иначе объект ErrorResponse
+        :param session: объект асинхронной сессии AsyncSession
+        :param shift_task_id: айди сменного задания
+        :param unique_product_codes: список уникальных кодов продукции
+        :return: list или ErrorResponse
+        """
+        return await self.aggregate_unique_product_code_pairs(
+            session=session,
+            pairs=[(shift_task_id, code) for code in unique_product_codes],
+        )
+
+    @staticmethod
+    def build_aggregate_pairs_query(pairs: list[tuple[int, str]], now: datetime.datetime):
+        """
+        Метод строит запрос UPDATE ... FROM unnest(:shift_task_ids, :unique_product_codes) RETURNING,
+        который аггрегирует коды из списка пар (айди сменного задания, уникальный код) при условии,
+        что код принадлежит этой партии и еще не аггрегирован. ДатаПартии кода берется из реестра,
+        поэтому изменяется только его секция. Пары передаются двумя массивами, поэтому текст запроса
+        не зависит от размера пачки и подготовленное выражение asyncpg переиспользуется
+        :param pairs: список пар (айди сменного задания, уникальный код) без повторов
+        :param now: время аггрегации
+        :return: объект запроса Update
+        """
+        requested = func.unnest(
+            bindparam("shift_task_ids", [shift_task_id for shift_task_id, code in pairs], type_=ARRAY(Integer)),
+            bindparam("unique_product_codes", [code for shift_task_id, code in pairs], type_=ARRAY(String)),
+        ).table_valued(
+            column("shift_task_id", Integer),
+            column("unique_product_code", String),
+        ).render_derived(name="requested")
+
+        stmt = update(UniqueProductIdentifiers).where(
+            UniqueProductCode.unique_product_code == requested.c.unique_product_code,
+            UniqueProductIdentifiers.party_data == UniqueProductCode.party_data,
+            UniqueProductIdentifiers.unique_product_code == requested.c.unique_product_code,
+            UniqueProductIdentifiers.shift_task_id == requested.c.shift_task_id,
+            UniqueProductIdentifiers.is_aggregated.is_(False),
+        ).values(
+            is_aggregated=True,
+            aggregated_at=now,
+        ).returning(UniqueProductIdentifiers)
+        return stmt
+
+    @track_dao_method
+    async def aggregate_unique_product_code_pairs(
+        self,
+        session: AsyncSession,
+        pairs: list[tuple[int, str]],
+    ) -> list[UniqueProductIdentifiers | ErrorResponse] | ErrorResponse:
+        """
+        Метод аггрегирует уникальные коды продукции разных сменных заданий одним условным UPDATE
+        в одной транзакции. Для каждой пары результат такой же, как если бы пары аггрегировались
+        отдельными запросами по порядку: повтор пары получает ошибку "already used".
+        Для пар, которые не удалось аггрегировать, ошибки выбираются одним дополнительным запросом.
+        Возвращает список результатов в порядке входного списка
+        (UniqueProductIdentifiers или ErrorResponse для каждой пары), иначе объект ErrorResponse
+        :param session: объект асинхронной сессии AsyncSession
+        :param pairs: список пар (айди сменного задания, уникальный код)
+        :return: list или ErrorResponse
+        """
+        now = datetime.datetime.now()
+        try:
+            stmt = self.build_aggregate_pairs_query(pairs=list(dict.fromkeys(pairs)), now=now)
+            result = await session.scalars(stmt, execution_options={"populate_existing": True})
+            aggregated = {
+                (product.shift_task_id, product.unique_product_code): product for product in result.all()
+            }
+            counted_shift_task_ids = await DaoShiftTaskRepository.increment_counters(
+                session=session,
+                aggregated_codes=Counter(shift_task_id for shift_task_id, code in aggregated),
+                aggregated_at=now,
+            )
+            await cache_invalidation_publisher.publish(
+                session=session,
+                shift_task_ids=counted_shift_task_ids,
+                aggregated=[(code, shift_task_id) for shift_task_id, code in aggregated],
+            )
+            await session.commit()
+        except SQLAlchemyError:
+            await session.rollback()
+            response = ErrorResponse(code=500, message=f"База данных недоступна")
+            return response
+
+        shift_task_cache.invalidate_many(counted_shift_task_ids)
+        for shift_task_id, code in aggregated:
+            verification_index.add(code, shift_task_id, True)
+
+        missed_codes = list({code for shift_task_id, code in pairs if (shift_task_id, code) not in aggregated})
+        found = {}
+        if missed_codes:
+            found = await self.find_by_unique_product_codes(session=session, unique_product_codes=missed_codes)
+            if not isinstance(found, dict):
+                return found
+
+        results = []
+        returned_pairs = set()
+        for pair in pairs:
+            shift_task_id, code = pair
+            product = aggregated.get(pair)
+            #  повтор пары получает ошибку, как если бы пары пришли отдельными запросами
+            if product is not None and pair not in returned_pairs:
+                returned_pairs.add(pair)
+                results.append(product)
+            else:
+                results.append(self.get_aggregation_error(
+                    product=product or found.get(code),
+                    shift_task_id=shift_task_id,
+                    unique_product_code=code,
+                ))
+        return results
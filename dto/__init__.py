@@ -1,9 +1,31 @@
 __all__ = (
+    "AggregationResultDTO",
     "ErrorResponse",
+    "ShiftTaskCreateDTO",
+    "shift_task_create_adapter",
+    "shift_task_create_list_adapter",
     "ShiftTaskDTO",
+    "ShiftTaskUpdateDTO",
+    "UniqueProductCreateDTO",
+    "unique_product_create_adapter",
+    "unique_product_create_list_adapter",
+    "UniqueProductIdentifierDTO",
+    "UniqueProductInsertResultDTO",
+    "VerificationResultDTO",
 
 )
 
 
+from dto.aggregation_result_dto import AggregationResultDTO
 from dto.error_response import ErrorResponse
+from dto.shift_task_create_dto import ShiftTaskCreateDTO
+from dto.shift_task_create_dto import shift_task_create_adapter
+from dto.shift_task_create_dto import shift_task_create_list_adapter
 from dto.shift_task_dto import ShiftTaskDTO
+from dto.shift_task_update_dto import ShiftTaskUpdateDTO
+from dto.unique_product_create_dto import UniqueProductCreateDTO
+from dto.unique_product_create_dto import unique_product_create_adapter
+from dto.unique_product_create_dto import unique_product_create_list_adapter
+from dto.unique_product_identifier_dto import UniqueProductIdentifierDTO
+from dto.unique_product_insert_result_dto import UniqueProductInsertResultDTO
+from dto.verification_result_dto import VerificationResultDTO
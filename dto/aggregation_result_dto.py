@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+from dto.unique_product_identifier_dto import UniqueProductIdentifierDTO
+
+
+class AggregationResultDTO(BaseModel):
+
+    unique_product_code: str
+    code: int
+    message: str | None = None
+    product: UniqueProductIdentifierDTO | None = None
@@ -0,0 +1,36 @@
+import datetime
+from typing import Annotated
+
+from pydantic import AfterValidator, Field, TypeAdapter
+from typing_extensions import TypedDict
+
+
+def drop_timezone(value: datetime.datetime) -> datetime.datetime:
+    return value.replace(tzinfo=None)
+
+
+#  время смены хранится без часового пояса, смещение из корпоративной системы заказчика отбрасывается
+NaiveDatetime = Annotated[datetime.datetime, AfterValidator(drop_timezone)]
+
+
+#  результат проверки - словарь, который собирает pydantic-core, он передается в DAO без промежуточных моделей,
+#  смещение часового пояса отбрасывает DaoShiftTaskRepository.bulk_upsert_shift_tasks одним проходом по пачке
+class ShiftTaskCreateDTO(TypedDict):
+
+    closing_status: Annotated[bool, Field(validation_alias="СтатусЗакрытия")]
+    view_task_to_shift: Annotated[str, Field(max_length=100, validation_alias="ПредставлениеЗаданияНаСмену")]
+    line: Annotated[str, Field(max_length=100, validation_alias="Линия")]
+    shift: Annotated[str, Field(max_length=100, validation_alias="Смена")]
+    team: Annotated[str, Field(max_length=100, validation_alias="Бригада")]
+    party_number: Annotated[int, Field(validation_alias="НомерПартии")]
+    party_data: Annotated[datetime.date, Field(validation_alias="ДатаПартии")]
+    nomenclature: Annotated[str, Field(max_length=100, validation_alias="Номенклатура")]
+    code_ekn: Annotated[str, Field(max_length=100, validation_alias="КодЕКН")]
+    id_of_the_rc: Annotated[str, Field(max_length=100, validation_alias="ИдентификаторРЦ")]
+    date_time_shift_start: Annotated[datetime.datetime, Field(validation_alias="ДатаВремяНачалаСмены")]
+    date_time_shift_end: Annotated[datetime.datetime, Field(validation_alias="ДатаВремяОкончанияСмены")]
+
+
+#  валидаторы собираются один раз, вся пачка проверяется одним вызовом pydantic-core
+shift_task_create_adapter = TypeAdapter(ShiftTaskCreateDTO)
+shift_task_create_list_adapter = TypeAdapter(list[ShiftTaskCreateDTO])
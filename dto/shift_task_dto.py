@@ -1,9 +1,10 @@
 import datetime
 
-from pydantic import BaseModel, Field
+from pydantic import AliasPath, BaseModel, ConfigDict, Field
 
 
 class ShiftTaskDTO(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
 
     closing_status: bool = Field(..., serialization_alias="СтатусЗакрытия")
     view_task_to_shift: str = Field(..., serialization_alias="ПредставлениеЗаданияНаСмену")
@@ -17,3 +18,24 @@ class ShiftTaskDTO(BaseModel):
     id_of_the_rc: str = Field(..., serialization_alias="ИдентификаторРЦ")
     date_time_shift_start: datetime.datetime = Field(..., serialization_alias="ДатаВремяНачалаСмены")
     date_time_shift_end: datetime.datetime = Field(..., serialization_alias="ДатаВремяОкончанияСмены")
+    #  счетчики кодов продукции берутся из ShiftTask.counters, у задания без кодов строки счетчиков нет
+    total_codes: int = Field(
+        default=0,
+        validation_alias=AliasPath("counters", "total_codes"),
+        serialization_alias="КоличествоКодов",
+    )
+    aggregated_codes: int = Field(
+        default=0,
+        validation_alias=AliasPath("counters", "aggregated_codes"),
+        serialization_alias="КоличествоАггрегированныхКодов",
+    )
+    first_aggregated_at: datetime.datetime | None = Field(
+        default=None,
+        validation_alias=AliasPath("counters", "first_aggregated_at"),
+        serialization_alias="ДатаВремяПервойАггрегации",
+    )
+    last_aggregated_at: datetime.datetime | None = Field(
+        default=None,
+        validation_alias=AliasPath("counters", "last_aggregated_at"),
+        serialization_alias="ДатаВремяПоследнейАггрегации",
+    )
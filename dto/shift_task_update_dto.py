@@ -0,0 +1,22 @@
+import datetime
+
+from pydantic import BaseModel, Field
+
+from dto.shift_task_create_dto import NaiveDatetime
+
+
+class ShiftTaskUpdateDTO(BaseModel):
+
+    closing_status: bool | None = None
+    view_task_to_shift: str | None = Field(None, max_length=100)
+    work_center: str | None = Field(None, max_length=100)
+    line: str | None = Field(None, max_length=100)
+    shift: str | None = Field(None, max_length=100)
+    team: str | None = Field(None, max_length=100)
+    party_number: int | None = None
+    party_data: datetime.date | None = None
+    nomenclature: str | None = Field(None, max_length=100)
+    code_ekn: str | None = Field(None, max_length=100)
+    id_of_the_rc: str | None = Field(None, max_length=100)
+    date_time_shift_start: NaiveDatetime | None = None
+    date_time_shift_end: NaiveDatetime | None = None
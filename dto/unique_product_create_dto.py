@@ -0,0 +1,17 @@
+import datetime
+from typing import Annotated
+
+from pydantic import Field, TypeAdapter
+from typing_extensions import TypedDict
+
+
+#  результат проверки - словарь, который собирает pydantic-core, он передается в DAO без промежуточных моделей
+class UniqueProductCreateDTO(TypedDict):
+
+    unique_product_code: Annotated[str, Field(min_length=1, max_length=100, validation_alias="УникальныйКодПродукта")]
+    party_number: Annotated[int, Field(validation_alias="НомерПартии")]
+    party_data: Annotated[datetime.date, Field(validation_alias="ДатаПартии")]
+
+
+unique_product_create_adapter = TypeAdapter(UniqueProductCreateDTO)
+unique_product_create_list_adapter = TypeAdapter(list[UniqueProductCreateDTO])
@@ -0,0 +1,11 @@
+import datetime
+
+from pydantic import BaseModel
+
+
+class UniqueProductIdentifierDTO(BaseModel):
+
+    unique_product_code: str
+    shift_task_id: int
+    is_aggregated: bool
+    aggregated_at: datetime.datetime | None
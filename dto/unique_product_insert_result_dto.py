@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class UniqueProductInsertResultDTO(BaseModel):
+
+    inserted: int
+    ignored: int
+    codes_per_second: float
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class VerificationResultDTO(BaseModel):
+
+    unique_product_code: str
+    shift_task_id: int
+    belongs: bool
+    is_aggregated: bool
@@ -1,12 +1,86 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
+from prometheus_client import REGISTRY
+from cache import cache_invalidation_listener
+from dao import DaoShiftTaskRepository, DaoUniqueProductIdentifiersRepository
 from exception import ShiftTaskException
-from view import shift_task_router
+from metrics import DbInstrumentation, PoolCollector, PrometheusMiddleware
+from model import ReadYourWritesMiddleware, db_helper, settings
+from profiling import ProfilingMiddleware, SamplingProfiler, SlowQueryProfiler, profile_store, slow_query_log
+from service import aggregation_batcher, partition_manager, shift_task_archiver
+from view import admin_router, cache_router, export_router, metrics_router, shift_task_router, unique_product_identifiers_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    #  подписка на события других процессов до заполнения кешей, чтобы не пропустить изменения между ними.
+    #  Заполнение перезаписывает записи кешей строками снимка, поэтому события применяются после него
+    if settings.cache_invalidation_enabled:
+        cache_invalidation_listener.hold_events()
+        await cache_invalidation_listener.start()
+    await db_helper.warm_up(
+        connections=settings.db_warm_up_connections,
+        statements=[
+            *DaoShiftTaskRepository.get_warm_up_statements(),
+            *DaoUniqueProductIdentifiersRepository.get_warm_up_statements(),
+        ],
+    )
+    async with db_helper.session_factory() as session:
+        await DaoShiftTaskRepository.warm_up_batch_key_resolver(session=session)
+        if settings.verification_index_enabled:
+            await DaoUniqueProductIdentifiersRepository.warm_up_verification_index(session=session)
+    if settings.cache_invalidation_enabled:
+        cache_invalidation_listener.release_events()
+    if settings.aggregation_batching_enabled:
+        aggregation_batcher.start()
+    if settings.partition_manager_enabled:
+        partition_manager.start()
+    if settings.archive_enabled:
+        shift_task_archiver.start()
+    yield
+    await shift_task_archiver.stop()
+    await partition_manager.stop()
+    await aggregation_batcher.stop()
+    await cache_invalidation_listener.stop()
+    await db_helper.dispose()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.include_router(shift_task_router)
+app.include_router(unique_product_identifiers_router)
+app.include_router(export_router)
+app.include_router(cache_router)
+app.include_router(admin_router)
+app.add_middleware(ReadYourWritesMiddleware, replica_router=db_helper.replica_router)
+
+if settings.metrics_enabled:
+    for engine in db_helper.engines.values():
+        DbInstrumentation(engine=engine).instrument()
+    REGISTRY.register(PoolCollector(engines=db_helper.engines))
+    app.add_middleware(PrometheusMiddleware)
+    app.include_router(metrics_router)
+
+if settings.slow_query_enabled:
+    for engine in db_helper.engines.values():
+        SlowQueryProfiler(
+            engine=engine,
+            slow_query_log=slow_query_log,
+            threshold_ms=settings.slow_query_threshold_ms,
+            sample_rate=settings.slow_query_explain_sample_rate,
+            explain_timeout=settings.db_command_timeout,
+        ).instrument()
+
+if settings.profiling_enabled and (settings.admin_token is not None or settings.profiling_sample_rate > 0):
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=SamplingProfiler(interval=settings.profiling_interval_ms / 1000),
+        profile_store=profile_store,
+        token=settings.admin_token,
+        sample_rate=settings.profiling_sample_rate,
+    )
 
 
 @app.exception_handler(ShiftTaskException)
@@ -0,0 +1,16 @@
+__all__ = (
+    "current_dao_method",
+    "DEFAULT_DAO_METHOD",
+    "DbInstrumentation",
+    "PoolCollector",
+    "PrometheusMiddleware",
+    "track_dao_method",
+)
+
+
+from metrics.dao_method_tracker import current_dao_method
+from metrics.dao_method_tracker import DEFAULT_DAO_METHOD
+from metrics.dao_method_tracker import track_dao_method
+from metrics.db_instrumentation import DbInstrumentation
+from metrics.pool_collector import PoolCollector
+from metrics.prometheus_middleware import PrometheusMiddleware
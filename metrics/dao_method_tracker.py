@@ -0,0 +1,28 @@
+import functools
+from contextvars import ContextVar
+
+
+#  метод DAO, который сейчас выполняется в этой задаче, по нему размечаются метрики запросов к БД,
+#  запросы вне методов DAO относятся к DEFAULT_DAO_METHOD
+DEFAULT_DAO_METHOD = "other"
+current_dao_method: ContextVar[str] = ContextVar("current_dao_method", default=DEFAULT_DAO_METHOD)
+
+
+def track_dao_method(func):
+    """
+    Декоратор асинхронного метода DAO: на время выполнения метода запросы к БД
+    относятся в метриках к этому методу
+    :param func: асинхронный метод DAO
+    :return: обернутый метод
+    """
+    dao_method = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = current_dao_method.set(dao_method)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            current_dao_method.reset(token)
+
+    return wrapper
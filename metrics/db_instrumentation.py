@@ -0,0 +1,72 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from metrics.dao_method_tracker import current_dao_method
+from metrics.prometheus_metrics import db_errors_total, db_pool_checkout_wait_seconds, db_query_duration_seconds
+
+
+class DbInstrumentation:
+    """
+    Подключает метрики к движку SQLAlchemy через события: время запросов по методу DAO,
+    время получения соединения из пула и ошибки БД по типу
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        """
+        :param engine: асинхронный движок SQLAlchemy
+        """
+        self.engine = engine
+
+    @staticmethod
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @staticmethod
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started_at = conn.info["query_started_at"].pop()
+        db_query_duration_seconds.labels(current_dao_method.get()).observe(time.perf_counter() - started_at)
+
+    @staticmethod
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started_at"):
+            connection.info["query_started_at"].pop()
+        error = exception_context.original_exception
+        db_errors_total.labels(current_dao_method.get(), type(error).__name__).inc()
+
+    def instrument_pool_checkout(self) -> None:
+        """
+        Метод оборачивает pool.connect, чтобы измерять ожидание свободного соединения.
+        У пула нет события до выдачи соединения, поэтому замеряется сам вызов
+        :return: None
+        """
+        pool = self.engine.sync_engine.pool
+        connect = pool.connect
+        dbapi_error = self.engine.sync_engine.dialect.loaded_dbapi.Error
+
+        def timed_connect():
+            started_at = time.perf_counter()
+            try:
+                return connect()
+            except Exception as error:
+                #  ошибки драйвера учтет handle_error, а сетевые ошибки до него не доходят
+                if not isinstance(error, dbapi_error):
+                    db_errors_total.labels(current_dao_method.get(), type(error).__name__).inc()
+                raise
+            finally:
+                db_pool_checkout_wait_seconds.observe(time.perf_counter() - started_at)
+
+        pool.connect = timed_connect
+
+    def instrument(self) -> None:
+        """
+        Метод подписывается на события движка
+        :return: None
+        """
+        sync_engine = self.engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self.after_cursor_execute)
+        event.listen(sync_engine, "handle_error", self.handle_error)
+        self.instrument_pool_checkout()
@@ -0,0 +1,39 @@
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+
+class PoolCollector(Collector):
+    """
+    Состояние пула соединений для /metrics. Читается только в момент запроса метрик,
+    поэтому ничего не стоит при обработке запросов
+    """
+
+    def __init__(self, engines: dict[str, AsyncEngine]):
+        """
+        :param engines: словарь {имя: асинхронный движок SQLAlchemy}, имя попадает в метку engine
+        """
+        self.engines = engines
+
+    def collect(self):
+        families = {
+            "size": GaugeMetricFamily("db_pool_size", "Размер пула соединений", labels=["engine"]),
+            "checkedout": GaugeMetricFamily(
+                "db_pool_checked_out", "Количество выданных соединений", labels=["engine"],
+            ),
+            "checkedin": GaugeMetricFamily(
+                "db_pool_checked_in", "Количество свободных соединений в пуле", labels=["engine"],
+            ),
+            "overflow": GaugeMetricFamily(
+                "db_pool_overflow", "Количество соединений сверх размера пула", labels=["engine"],
+            ),
+        }
+        for name, engine in self.engines.items():
+            #  пул берется на каждый сбор, так как engine.dispose() заменяет его новым
+            pool = engine.sync_engine.pool
+            if not isinstance(pool, QueuePool):
+                continue
+            for method, family in families.items():
+                family.add_metric([name], getattr(pool, method)())
+        yield from families.values()
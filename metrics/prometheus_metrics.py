@@ -0,0 +1,39 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+
+#  границы бакетов в секундах: от долей миллисекунды для запросов к БД до секунд для массовой загрузки
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+http_requests_total = Counter(
+    "http_requests_total",
+    "Количество HTTP запросов",
+    ["method", "route", "status"],
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP запроса",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress",
+    "Количество HTTP запросов в обработке",
+    ["method", "route"],
+)
+
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds",
+    "Время выполнения запроса к БД по методу DAO",
+    ["dao_method"],
+    buckets=LATENCY_BUCKETS,
+)
+db_pool_checkout_wait_seconds = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Время получения соединения из пула, включая установку нового соединения",
+    buckets=LATENCY_BUCKETS,
+)
+db_errors_total = Counter(
+    "db_errors_total",
+    "Количество ошибок БД по методу DAO и типу ошибки",
+    ["dao_method", "error_type"],
+)
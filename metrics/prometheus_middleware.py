@@ -0,0 +1,61 @@
+import time
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metrics.prometheus_metrics import http_request_duration_seconds, http_requests_in_progress, http_requests_total
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware с метриками HTTP запросов: количество, время обработки и запросы в обработке.
+    Запросы размечаются шаблоном пути (/shift_task/{id}), а не самим путем,
+    чтобы количество временных рядов не росло вместе с количеством id
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    @staticmethod
+    def get_route_template(scope: Scope) -> str:
+        """
+        Метод находит шаблон пути, под который попадает запрос, так же, как это делает роутер
+        :param scope: ASGI scope запроса
+        :return: шаблон пути или "unmatched"
+        """
+        partial_route = None
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial_route is None:
+                partial_route = route.path
+        return partial_route or "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self.get_route_template(scope)
+        #  если ответ так и не начался, приложение упало с необработанным исключением
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = http_requests_in_progress.labels(method, route)
+        in_progress.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            in_progress.dec()
+            status = str(status_code)
+            http_requests_total.labels(method, route, status).inc()
+            http_request_duration_seconds.labels(method, route, status).observe(elapsed)
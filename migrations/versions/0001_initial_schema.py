@@ -0,0 +1,56 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "shift_tasks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("closing_status", sa.Boolean(), nullable=False),
+        sa.Column("closed_at", sa.DateTime(), nullable=True),
+        sa.Column("view_task_to_shift", sa.String(length=100), nullable=False),
+        sa.Column("work_center", sa.String(length=100), nullable=False),
+        sa.Column("line", sa.String(length=100), nullable=False),
+        sa.Column("shift", sa.String(length=100), nullable=False),
+        sa.Column("team", sa.String(length=100), nullable=False),
+        sa.Column("party_number", sa.Integer(), nullable=False),
+        sa.Column("party_data", sa.Date(), nullable=False),
+        sa.Column("nomenclature", sa.String(length=100), nullable=False),
+        sa.Column("code_ekn", sa.String(length=100), nullable=False),
+        sa.Column("id_of_the_rc", sa.String(length=100), nullable=False),
+        sa.Column("date_time_shift_start", sa.DateTime(), nullable=False),
+        sa.Column("date_time_shift_end", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("party_number", "party_data", name="unique_shift_task"),
+    )
+    op.create_table(
+        "unique_product_identifiers",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("unique_product_code", sa.String(length=100), nullable=False),
+        sa.Column("shift_task_id", sa.Integer(), nullable=False),
+        sa.Column("is_aggregated", sa.Boolean(), nullable=False),
+        sa.Column("aggregated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["shift_task_id"], ["shift_tasks.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("unique_product_code"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("unique_product_identifiers")
+    op.drop_table("shift_tasks")
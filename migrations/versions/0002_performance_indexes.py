@@ -0,0 +1,86 @@
+"""performance indexes
+
+Индексы под фильтры GET /shift_task и под аггрегацию продукции.
+Индексы по фильтрам составные (колонка, id): они отдают строки уже в порядке id,
+поэтому запрос с фильтром, ORDER BY id и LIMIT / keyset пагинацией читает только одну страницу.
+Индексы создаются через CREATE INDEX CONCURRENTLY вне транзакции и не блокируют запись в таблицы.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:05:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SHIFT_TASK_FILTER_COLUMNS = (
+    "closing_status",
+    "party_data",
+    "shift",
+    "team",
+    "nomenclature",
+    "code_ekn",
+    "id_of_the_rc",
+    "date_time_shift_start",
+    "date_time_shift_end",
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in SHIFT_TASK_FILTER_COLUMNS:
+            op.create_index(
+                f"ix_shift_tasks_{column}_id",
+                "shift_tasks",
+                [column, "id"],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+        op.create_index(
+            "ix_unique_product_identifiers_shift_task_id",
+            "unique_product_identifiers",
+            ["shift_task_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_unique_product_identifiers_not_aggregated",
+            "unique_product_identifiers",
+            ["shift_task_id", "unique_product_code"],
+            postgresql_where=sa.text("NOT is_aggregated"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_unique_product_identifiers_not_aggregated",
+            table_name="unique_product_identifiers",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_unique_product_identifiers_shift_task_id",
+            table_name="unique_product_identifiers",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        for column in reversed(SHIFT_TASK_FILTER_COLUMNS):
+            op.drop_index(
+                f"ix_shift_tasks_{column}_id",
+                table_name="shift_tasks",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,31 @@
+"""shift task version
+
+Колонка version для оптимистичной блокировки PUT /shift_task/{id} через ETag / If-Match.
+ADD COLUMN с константным DEFAULT в PostgreSQL 11+ не переписывает таблицу.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "shift_tasks",
+        sa.Column("version", sa.Integer(), server_default=sa.text("1"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("shift_tasks", "version")
@@ -0,0 +1,170 @@
+"""partition unique_product_identifiers
+
+Таблица unique_product_identifiers пересоздается секционированной по диапазонам ДатаПартии (party_data):
+одна секция на месяц и секция DEFAULT. ДатаПартии копируется в коды из сменных заданий.
+Уникальный индекс на секционированной таблице обязан включать ключ секционирования,
+поэтому глобальную уникальность кода обеспечивает реестр unique_product_codes.
+Миграция копирует все коды и держит блокировку таблицы до конца, выполнять в окно обслуживания.
+Дальше секции создает и отсоединяет service/partition_manager.py.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 16:20:00
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONTHS_AHEAD = 3
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    op.drop_index("ix_unique_product_identifiers_not_aggregated", table_name="unique_product_identifiers")
+    op.drop_index("ix_unique_product_identifiers_shift_task_id", table_name="unique_product_identifiers")
+    op.rename_table("unique_product_identifiers", "unique_product_identifiers_flat")
+    op.execute(
+        "ALTER TABLE unique_product_identifiers_flat "
+        "RENAME CONSTRAINT unique_product_identifiers_pkey TO unique_product_identifiers_flat_pkey"
+    )
+    op.execute(
+        "ALTER TABLE unique_product_identifiers_flat RENAME CONSTRAINT "
+        "unique_product_identifiers_unique_product_code_key TO unique_product_identifiers_flat_unique_product_code_key"
+    )
+
+    op.create_table(
+        "unique_product_identifiers",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('unique_product_identifiers_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("party_data", sa.Date(), nullable=False),
+        sa.Column("unique_product_code", sa.String(length=100), nullable=False),
+        sa.Column("shift_task_id", sa.Integer(), nullable=False),
+        sa.Column("is_aggregated", sa.Boolean(), nullable=False),
+        sa.Column("aggregated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["shift_task_id"], ["shift_tasks.id"]),
+        sa.PrimaryKeyConstraint("id", "party_data"),
+        postgresql_partition_by="RANGE (party_data)",
+    )
+    op.execute("ALTER SEQUENCE unique_product_identifiers_id_seq OWNED BY unique_product_identifiers.id")
+    op.create_table(
+        "unique_product_codes",
+        sa.Column("unique_product_code", sa.String(length=100), nullable=False),
+        sa.Column("party_data", sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint("unique_product_code"),
+    )
+
+    #  месячные секции от самой ранней партии с кодами до MONTHS_AHEAD месяцев после текущего месяца
+    #  при генерации SQL без подключения к БД диапазон дат неизвестен, коды прошлых месяцев попадут в DEFAULT,
+    #  секции для них создаст и перенесет в них строки service/partition_manager.py
+    first_day, last_day = None, None
+    if not context.is_offline_mode():
+        first_day, last_day = op.get_bind().execute(sa.text(
+            "SELECT min(shift_tasks.party_data), max(shift_tasks.party_data) "
+            "FROM unique_product_identifiers_flat "
+            "JOIN shift_tasks ON shift_tasks.id = unique_product_identifiers_flat.shift_task_id"
+        )).one()
+    today = datetime.date.today().replace(day=1)
+    month = min(first_day or today, today).replace(day=1)
+    last_month = add_months(max(last_day or today, today).replace(day=1), MONTHS_AHEAD)
+    while month <= last_month:
+        next_month = add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE unique_product_identifiers_p{month:%Y_%m} PARTITION OF unique_product_identifiers "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+    op.execute("CREATE TABLE unique_product_identifiers_default PARTITION OF unique_product_identifiers DEFAULT")
+
+    op.execute(
+        "INSERT INTO unique_product_identifiers "
+        "(id, party_data, unique_product_code, shift_task_id, is_aggregated, aggregated_at) "
+        "SELECT flat.id, shift_tasks.party_data, flat.unique_product_code, flat.shift_task_id, "
+        "flat.is_aggregated, flat.aggregated_at "
+        "FROM unique_product_identifiers_flat AS flat "
+        "JOIN shift_tasks ON shift_tasks.id = flat.shift_task_id"
+    )
+    op.execute(
+        "INSERT INTO unique_product_codes (unique_product_code, party_data) "
+        "SELECT unique_product_code, party_data FROM unique_product_identifiers"
+    )
+
+    #  индексы строятся после копирования, на каждой секции создается свой индекс
+    op.create_index(
+        "ix_unique_product_identifiers_unique_product_code",
+        "unique_product_identifiers",
+        ["unique_product_code"],
+    )
+    op.create_index("ix_unique_product_identifiers_shift_task_id", "unique_product_identifiers", ["shift_task_id"])
+    op.create_index(
+        "ix_unique_product_identifiers_not_aggregated",
+        "unique_product_identifiers",
+        ["shift_task_id", "unique_product_code"],
+        postgresql_where=sa.text("NOT is_aggregated"),
+    )
+
+    op.drop_table("unique_product_identifiers_flat")
+    op.execute("ANALYZE unique_product_identifiers")
+    op.execute("ANALYZE unique_product_codes")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_unique_product_identifiers_not_aggregated", table_name="unique_product_identifiers")
+    op.drop_index("ix_unique_product_identifiers_shift_task_id", table_name="unique_product_identifiers")
+    op.drop_index("ix_unique_product_identifiers_unique_product_code", table_name="unique_product_identifiers")
+    op.rename_table("unique_product_identifiers", "unique_product_identifiers_partitioned")
+    op.execute(
+        "ALTER TABLE unique_product_identifiers_partitioned "
+        "RENAME CONSTRAINT unique_product_identifiers_pkey TO unique_product_identifiers_partitioned_pkey"
+    )
+
+    op.create_table(
+        "unique_product_identifiers",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('unique_product_identifiers_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("unique_product_code", sa.String(length=100), nullable=False),
+        sa.Column("shift_task_id", sa.Integer(), nullable=False),
+        sa.Column("is_aggregated", sa.Boolean(), nullable=False),
+        sa.Column("aggregated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["shift_task_id"], ["shift_tasks.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("unique_product_code"),
+    )
+    op.execute("ALTER SEQUENCE unique_product_identifiers_id_seq OWNED BY unique_product_identifiers.id")
+    op.execute(
+        "INSERT INTO unique_product_identifiers (id, unique_product_code, shift_task_id, is_aggregated, aggregated_at) "
+        "SELECT id, unique_product_code, shift_task_id, is_aggregated, aggregated_at "
+        "FROM unique_product_identifiers_partitioned"
+    )
+    op.create_index("ix_unique_product_identifiers_shift_task_id", "unique_product_identifiers", ["shift_task_id"])
+    op.create_index(
+        "ix_unique_product_identifiers_not_aggregated",
+        "unique_product_identifiers",
+        ["shift_task_id", "unique_product_code"],
+        postgresql_where=sa.text("NOT is_aggregated"),
+    )
+
+    #  удаление секционированной таблицы удаляет и все ее секции
+    op.drop_table("unique_product_identifiers_partitioned")
+    op.drop_table("unique_product_codes")
@@ -0,0 +1,77 @@
+"""shift task archive
+
+Архивные таблицы для закрытых сменных заданий и их кодов продукции.
+Строки переносит service/shift_task_archiver.py пачками, таблицы создаются пустыми.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 18:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "shift_tasks_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("closing_status", sa.Boolean(), nullable=False),
+        sa.Column("closed_at", sa.DateTime(), nullable=True),
+        sa.Column("view_task_to_shift", sa.String(length=100), nullable=False),
+        sa.Column("work_center", sa.String(length=100), nullable=False),
+        sa.Column("line", sa.String(length=100), nullable=False),
+        sa.Column("shift", sa.String(length=100), nullable=False),
+        sa.Column("team", sa.String(length=100), nullable=False),
+        sa.Column("party_number", sa.Integer(), nullable=False),
+        sa.Column("party_data", sa.Date(), nullable=False),
+        sa.Column("nomenclature", sa.String(length=100), nullable=False),
+        sa.Column("code_ekn", sa.String(length=100), nullable=False),
+        sa.Column("id_of_the_rc", sa.String(length=100), nullable=False),
+        sa.Column("date_time_shift_start", sa.DateTime(), nullable=False),
+        sa.Column("date_time_shift_end", sa.DateTime(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "unique_product_identifiers_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("party_data", sa.Date(), nullable=False),
+        sa.Column("unique_product_code", sa.String(length=100), nullable=False),
+        sa.Column("shift_task_id", sa.Integer(), nullable=False),
+        sa.Column("is_aggregated", sa.Boolean(), nullable=False),
+        sa.Column("aggregated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_unique_product_identifiers_archive_shift_task_id",
+        "unique_product_identifiers_archive",
+        ["shift_task_id"],
+    )
+    op.create_index(
+        "ix_unique_product_identifiers_archive_unique_product_code",
+        "unique_product_identifiers_archive",
+        ["unique_product_code"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_unique_product_identifiers_archive_unique_product_code",
+        table_name="unique_product_identifiers_archive",
+    )
+    op.drop_index(
+        "ix_unique_product_identifiers_archive_shift_task_id",
+        table_name="unique_product_identifiers_archive",
+    )
+    op.drop_table("unique_product_identifiers_archive")
+    op.drop_table("shift_tasks_archive")
@@ -0,0 +1,49 @@
+"""shift task counters
+
+Счетчики кодов продукции сменных заданий: всего кодов, аггрегировано кодов, время первой и последней
+аггрегации. Дальше счетчики изменяют загрузка и аггрегация кодов в своих транзакциях,
+пересчитать их заново: python -m model.repair_shift_task_counters.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 20:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "shift_task_counters",
+        sa.Column("shift_task_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("total_codes", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("aggregated_codes", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("first_aggregated_at", sa.DateTime(), nullable=True),
+        sa.Column("last_aggregated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("shift_task_id"),
+    )
+    op.execute(
+        "INSERT INTO shift_task_counters "
+        "(shift_task_id, total_codes, aggregated_codes, first_aggregated_at, last_aggregated_at) "
+        "SELECT shift_task_id, count(*), count(*) FILTER (WHERE is_aggregated), min(aggregated_at), max(aggregated_at) "
+        "FROM ("
+        "SELECT shift_task_id, is_aggregated, aggregated_at FROM unique_product_identifiers "
+        "UNION ALL "
+        "SELECT shift_task_id, is_aggregated, aggregated_at FROM unique_product_identifiers_archive"
+        ") AS codes "
+        "GROUP BY shift_task_id"
+    )
+    op.execute("ANALYZE shift_task_counters")
+
+
+def downgrade() -> None:
+    op.drop_table("shift_task_counters")
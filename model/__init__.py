@@ -1,14 +1,24 @@
 __all__ = (
     "Base",
     "db_helper",
+    "ReadYourWritesMiddleware",
     "settings",
     "ShiftTask",
+    "ShiftTaskArchive",
+    "ShiftTaskCounters",
+    "UniqueProductCode",
     "UniqueProductIdentifiers",
+    "UniqueProductIdentifiersArchive",
 )
 
 
 from model.database import Base
 from model.database import db_helper
+from model.read_your_writes_middleware import ReadYourWritesMiddleware
 from model.config import settings
 from model.models import ShiftTask
+from model.models import ShiftTaskArchive
+from model.models import ShiftTaskCounters
+from model.models import UniqueProductCode
 from model.models import UniqueProductIdentifiers
+from model.models import UniqueProductIdentifiersArchive
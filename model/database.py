@@ -1,9 +1,14 @@
+import asyncio
+import logging
 from asyncio import current_task
 
+from fastapi import Request
+from sqlalchemy import Executable
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, async_scoped_session, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, async_scoped_session, AsyncEngine, AsyncSession
 
 from model.config import settings
+from model.replica_router import ReplicaRouter
 
 
 class Base(DeclarativeBase):
@@ -13,11 +18,52 @@ class Base(DeclarativeBase):
 
 
 class DataBaseHelper:
-    def __init__(self, url: str, echo: bool = False):
-        self.engine = create_async_engine(
-            url=url,
+    def __init__(
+        self,
+        url: str,
+        echo: bool = False,
+        log_level: str | None = None,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30.0,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        prepared_statement_cache_size: int = 100,
+        command_timeout: float | None = None,
+        replica_urls: list[str] | None = None,
+        sticky_window: float = 5.0,
+    ):
+        """
+        :param url: адрес БД
+        :param echo: логировать ли все запросы
+        :param log_level: уровень логирования sqlalchemy.engine
+        :param pool_size: количество постоянных соединений в пуле
+        :param max_overflow: количество дополнительных соединений сверх pool_size
+        :param pool_timeout: сколько секунд ждать свободное соединение
+        :param pool_recycle: через сколько секунд пересоздавать соединение, -1 - никогда
+        :param pool_pre_ping: проверять ли соединение перед выдачей из пула
+        :param prepared_statement_cache_size: размер кеша подготовленных выражений asyncpg на одно соединение
+        :param command_timeout: таймаут выполнения запроса в секундах
+        :param replica_urls: адреса реплик только для чтения, пул у каждой реплики такой же, как у основной БД
+        :param sticky_window: сколько секунд клиент хранит позицию своей записи и читает только догнавшие ее реплики
+        """
+        if log_level is not None:
+            logging.getLogger("sqlalchemy.engine").setLevel(log_level)
+
+        connect_args = {"prepared_statement_cache_size": prepared_statement_cache_size}
+        if command_timeout is not None:
+            connect_args["command_timeout"] = command_timeout
+
+        engine_options = dict(
             echo=echo,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            connect_args=connect_args,
         )
+        self.engine = create_async_engine(url=url, **engine_options)
         self.session_factory = async_sessionmaker(
             bind=self.engine,
             autoflush=False,
@@ -25,6 +71,36 @@ class DataBaseHelper:
             expire_on_commit=False,
         )
 
+        self.replica_engines = [
+            create_async_engine(url=replica_url, **engine_options) for replica_url in replica_urls or ()
+        ]
+        replica_session_factories = [
+            async_sessionmaker(
+                bind=replica_engine,
+                autoflush=False,
+                autocommit=False,
+                expire_on_commit=False,
+                info={"replica": True},
+            )
+            for replica_engine in self.replica_engines
+        ]
+        self.replica_router = ReplicaRouter(
+            primary_session_factory=self.session_factory,
+            replica_session_factories=replica_session_factories,
+            sticky_window=sticky_window,
+        )
+
+    @property
+    def engines(self) -> dict[str, AsyncEngine]:
+        """
+        Все движки: основная БД и реплики, например для подключения метрик
+        :return: словарь {имя: движок}
+        """
+        engines = {"primary": self.engine}
+        for number, replica_engine in enumerate(self.replica_engines):
+            engines[f"replica_{number}"] = replica_engine
+        return engines
+
     async def get_scoped_session(self):
         session = async_scoped_session(
             session_factory=self.session_factory,
@@ -33,14 +109,71 @@ class DataBaseHelper:
         return session
 
     async def session_dependency(self) -> AsyncSession:
+        """
+        Сессия основной БД. Позицию записи клиенту возвращает ReadYourWritesMiddleware
+        """
         async with self.session_factory() as session:
             yield session
             await session.close()
 
+    async def read_session_dependency(self, request: Request) -> AsyncSession:
+        """
+        Сессия для запросов только на чтение: реплика по очереди или основная БД,
+        если реплик нет или ни одна реплика еще не воспроизвела последнюю запись клиента
+        """
+        session_factory = await self.replica_router.get_read_session_factory(
+            self.replica_router.get_required_lsn(request),
+        )
+        async with session_factory() as session:
+            yield session
+            await session.close()
+
     async def scoped_session_dependency(self) -> AsyncSession:
         session = self.get_scoped_session()
         yield session
         session.close()
 
+    async def warm_up(self, connections: int, statements: list[Executable]) -> None:
+        """
+        Метод заранее открывает соединения пула и на каждом из них выполняет частые запросы,
+        чтобы первые запросы после старта не тратили время на установку соединения и подготовку выражений.
+        Запросы выполняются в транзакции, которая откатывается
+        :param connections: количество соединений
+        :param statements: список частых запросов
+        :return: None
+        """
+        async def warm_up_connection():
+            async with self.engine.connect() as connection:
+                transaction = await connection.begin()
+                try:
+                    for statement in statements:
+                        await connection.execute(statement)
+                finally:
+                    await transaction.rollback()
+
+        #  соединения открываются одновременно и после выхода из контекста остаются в пуле
+        await asyncio.gather(*(warm_up_connection() for _ in range(connections)))
+
+    async def dispose(self) -> None:
+        """
+        Метод закрывает соединения основной БД и всех реплик
+        :return: None
+        """
+        for engine in self.engines.values():
+            await engine.dispose()
+
 
-db_helper = DataBaseHelper(url=settings.data_base_url, echo=settings.db_echo)
+db_helper = DataBaseHelper(
+    url=settings.data_base_url,
+    echo=settings.db_echo,
+    log_level=settings.db_log_level,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    prepared_statement_cache_size=settings.db_prepared_statement_cache_size,
+    command_timeout=settings.db_command_timeout,
+    replica_urls=settings.db_replica_urls,
+    sticky_window=settings.db_sticky_window,
+)
@@ -1,11 +1,11 @@
 import asyncio
 import datetime
 
-from sqlalchemy import select, and_
-
+from dao import DaoUniqueProductIdentifiersRepository
 from model.database import Base, db_helper
-from model.models import ShiftTask, UniqueProductIdentifiers
+from model.models import ShiftTask
 from model.static_data_for_db import shift_tasks, unique_product_identifiers
+from service import partition_manager
 
 
 engine = db_helper.engine
@@ -24,15 +24,29 @@ class CreateTablesDataBase:
     @staticmethod
     async def create_tables():
         """
-        Метод создает две таблицы в базе данных product_release_control:
+        Метод создает таблицы в базе данных product_release_control:
         shift_tasks - таблица с данными по сменным заданиям
-        unique_product_identifiers - таблица с данными по уникальным айди продукции
+        unique_product_identifiers - таблица с данными по уникальным айди продукции, секция DEFAULT
+        и месячные секции на partition_months_ahead месяцев вперед
+        unique_product_codes - реестр уникальных кодов продукции
+        shift_task_counters - счетчики кодов продукции сменных заданий
         :return: None
         """
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.drop_all)
             await conn.run_sync(Base.metadata.create_all)
 
+        #  ошибка одного DDL в транзакции прервала бы ее целиком, поэтому секции создаются после коммита
+        #  на отдельном соединении в режиме AUTOCOMMIT, как при фоновом обслуживании
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            today = datetime.date.today()
+            await partition_manager.create_partitions(
+                conn,
+                first_day=today,
+                last_day=partition_manager.add_months(today.replace(day=1), partition_manager.months_ahead),
+            )
+
     @staticmethod
     async def insert_data_shift_tasks():
         task_list = [
@@ -60,45 +74,27 @@ class CreateTablesDataBase:
             session.add_all(task_list)
             await session.commit()
 
-    async def insert_data_unique_product_identifiers(self):
-        unique_product_identifier_list = []
-
-        for product_identifier in unique_product_identifiers:
-            party_number = product_identifier["НомерПартии"]
-            party_data = datetime.datetime.strptime(product_identifier["ДатаПартии"], "%Y-%m-%d").date()
+    @staticmethod
+    async def insert_data_unique_product_identifiers():
+        product_list = [
+            {
+                "unique_product_code": product_identifier["УникальныйКодПродукта"],
+                "party_number": product_identifier["НомерПартии"],
+                "party_data": datetime.datetime.strptime(product_identifier["ДатаПартии"], "%Y-%m-%d").date(),
+            }
+            for product_identifier in unique_product_identifiers
+        ]
 
-            shift_task = await self.find_unique_shift_task(
-                party_number=party_number,
-                party_data=party_data,
+        async with session_factory() as session:
+            result = await DaoUniqueProductIdentifiersRepository.bulk_insert_unique_product_identifiers(
+                session=session,
+                product_list=product_list,
             )
 
-            if type(shift_task) is ShiftTask:
-                new_product = UniqueProductIdentifiers(
-                    unique_product_code=product_identifier["УникальныйКодПродукта"],
-                    shift_task_id=shift_task.id,
-                    is_aggregated=False,
-                    aggregated_at=None
-                )
-                unique_product_identifier_list.append(new_product)
-
-        if unique_product_identifier_list:
-            async with session_factory() as session:
-                session.add_all(unique_product_identifier_list)
-                await session.commit()
+        if isinstance(result, dict):
+            print(f"Записано уникальных кодов продукции: {result['inserted']}, пропущено: {result['ignored']}")
         else:
-            print("unique_product_identifier_list пустой вышел!!!!")
-
-    @staticmethod
-    async def find_unique_shift_task(party_number: int, party_data: datetime.date) -> ShiftTask | None:
-        async with session_factory() as session:
-            query = select(ShiftTask).where(and_(
-                ShiftTask.party_number == party_number,
-                ShiftTask.party_data == party_data
-                )
-            )
-            result = await session.execute(query)
-            shift_task = result.scalars().one()
-            return shift_task if shift_task else None
+            print(result)
 
     async def main(self):
         """
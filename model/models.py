@@ -1,6 +1,6 @@
 import datetime
 
-from sqlalchemy import String, ForeignKey, UniqueConstraint
+from sqlalchemy import String, ForeignKey, Index, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from model.database import Base
@@ -10,10 +10,20 @@ class ShiftTask(Base):
     __tablename__ = "shift_tasks"
     __table_args__ = (
         UniqueConstraint("party_number", "party_data", name="unique_shift_task"),
+        #  индексы под фильтры GET /shift_task, см. migrations/versions/0002_performance_indexes.py
+        Index("ix_shift_tasks_closing_status_id", "closing_status", "id"),
+        Index("ix_shift_tasks_party_data_id", "party_data", "id"),
+        Index("ix_shift_tasks_shift_id", "shift", "id"),
+        Index("ix_shift_tasks_team_id", "team", "id"),
+        Index("ix_shift_tasks_nomenclature_id", "nomenclature", "id"),
+        Index("ix_shift_tasks_code_ekn_id", "code_ekn", "id"),
+        Index("ix_shift_tasks_id_of_the_rc_id", "id_of_the_rc", "id"),
+        Index("ix_shift_tasks_date_time_shift_start_id", "date_time_shift_start", "id"),
+        Index("ix_shift_tasks_date_time_shift_end_id", "date_time_shift_end", "id"),
     )
 
     closing_status: Mapped[bool]
-    closed_at: Mapped[datetime.time | None] = mapped_column(default=None)
+    closed_at: Mapped[datetime.datetime | None] = mapped_column(default=None)
     view_task_to_shift: Mapped[str] = mapped_column(String(100))
     work_center: Mapped[str] = mapped_column(String(100), default="Какой-то рабочий центр")
     line: Mapped[str] = mapped_column(String(100))
@@ -26,12 +36,118 @@ class ShiftTask(Base):
     id_of_the_rc: Mapped[str] = mapped_column(String(100))
     date_time_shift_start: Mapped[datetime.datetime]
     date_time_shift_end: Mapped[datetime.datetime]
+    #  версия для оптимистичной блокировки, увеличивается каждым UPDATE, отдается в ETag
+    version: Mapped[int] = mapped_column(default=1, server_default=text("1"))
+    #  счетчики кодов продукции читаются вторым запросом по id всех загруженных заданий сразу
+    counters: Mapped["ShiftTaskCounters | None"] = relationship(
+        primaryjoin="ShiftTask.id == foreign(ShiftTaskCounters.shift_task_id)",
+        lazy="selectin",
+        viewonly=True,
+    )
 
 
 class UniqueProductIdentifiers(Base):
+    """
+    Таблица секционирована по диапазонам ДатаПартии: одна секция на месяц, секции создает и отсоединяет
+    service/partition_manager.py. Уникальность кода по всем секциям обеспечивает реестр UniqueProductCode
+    """
     __tablename__ = "unique_product_identifiers"
+    __table_args__ = (
+        Index("ix_unique_product_identifiers_unique_product_code", "unique_product_code"),
+        Index("ix_unique_product_identifiers_shift_task_id", "shift_task_id"),
+        Index(
+            "ix_unique_product_identifiers_not_aggregated",
+            "shift_task_id",
+            "unique_product_code",
+            postgresql_where=text("NOT is_aggregated"),
+        ),
+        {"postgresql_partition_by": "RANGE (party_data)"},
+    )
 
-    unique_product_code: Mapped[str] = mapped_column(String(100), unique=True)
+    #  первичный ключ секционированной таблицы обязан включать ключ секционирования
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    party_data: Mapped[datetime.date] = mapped_column(primary_key=True)
+    unique_product_code: Mapped[str] = mapped_column(String(100))
     shift_task_id: Mapped[int] = mapped_column(ForeignKey("shift_tasks.id"))
     is_aggregated: Mapped[bool] = mapped_column(default=False)
     aggregated_at: Mapped[datetime.datetime | None] = mapped_column(default=None)
+
+
+class UniqueProductCode(Base):
+    """
+    Реестр уникальных кодов продукции: глобальная уникальность кода и ДатаПартии его секции
+    в unique_product_identifiers, чтобы поиск по коду читал только одну секцию
+    """
+    __tablename__ = "unique_product_codes"
+
+    id = None
+    unique_product_code: Mapped[str] = mapped_column(String(100), primary_key=True)
+    party_data: Mapped[datetime.date]
+
+
+class ShiftTaskArchive(Base):
+    """
+    Архив закрытых сменных заданий, которые перенес service/shift_task_archiver.py.
+    Колонки и id те же, что в ShiftTask, поэтому GET /shift_task/{id} отдает задание из архива без изменений
+    """
+    __tablename__ = "shift_tasks_archive"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    closing_status: Mapped[bool]
+    closed_at: Mapped[datetime.datetime | None]
+    view_task_to_shift: Mapped[str] = mapped_column(String(100))
+    work_center: Mapped[str] = mapped_column(String(100))
+    line: Mapped[str] = mapped_column(String(100))
+    shift: Mapped[str] = mapped_column(String(100))
+    team: Mapped[str] = mapped_column(String(100))
+    party_number: Mapped[int]
+    party_data: Mapped[datetime.date]
+    nomenclature: Mapped[str] = mapped_column(String(100))
+    code_ekn: Mapped[str] = mapped_column(String(100))
+    id_of_the_rc: Mapped[str] = mapped_column(String(100))
+    date_time_shift_start: Mapped[datetime.datetime]
+    date_time_shift_end: Mapped[datetime.datetime]
+    version: Mapped[int]
+    archived_at: Mapped[datetime.datetime]
+    counters: Mapped["ShiftTaskCounters | None"] = relationship(
+        primaryjoin="ShiftTaskArchive.id == foreign(ShiftTaskCounters.shift_task_id)",
+        lazy="selectin",
+        viewonly=True,
+    )
+
+
+class UniqueProductIdentifiersArchive(Base):
+    """
+    Архив уникальных кодов продукции архивных сменных заданий. Коды остаются в реестре UniqueProductCode,
+    поэтому код из архива нельзя загрузить повторно
+    """
+    __tablename__ = "unique_product_identifiers_archive"
+    __table_args__ = (
+        Index("ix_unique_product_identifiers_archive_shift_task_id", "shift_task_id"),
+        Index("ix_unique_product_identifiers_archive_unique_product_code", "unique_product_code"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    party_data: Mapped[datetime.date]
+    unique_product_code: Mapped[str] = mapped_column(String(100))
+    shift_task_id: Mapped[int]
+    is_aggregated: Mapped[bool]
+    aggregated_at: Mapped[datetime.datetime | None]
+
+
+class ShiftTaskCounters(Base):
+    """
+    Счетчики уникальных кодов продукции сменного задания: сколько кодов загружено и сколько аггрегировано.
+    Изменяются на разницу в той же транзакции, что загрузка и аггрегация кодов, поэтому не требуют
+    COUNT(*) по unique_product_identifiers. Строка появляется с первым кодом задания и остается
+    при переносе задания в архив. Пересчитать счетчики по кодам: python -m model.repair_shift_task_counters
+    """
+    __tablename__ = "shift_task_counters"
+
+    id = None
+    #  без внешнего ключа: у архивного задания тот же id, но строки в shift_tasks уже нет
+    shift_task_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    total_codes: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    aggregated_codes: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    first_aggregated_at: Mapped[datetime.datetime | None] = mapped_column(default=None)
+    last_aggregated_at: Mapped[datetime.datetime | None] = mapped_column(default=None)
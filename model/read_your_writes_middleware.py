@@ -0,0 +1,52 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from model.replica_router import ReplicaRouter
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware, которое отдает клиенту позицию его записи для ReplicaRouter.
+    Когда начинается ответ на изменяющий запрос, запись уже закоммичена: текущий LSN основной БД
+    возвращается в заголовке X-Db-Write-Lsn и в cookie на sticky_window секунд.
+    Без реплик позиция не запрашивается, запись только отмечается для ReplicaRouter.wrote_recently
+    """
+
+    READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, app: ASGIApp, replica_router: ReplicaRouter):
+        """
+        :param app: следующее ASGI приложение
+        :param replica_router: маршрутизатор чтения по репликам
+        """
+        self.app = app
+        self.replica_router = replica_router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in self.READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        self.replica_router.mark_write()
+
+        async def send_with_write_lsn(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                #  окно отсчитывается от конца записи, а не от начала запроса
+                self.replica_router.mark_write()
+                lsn = await self.replica_router.fetch_write_lsn() if self.replica_router.enabled else None
+                if lsn is not None:
+                    value = self.replica_router.format_lsn(lsn)
+                    cookie = (
+                        f"{ReplicaRouter.WRITE_LSN_COOKIE}={value}; Max-Age={int(self.replica_router.sticky_window)}; "
+                        f"Path=/; HttpOnly; SameSite=Lax"
+                    )
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", ()),
+                            (ReplicaRouter.WRITE_LSN_HEADER.encode(), value.encode()),
+                            (b"set-cookie", cookie.encode()),
+                        ],
+                    }
+            await send(message)
+
+        await self.app(scope, receive, send_with_write_lsn)
@@ -0,0 +1,37 @@
+"""
+Пересчет счетчиков кодов продукции сменных заданий (таблица shift_task_counters) по самим кодам
+в рабочей и архивной таблицах. Нужен, если счетчики разошлись с кодами, например после загрузки
+кодов в обход приложения. На время пересчета загрузка и аггрегация кодов ждут его окончания.
+
+    python -m model.repair_shift_task_counters
+    python -m model.repair_shift_task_counters --shift-task-id 1 --shift-task-id 2
+"""
+import argparse
+import asyncio
+
+from dao import DaoShiftTaskRepository
+from model.database import db_helper
+
+
+async def main(shift_task_ids: list[int] | None = None) -> None:
+    async with db_helper.session_factory() as session:
+        result = await DaoShiftTaskRepository().repair_counters(session=session, shift_task_ids=shift_task_ids)
+
+    if isinstance(result, dict):
+        print(f"Исправлено счетчиков: {result['repaired']}, удалено: {result['deleted']}")
+    else:
+        print(result)
+    await db_helper.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--shift-task-id",
+        type=int,
+        action="append",
+        dest="shift_task_ids",
+        help="айди сменного задания, можно указать несколько раз, по умолчанию все задания",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(shift_task_ids=args.shift_task_ids))
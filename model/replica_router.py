@@ -0,0 +1,158 @@
+import itertools
+import logging
+import time
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRouter:
+    """
+    Выбор БД для читающих запросов: реплики по очереди (round-robin), а для клиента,
+    который недавно писал в основную БД, - реплика, которая уже воспроизвела его запись, иначе основная БД,
+    чтобы клиент сразу видел свои изменения несмотря на отставание реплик (read-your-writes).
+    Позиция записи (LSN основной БД после записи) хранится не в процессе, а у клиента:
+    ответ на изменяющий запрос возвращает ее в cookie и заголовке, клиент присылает ее с чтением,
+    поэтому гарантия не зависит от того, какой процесс приложения обработает запрос
+    """
+
+    WRITE_LSN_COOKIE = "db_write_lsn"
+    WRITE_LSN_HEADER = "x-db-write-lsn"
+
+    def __init__(
+        self,
+        primary_session_factory: async_sessionmaker[AsyncSession],
+        replica_session_factories: list[async_sessionmaker[AsyncSession]],
+        sticky_window: float,
+    ):
+        """
+        :param primary_session_factory: фабрика сессий основной БД
+        :param replica_session_factories: фабрики сессий реплик
+        :param sticky_window: сколько секунд клиент хранит позицию своей записи
+        """
+        self.primary_session_factory = primary_session_factory
+        self.replica_session_factories = replica_session_factories
+        self.sticky_window = sticky_window
+        self._replica_indexes = itertools.cycle(range(len(replica_session_factories)))
+        #  последняя известная позиция воспроизведения каждой реплики, только растет
+        self._replay_lsn = [0] * len(replica_session_factories)
+        self._last_any_write_at = float("-inf")
+        self.primary_reads = 0
+        self.replica_reads = 0
+        self.lagging_reads = 0
+
+    @staticmethod
+    def parse_lsn(value: str | None) -> int | None:
+        """
+        Метод переводит LSN PostgreSQL вида 16/B374D848 в число
+        :param value: LSN строкой
+        :return: int или None, если строка не LSN
+        """
+        if not value:
+            return None
+        high, separator, low = value.partition("/")
+        try:
+            return (int(high, 16) << 32) | int(low, 16) if separator else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def format_lsn(lsn: int) -> str:
+        return f"{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}"
+
+    @classmethod
+    def get_required_lsn(cls, request: Request) -> int | None:
+        """
+        Метод возвращает позицию последней записи клиента из заголовка X-Db-Write-Lsn или cookie
+        :param request: объект запроса
+        :return: LSN или None, если клиент недавно не писал
+        """
+        return cls.parse_lsn(request.headers.get(cls.WRITE_LSN_HEADER) or request.cookies.get(cls.WRITE_LSN_COOKIE))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replica_session_factories)
+
+    def mark_write(self) -> None:
+        self._last_any_write_at = time.monotonic()
+
+    def wrote_recently(self) -> bool:
+        """
+        Метод проверяет, была ли запись в основную БД через этот процесс в пределах окна.
+        В это время данные с реплик могут отставать, и их не стоит класть в общие кеши
+        :return: bool
+        """
+        return time.monotonic() - self._last_any_write_at < self.sticky_window
+
+    async def fetch_write_lsn(self) -> int | None:
+        """
+        Метод возвращает текущую позицию журнала основной БД, она не меньше позиции уже закоммиченных записей
+        :return: LSN или None, если основная БД недоступна
+        """
+        try:
+            async with self.primary_session_factory() as session:
+                return self.parse_lsn(await session.scalar(text("SELECT pg_current_wal_lsn()::text")))
+        except (SQLAlchemyError, OSError):
+            logger.warning("Позиция записи основной БД не получена", exc_info=True)
+            return None
+
+    async def fetch_replay_lsn(self, index: int) -> int:
+        """
+        Метод перечитывает позицию воспроизведения журнала реплики
+        :param index: номер реплики
+        :return: последняя известная позиция реплики
+        """
+        try:
+            async with self.replica_session_factories[index]() as session:
+                lsn = self.parse_lsn(await session.scalar(text("SELECT pg_last_wal_replay_lsn()::text")))
+        except (SQLAlchemyError, OSError):
+            logger.warning("Позиция реплики %s не получена", index, exc_info=True)
+            lsn = None
+        if lsn is not None and lsn > self._replay_lsn[index]:
+            self._replay_lsn[index] = lsn
+        return self._replay_lsn[index]
+
+    async def get_read_session_factory(self, required_lsn: int | None = None) -> async_sessionmaker[AsyncSession]:
+        """
+        Метод выбирает фабрику сессий для читающего запроса клиента: реплику по очереди,
+        если клиент недавно писал - реплику, которая уже воспроизвела позицию его записи.
+        Позиции реплик кешируются, за один выбор перечитывается не больше одной
+        :param required_lsn: позиция последней записи клиента или None
+        :return: фабрика сессий реплики или основной БД
+        """
+        if not self.enabled:
+            self.primary_reads += 1
+            return self.primary_session_factory
+
+        index = next(self._replica_indexes)
+        if required_lsn is not None:
+            count = len(self.replica_session_factories)
+            candidates = [(index + offset) % count for offset in range(count)]
+            caught_up = [candidate for candidate in candidates if self._replay_lsn[candidate] >= required_lsn]
+            if caught_up:
+                index = caught_up[0]
+            elif await self.fetch_replay_lsn(index) < required_lsn:
+                self.lagging_reads += 1
+                self.primary_reads += 1
+                return self.primary_session_factory
+
+        self.replica_reads += 1
+        return self.replica_session_factories[index]
+
+    @staticmethod
+    def is_replica(session: AsyncSession) -> bool:
+        return session.info.get("replica", False)
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self.replica_session_factories),
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+            "lagging_reads": self.lagging_reads,
+            "replay_lsn": [self.format_lsn(lsn) for lsn in self._replay_lsn],
+        }
@@ -0,0 +1,421 @@
+"""
+Генератор синтетических данных для БД в объеме, близком к production.
+
+Генерирует сменные задания и уникальные коды продукции с заданными кардинальностями
+(линии, смены, бригады, номенклатура, рабочие центры), перекосом распределения кодов по партиям
+и долей агрегированных кодов. Данные загружаются через COPY параллельными пачками:
+пачки генерируются в пуле процессов, каждая пачка пишется через свое соединение.
+Результат детерминирован от --seed и --chunk-size и не зависит от --workers.
+
+    python -m model.synthetic_data_generator --tasks 100000 --codes 10000000 --seed 1 --recreate
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import os
+import random
+import string
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import and_, select
+
+from dao import DaoShiftTaskRepository
+from model.database import db_helper
+from model.insert_data_db import CreateTablesDataBase
+from model.models import ShiftTask, ShiftTaskCounters, UniqueProductCode, UniqueProductIdentifiers
+from service import partition_manager
+
+
+engine = db_helper.engine
+
+SHIFT_TASK_COLUMNS = (
+    "closing_status",
+    "closed_at",
+    "view_task_to_shift",
+    "work_center",
+    "line",
+    "shift",
+    "team",
+    "party_number",
+    "party_data",
+    "nomenclature",
+    "code_ekn",
+    "id_of_the_rc",
+    "date_time_shift_start",
+    "date_time_shift_end",
+)
+UNIQUE_PRODUCT_COLUMNS = ("unique_product_code", "shift_task_id", "is_aggregated", "aggregated_at", "party_data")
+UNIQUE_PRODUCT_CODE_COLUMNS = ("unique_product_code", "party_data")
+
+CODE_ALPHABET = string.digits + string.ascii_letters
+CODE_LENGTH = 11
+#  нечетный множитель: умножение по модулю 2**64 - биекция, поэтому коды уникальны, но не идут подряд
+CODE_MULTIPLIER = 0x9E3779B97F4A7C15
+CODE_MASK = 2 ** 64 - 1
+
+
+@dataclass
+class GeneratorConfig:
+    seed: int = 1
+    tasks: int = 10000
+    codes: int = 1000000
+    lines: int = 10
+    shifts: int = 2
+    teams: int = 8
+    nomenclatures: int = 200
+    work_centers: int = 5
+    days: int = 365
+    skew: float = 1.1
+    aggregation_ratio: float = 0.5
+    closed_ratio: float = 0.3
+    party_number_start: int = 1
+    start_date: datetime.date = datetime.date(2024, 1, 1)
+    chunk_size: int = 100000
+
+
+def zipf_cum_weights(size: int, skew: float, rng: random.Random) -> list[float]:
+    """
+    Функция строит накопленные веса распределения Ципфа для size элементов.
+    Веса перемешиваются, чтобы самые частые элементы не шли первыми по порядку
+    :param size: количество элементов
+    :param skew: показатель перекоса, 0 - равномерное распределение
+    :param rng: генератор случайных чисел
+    :return: список накопленных весов для random.choices
+    """
+    weights = [1 / (rank ** skew) for rank in range(1, size + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+def encode_unique_product_code(index: int, salt: int) -> str:
+    """
+    Функция превращает порядковый номер кода в уникальную строку из цифр и латинских букв
+    :param index: порядковый номер кода
+    :param salt: соль, зависящая от seed
+    :return: уникальный код продукции
+    """
+    value = ((index + salt) * CODE_MULTIPLIER) & CODE_MASK
+    chars = []
+    for _ in range(CODE_LENGTH):
+        value, remainder = divmod(value, len(CODE_ALPHABET))
+        chars.append(CODE_ALPHABET[remainder])
+    return "".join(chars)
+
+
+#  состояние процесса-генератора, заполняется один раз в init_worker
+_worker_state = {}
+
+
+def init_worker(config: dict, task_ids: list[int], shift_starts: list[datetime.datetime], shift_hours: int):
+    config = GeneratorConfig(**config)
+    _worker_state["config"] = config
+    _worker_state["task_ids"] = task_ids
+    _worker_state["shift_starts"] = shift_starts
+    _worker_state["shift_seconds"] = shift_hours * 3600
+    if task_ids:
+        _worker_state["task_cum_weights"] = zipf_cum_weights(
+            len(task_ids), config.skew, random.Random(f"{config.seed}:task_skew"),
+        )
+    _worker_state["nomenclature_cum_weights"] = zipf_cum_weights(
+        config.nomenclatures, config.skew, random.Random(f"{config.seed}:nomenclature_skew"),
+    )
+    _worker_state["salt"] = random.Random(f"{config.seed}:salt").getrandbits(32) << 32
+
+
+def generate_shift_task_chunk(chunk_index: int) -> list[tuple]:
+    """
+    Функция генерирует пачку сменных заданий с номером chunk_index
+    :param chunk_index: номер пачки
+    :return: список строк в порядке SHIFT_TASK_COLUMNS
+    """
+    config = _worker_state["config"]
+    rng = random.Random(f"{config.seed}:shift_tasks:{chunk_index}")
+    nomenclature_cum_weights = _worker_state["nomenclature_cum_weights"]
+    shift_hours = 24 // config.shifts
+    tasks_per_day = -(-config.tasks // config.days)
+
+    records = []
+    start = chunk_index * config.chunk_size
+    for index in range(start, min(start + config.chunk_size, config.tasks)):
+        party_number = config.party_number_start + index
+        party_data = config.start_date + datetime.timedelta(days=index // tasks_per_day)
+        shift = rng.randrange(config.shifts)
+        shift_start = datetime.datetime.combine(party_data, datetime.time()) + datetime.timedelta(
+            hours=shift * shift_hours,
+        )
+        shift_end = shift_start + datetime.timedelta(hours=shift_hours)
+        nomenclature = rng.choices(range(config.nomenclatures), cum_weights=nomenclature_cum_weights)[0]
+        work_center = rng.randrange(config.work_centers)
+        closing_status = rng.random() < config.closed_ratio
+        records.append((
+            closing_status,
+            shift_end if closing_status else None,
+            f"Задание на смену {party_number}",
+            f"Рабочий центр {work_center + 1}",
+            f"Т{rng.randrange(config.lines) + 1}",
+            str(shift + 1),
+            f"Бригада №{rng.randrange(config.teams) + 1}",
+            party_number,
+            party_data,
+            f"Номенклатура {nomenclature + 1}",
+            str(100000 + nomenclature),
+            string.ascii_uppercase[work_center % len(string.ascii_uppercase)],
+            shift_start,
+            shift_end,
+        ))
+    return records
+
+
+def generate_unique_product_chunk(chunk_index: int) -> list[tuple]:
+    """
+    Функция генерирует пачку уникальных кодов продукции с номером chunk_index.
+    Партия для каждого кода выбирается с перекосом по распределению Ципфа
+    :param chunk_index: номер пачки
+    :return: список строк в порядке UNIQUE_PRODUCT_COLUMNS
+    """
+    config = _worker_state["config"]
+    task_ids = _worker_state["task_ids"]
+    shift_starts = _worker_state["shift_starts"]
+    shift_seconds = _worker_state["shift_seconds"]
+    salt = _worker_state["salt"]
+    rng = random.Random(f"{config.seed}:unique_product_identifiers:{chunk_index}")
+
+    start = chunk_index * config.chunk_size
+    stop = min(start + config.chunk_size, config.codes)
+    task_indexes = rng.choices(
+        range(len(task_ids)), cum_weights=_worker_state["task_cum_weights"], k=stop - start,
+    )
+
+    records = []
+    for index, task_index in zip(range(start, stop), task_indexes):
+        is_aggregated = rng.random() < config.aggregation_ratio
+        aggregated_at = None
+        if is_aggregated:
+            aggregated_at = shift_starts[task_index] + datetime.timedelta(seconds=rng.randrange(shift_seconds))
+        records.append((
+            encode_unique_product_code(index, salt),
+            task_ids[task_index],
+            is_aggregated,
+            aggregated_at,
+            #  смена начинается в день партии, поэтому дата начала смены - ДатаПартии
+            shift_starts[task_index].date(),
+        ))
+    return records
+
+
+class SyntheticDataGenerator:
+    def __init__(self, config: GeneratorConfig, workers: int):
+        """
+        :param config: параметры генерации
+        :param workers: количество процессов-генераторов и одновременных COPY
+        """
+        self.config = config
+        self.workers = workers
+
+    async def copy_chunks(
+        self,
+        executor: ProcessPoolExecutor,
+        table: str,
+        columns: tuple,
+        rows: int,
+        generate,
+        also_copy: tuple = (),
+    ):
+        """
+        Метод генерирует и загружает через COPY все пачки одной таблицы,
+        одновременно в работе не больше self.workers пачек
+        :param executor: пул процессов с инициализированным состоянием
+        :param table: имя таблицы
+        :param columns: колонки таблицы в порядке строк пачки
+        :param rows: общее количество строк
+        :param generate: функция генерации пачки по ее номеру
+        :param also_copy: кортежи (таблица, колонки, функция от строк пачки) для таблиц,
+            строки которых получаются из той же пачки
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.workers)
+        started_at = time.perf_counter()
+
+        async def copy_chunk(chunk_index: int):
+            async with semaphore:
+                records = await loop.run_in_executor(executor, generate, chunk_index)
+                async with engine.connect() as connection:
+                    raw_connection = await connection.get_raw_connection()
+                    await raw_connection.driver_connection.copy_records_to_table(
+                        table, records=records, columns=columns,
+                    )
+                    for extra_table, extra_columns, project in also_copy:
+                        await raw_connection.driver_connection.copy_records_to_table(
+                            extra_table, records=project(records), columns=extra_columns,
+                        )
+
+        chunk_count = -(-rows // self.config.chunk_size)
+        await asyncio.gather(*(copy_chunk(chunk_index) for chunk_index in range(chunk_count)))
+
+        elapsed = time.perf_counter() - started_at
+        print(f"{table}: записано {rows} строк за {elapsed:.1f} с ({rows / max(elapsed, 1e-9):.0f} строк/с)")
+
+    async def fetch_shift_tasks(self) -> tuple[list[int], list[datetime.datetime]]:
+        """
+        Метод читает id и начало смены записанных сменных заданий в порядке их генерации
+        :return: кортеж из списка id и списка начала смен
+        """
+        config = self.config
+        last_party_number = config.party_number_start + config.tasks - 1
+        stmt = select(
+            ShiftTask.id, ShiftTask.party_number, ShiftTask.party_data, ShiftTask.date_time_shift_start,
+        ).where(and_(
+            ShiftTask.party_number.between(config.party_number_start, last_party_number),
+            ShiftTask.party_data.between(
+                config.start_date, config.start_date + datetime.timedelta(days=config.days),
+            ),
+        ))
+
+        tasks_per_day = -(-config.tasks // config.days)
+        task_ids = [0] * config.tasks
+        shift_starts = [None] * config.tasks
+        async with engine.connect() as connection:
+            result = await connection.stream(stmt)
+            async for task_id, party_number, party_data, shift_start in result:
+                index = party_number - config.party_number_start
+                #  пара НомерПартии и ДатаПартии уникальна, чужие партии с тем же номером пропускаются
+                if party_data == config.start_date + datetime.timedelta(days=index // tasks_per_day):
+                    task_ids[index] = task_id
+                    shift_starts[index] = shift_start
+        return task_ids, shift_starts
+
+    @staticmethod
+    async def drop_indexes(table) -> None:
+        async with engine.begin() as connection:
+            for index in table.indexes:
+                await connection.run_sync(index.drop, checkfirst=True)
+
+    @staticmethod
+    async def create_indexes(table) -> None:
+        async with engine.begin() as connection:
+            for index in table.indexes:
+                await connection.run_sync(index.create, checkfirst=True)
+
+    async def main(self, recreate: bool = False, defer_indexes: bool = True):
+        """
+        Метод генерирует и загружает сменные задания, а затем уникальные коды продукции
+        :param recreate: пересоздать таблицы перед загрузкой, все данные будут удалены
+        :param defer_indexes: удалить вторичные индексы на время загрузки и построить их после
+        :return: None
+        """
+        config = self.config
+        if recreate:
+            await CreateTablesDataBase.create_tables()
+
+        #  секции создаются в режиме AUTOCOMMIT: ошибка одного DDL не прерывает создание остальных
+        async with engine.connect() as connection:
+            connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            await partition_manager.create_partitions(
+                connection,
+                first_day=config.start_date,
+                last_day=config.start_date + datetime.timedelta(days=config.days),
+            )
+
+        tables = (ShiftTask.__table__, UniqueProductIdentifiers.__table__, UniqueProductCode.__table__)
+        if defer_indexes:
+            for table in tables:
+                await self.drop_indexes(table)
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.workers, initializer=init_worker, initargs=(asdict(config), [], [], 0),
+            ) as executor:
+                await self.copy_chunks(
+                    executor, ShiftTask.__tablename__, SHIFT_TASK_COLUMNS, config.tasks, generate_shift_task_chunk,
+                )
+
+            task_ids, shift_starts = await self.fetch_shift_tasks()
+            if config.codes and task_ids:
+                with ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=init_worker,
+                    initargs=(asdict(config), task_ids, shift_starts, 24 // config.shifts),
+                ) as executor:
+                    await self.copy_chunks(
+                        executor,
+                        UniqueProductIdentifiers.__tablename__,
+                        UNIQUE_PRODUCT_COLUMNS,
+                        config.codes,
+                        generate_unique_product_chunk,
+                        also_copy=((
+                            UniqueProductCode.__tablename__,
+                            UNIQUE_PRODUCT_CODE_COLUMNS,
+                            lambda records: [(record[0], record[4]) for record in records],
+                        ),),
+                    )
+        finally:
+            if defer_indexes:
+                started_at = time.perf_counter()
+                for table in tables:
+                    await self.create_indexes(table)
+                print(f"Индексы построены за {time.perf_counter() - started_at:.1f} с")
+
+        #  коды загружены через COPY в обход приложения, счетчики считаются по ним одним запросом
+        if config.codes:
+            async with db_helper.session_factory() as session:
+                result = await DaoShiftTaskRepository().repair_counters(session=session)
+            print(f"Счетчики кодов пересчитаны: {result}")
+
+        async with engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            for table in (*tables, ShiftTaskCounters.__table__):
+                await raw_connection.driver_connection.execute(f"ANALYZE {table.name}")
+
+        await engine.dispose()
+
+
+def parse_args() -> argparse.Namespace:
+    defaults = GeneratorConfig()
+    parser = argparse.ArgumentParser(description="Генерация синтетических сменных заданий и кодов продукции")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--tasks", type=int, default=defaults.tasks, help="количество сменных заданий")
+    parser.add_argument("--codes", type=int, default=defaults.codes, help="количество уникальных кодов")
+    parser.add_argument("--lines", type=int, default=defaults.lines)
+    parser.add_argument("--shifts", type=int, default=defaults.shifts, help="количество смен в сутках")
+    parser.add_argument("--teams", type=int, default=defaults.teams)
+    parser.add_argument("--nomenclatures", type=int, default=defaults.nomenclatures)
+    parser.add_argument("--work-centers", type=int, default=defaults.work_centers)
+    parser.add_argument("--days", type=int, default=defaults.days, help="на сколько дней распределить партии")
+    parser.add_argument("--skew", type=float, default=defaults.skew,
+                        help="перекос распределения кодов по партиям и номенклатуры, 0 - равномерно")
+    parser.add_argument("--aggregation-ratio", type=float, default=defaults.aggregation_ratio)
+    parser.add_argument("--closed-ratio", type=float, default=defaults.closed_ratio)
+    parser.add_argument("--party-number-start", type=int, default=defaults.party_number_start)
+    parser.add_argument("--start-date", type=datetime.date.fromisoformat, default=defaults.start_date)
+    parser.add_argument("--chunk-size", type=int, default=defaults.chunk_size, help="строк в одной пачке COPY")
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 1, 8))
+    parser.add_argument("--recreate", action="store_true", help="пересоздать таблицы, все данные будут удалены")
+    parser.add_argument("--keep-indexes", action="store_true", help="не удалять вторичные индексы на время загрузки")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    generator_config = GeneratorConfig(
+        seed=args.seed,
+        tasks=args.tasks,
+        codes=args.codes,
+        lines=args.lines,
+        shifts=args.shifts,
+        teams=args.teams,
+        nomenclatures=args.nomenclatures,
+        work_centers=args.work_centers,
+        days=args.days,
+        skew=args.skew,
+        aggregation_ratio=args.aggregation_ratio,
+        closed_ratio=args.closed_ratio,
+        party_number_start=args.party_number_start,
+        start_date=args.start_date,
+        chunk_size=args.chunk_size,
+    )
+    generator_obj = SyntheticDataGenerator(config=generator_config, workers=args.workers)
+    asyncio.run(generator_obj.main(recreate=args.recreate, defer_indexes=not args.keep_indexes))
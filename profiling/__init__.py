@@ -0,0 +1,20 @@
+__all__ = (
+    "ProfileFormatter",
+    "ProfileStore",
+    "profile_store",
+    "ProfilingMiddleware",
+    "SamplingProfiler",
+    "SlowQueryLog",
+    "slow_query_log",
+    "SlowQueryProfiler",
+)
+
+
+from profiling.profile_formatter import ProfileFormatter
+from profiling.profile_store import ProfileStore
+from profiling.profile_store import profile_store
+from profiling.profiling_middleware import ProfilingMiddleware
+from profiling.sampling_profiler import SamplingProfiler
+from profiling.slow_query_log import SlowQueryLog
+from profiling.slow_query_log import slow_query_log
+from profiling.slow_query_profiler import SlowQueryProfiler
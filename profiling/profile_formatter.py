@@ -0,0 +1,43 @@
+class ProfileFormatter:
+    """
+    Перевод профиля запроса в форматы для построения flame graph
+    """
+
+    @staticmethod
+    def to_collapsed(profile: dict) -> str:
+        """
+        Метод возвращает профиль в формате collapsed stacks (flamegraph.pl, speedscope, inferno)
+        :param profile: профиль из ProfileStore
+        :return: строки вида "кадр;кадр;кадр микросекунды"
+        """
+        return "".join(f"{stack} {weight}\n" for stack, weight in profile["stacks"].most_common())
+
+    @staticmethod
+    def to_speedscope(profile: dict) -> dict:
+        """
+        Метод возвращает профиль в формате speedscope (sampled profile)
+        :param profile: профиль из ProfileStore
+        :return: словарь для сериализации в JSON
+        """
+        frame_indexes = {}
+        samples = []
+        weights = []
+        for stack, weight in profile["stacks"].items():
+            samples.append([frame_indexes.setdefault(name, len(frame_indexes)) for name in stack.split(";")])
+            weights.append(weight)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": name} for name in frame_indexes]},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{profile['method']} {profile['path']} {profile['request_id']}",
+                "unit": "microseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": profile["request_id"],
+            "exporter": "product_release_control",
+        }
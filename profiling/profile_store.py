@@ -0,0 +1,37 @@
+import collections
+
+from model.config import settings
+
+
+class ProfileStore:
+    """
+    Хранилище профилей запросов по id запроса, при переполнении вытесняются самые старые профили
+    """
+
+    def __init__(self, max_size: int):
+        """
+        :param max_size: максимальное количество профилей
+        """
+        self.max_size = max_size
+        self._profiles: collections.OrderedDict[str, dict] = collections.OrderedDict()
+
+    def add(self, request_id: str, profile: dict) -> None:
+        self._profiles[request_id] = profile
+        while len(self._profiles) > self.max_size:
+            self._profiles.popitem(last=False)
+
+    def get(self, request_id: str) -> dict | None:
+        return self._profiles.get(request_id)
+
+    def summaries(self) -> list[dict]:
+        """
+        Метод возвращает краткие сведения о профилях без стеков, сначала самые новые
+        :return: список словарей
+        """
+        return [
+            {key: value for key, value in profile.items() if key != "stacks"}
+            for profile in reversed(self._profiles.values())
+        ]
+
+
+profile_store = ProfileStore(max_size=settings.profiling_store_size)
@@ -0,0 +1,82 @@
+import asyncio
+import datetime
+import random
+import secrets
+import time
+import uuid
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from profiling.profile_store import ProfileStore
+from profiling.sampling_profiler import SamplingProfiler
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware, включающее SamplingProfiler для отдельных запросов: по заголовку X-Profile-Token
+    с токеном администратора или для случайной доли sample_rate запросов.
+    Id профиля возвращается в заголовке ответа X-Profile-Id, сам профиль сохраняется в ProfileStore.
+    Остальные запросы проходят без профилирования
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        profiler: SamplingProfiler,
+        profile_store: ProfileStore,
+        token: str | None,
+        sample_rate: float,
+    ):
+        """
+        :param app: следующее ASGI приложение
+        :param profiler: семплирующий профилировщик
+        :param profile_store: хранилище профилей
+        :param token: токен для заголовка X-Profile-Token, если None - профилирование по заголовку выключено
+        :param sample_rate: доля запросов, которые профилируются без заголовка, от 0 до 1
+        """
+        self.app = app
+        self.profiler = profiler
+        self.profile_store = profile_store
+        self.token = token.encode() if token is not None else None
+        self.sample_rate = sample_rate
+
+    def should_profile(self, scope: Scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if self.token is None:
+            return False
+        for name, value in scope["headers"]:
+            if name == b"x-profile-token":
+                return secrets.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", ()), (b"x-profile-id", request_id.encode())]}
+            await send(message)
+
+        task = asyncio.current_task()
+        started_at = datetime.datetime.now()
+        start = time.perf_counter()
+        self.profiler.start(task)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            stacks = self.profiler.stop(task)
+            self.profile_store.add(request_id, {
+                "request_id": request_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "started_at": started_at,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                "interval_ms": self.profiler.interval * 1000,
+                "sampled_ms": round(sum(stacks.values()) / 1000, 3),
+                "stacks": stacks,
+            })
@@ -0,0 +1,85 @@
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+
+
+class SamplingProfiler:
+    """
+    Семплирующий профилировщик асинхронных запросов. Отдельный поток раз в interval секунд
+    снимает стек потока event loop и засчитывает его тому запросу, чья задача asyncio сейчас выполняется.
+    Вес снимка - время в микросекундах с предыдущего снимка: пока event loop занят Python кодом,
+    поток профилировщика ждет GIL и снимки идут реже интервала.
+    Поток работает только пока профилируется хотя бы один запрос
+    """
+
+    def __init__(self, interval: float):
+        """
+        :param interval: интервал между снимками стека в секундах
+        """
+        self.interval = interval
+        self._sessions: dict[asyncio.Task, collections.Counter] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+
+    def start(self, task: asyncio.Task) -> collections.Counter:
+        """
+        Метод начинает профилирование задачи, вызывается из потока event loop
+        :param task: задача asyncio, обрабатывающая запрос
+        :return: счетчик стеков, который заполняется до вызова stop
+        """
+        stacks = collections.Counter()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._sessions[task] = stacks
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+        return stacks
+
+    def stop(self, task: asyncio.Task) -> collections.Counter:
+        """
+        Метод заканчивает профилирование задачи
+        :param task: задача asyncio, обрабатывающая запрос
+        :return: счетчик стеков с весом в микросекундах
+        """
+        with self._lock:
+            return self._sessions.pop(task, collections.Counter())
+
+    @staticmethod
+    def collapse(frame) -> str:
+        """
+        Метод превращает стек в строку формата collapsed stacks: кадры от корня через ";"
+        :param frame: верхний кадр стека
+        :return: строка стека
+        """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            name = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            names.append(name.replace(";", ":"))
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def run(self) -> None:
+        sampled_at = time.perf_counter()
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            elapsed_us = round((now - sampled_at) * 1_000_000)
+            sampled_at = now
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+                stacks = self._sessions.get(asyncio.current_task(self._loop))
+                if stacks is None:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    stacks[self.collapse(frame)] += elapsed_us
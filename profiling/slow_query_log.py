@@ -0,0 +1,61 @@
+import collections
+import datetime
+
+from model.config import settings
+
+
+class SlowQueryLog:
+    """
+    Кольцевой буфер медленных запросов к БД: при переполнении вытесняются самые старые записи
+    """
+
+    def __init__(self, max_size: int):
+        """
+        :param max_size: максимальное количество записей в буфере
+        """
+        self.max_size = max_size
+        self._entries: collections.deque[dict] = collections.deque(maxlen=max_size)
+        self.recorded = 0
+
+    def record(self, statement: str, parameters: str, dao_method: str, duration_ms: float) -> dict:
+        """
+        Метод добавляет медленный запрос в буфер
+        :param statement: текст запроса
+        :param parameters: параметры запроса в виде строки
+        :param dao_method: метод DAO, из которого выполнялся запрос
+        :param duration_ms: время выполнения в миллисекундах
+        :return: словарь записи, в него позже может быть дописан план запроса
+        """
+        entry = {
+            "recorded_at": datetime.datetime.now(),
+            "dao_method": dao_method,
+            "duration_ms": round(duration_ms, 3),
+            "statement": statement,
+            "parameters": parameters,
+            "explain": None,
+        }
+        self._entries.append(entry)
+        self.recorded += 1
+        return entry
+
+    def entries(self, limit: int | None = None) -> list[dict]:
+        """
+        Метод возвращает записи буфера, сначала самые новые
+        :param limit: максимальное количество записей
+        :return: список записей
+        """
+        entries = list(reversed(self._entries))
+        return entries if limit is None else entries[:limit]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "recorded": self.recorded,
+        }
+
+
+slow_query_log = SlowQueryLog(max_size=settings.slow_query_log_size)
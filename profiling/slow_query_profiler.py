@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import random
+import re
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from metrics import DEFAULT_DAO_METHOD, current_dao_method
+from profiling.slow_query_log import SlowQueryLog
+
+
+logger = logging.getLogger(__name__)
+
+
+class SlowQueryProfiler:
+    """
+    Записывает в SlowQueryLog запросы дольше порога вместе с параметрами и методом DAO.
+    Для доли sample_rate медленных SELECT методов DAO в фоне снимается план EXPLAIN (ANALYZE, BUFFERS):
+    запрос повторяется на отдельном соединении в транзакции, которая откатывается
+    """
+
+    #  сколько символов параметров запроса сохранять в буфере
+    MAX_PARAMETERS_LENGTH = 1000
+    #  SELECT с побочными эффектами, которые откат транзакции не отменяет или которые ждут чужие блокировки:
+    #  сессионные advisory-блокировки, уведомления, последовательности и блокировки строк
+    SIDE_EFFECTS_PATTERN = re.compile(
+        r"\b(pg_(try_)?advisory_\w+|pg_notify|nextval|setval)\s*\("
+        r"|\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b",
+        re.IGNORECASE,
+    )
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        slow_query_log: SlowQueryLog,
+        threshold_ms: float,
+        sample_rate: float,
+        max_concurrent_explains: int = 2,
+        explain_timeout: float | None = None,
+    ):
+        """
+        :param engine: асинхронный движок SQLAlchemy
+        :param slow_query_log: буфер медленных запросов
+        :param threshold_ms: порог в миллисекундах, начиная с которого запрос считается медленным
+        :param sample_rate: доля медленных SELECT, для которых снимается план, от 0 до 1
+        :param max_concurrent_explains: сколько планов может сниматься одновременно, лишние пропускаются
+        :param explain_timeout: таймаут EXPLAIN ANALYZE в секундах
+        """
+        self.engine = engine
+        self.slow_query_log = slow_query_log
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.max_concurrent_explains = max_concurrent_explains
+        self.explain_timeout = explain_timeout
+        #  ссылки на фоновые задачи, чтобы их не собрал сборщик мусора до завершения
+        self._explain_tasks: set[asyncio.Task] = set()
+
+    @staticmethod
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started_at", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["slow_query_started_at"].pop()
+        if duration < self.threshold:
+            return
+
+        dao_method = current_dao_method.get()
+        entry = self.slow_query_log.record(
+            statement=statement,
+            parameters=repr(parameters)[:self.MAX_PARAMETERS_LENGTH],
+            dao_method=dao_method,
+            duration_ms=duration * 1000,
+        )
+        if not executemany and self.should_explain(statement, dao_method):
+            self.schedule_explain(entry, statement, parameters)
+
+    @staticmethod
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("slow_query_started_at"):
+            connection.info["slow_query_started_at"].pop()
+
+    def should_explain(self, statement: str, dao_method: str) -> bool:
+        #  EXPLAIN ANALYZE выполняет запрос, поэтому повторять можно только чтение без побочных эффектов.
+        #  Служебные запросы вне методов DAO (блокировки обслуживания, проверки соединений) не повторяются
+        return (
+            dao_method != DEFAULT_DAO_METHOD
+            and statement.lstrip()[:6].upper() == "SELECT"
+            and not self.SIDE_EFFECTS_PATTERN.search(statement)
+            and len(self._explain_tasks) < self.max_concurrent_explains
+            and random.random() < self.sample_rate
+        )
+
+    def schedule_explain(self, entry: dict, statement: str, parameters) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.explain(entry, statement, tuple(parameters or ())))
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+
+    async def explain(self, entry: dict, statement: str, parameters: tuple) -> None:
+        """
+        Метод снимает план медленного запроса и дописывает его в запись буфера.
+        Запрос отправляется напрямую в драйвер, мимо событий движка, поэтому сам EXPLAIN
+        не попадает ни в буфер, ни в метрики
+        :param entry: запись буфера
+        :param statement: текст запроса с параметрами вида $1
+        :param parameters: параметры запроса
+        :return: None
+        """
+        try:
+            async with self.engine.connect() as connection:
+                raw_connection = await connection.get_raw_connection()
+                driver_connection = raw_connection.driver_connection
+                transaction = driver_connection.transaction()
+                await transaction.start()
+                try:
+                    rows = await driver_connection.fetch(
+                        f"EXPLAIN (ANALYZE, BUFFERS) {statement}", *parameters, timeout=self.explain_timeout,
+                    )
+                finally:
+                    await transaction.rollback()
+            entry["explain"] = "\n".join(row[0] for row in rows)
+        except Exception as error:
+            logger.warning("EXPLAIN ANALYZE медленного запроса не выполнен: %r", error)
+            entry["explain"] = f"EXPLAIN ANALYZE не выполнен: {type(error).__name__}"
+
+    def instrument(self) -> None:
+        """
+        Метод подписывается на события движка
+        :return: None
+        """
+        sync_engine = self.engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self.after_cursor_execute)
+        event.listen(sync_engine, "handle_error", self.handle_error)
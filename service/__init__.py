@@ -1,6 +1,26 @@
 __all__ = (
+    "AggregationBatcher",
+    "aggregation_batcher",
+    "ExportService",
+    "JsonArrayStreamParser",
+    "PartitionManager",
+    "partition_manager",
+    "ShiftTaskArchiver",
+    "shift_task_archiver",
     "ShiftTaskDtoService",
+    "StreamIngestionService",
+    "UniqueProductIdentifierDtoService",
 )
 
 
+from service.aggregation_batcher import AggregationBatcher
+from service.aggregation_batcher import aggregation_batcher
+from service.export_service import ExportService
+from service.json_array_stream_parser import JsonArrayStreamParser
+from service.partition_manager import PartitionManager
+from service.partition_manager import partition_manager
+from service.shift_task_archiver import ShiftTaskArchiver
+from service.shift_task_archiver import shift_task_archiver
 from service.shift_task_dto_service import ShiftTaskDtoService
+from service.stream_ingestion_service import StreamIngestionService
+from service.unique_product_identifier_dto_service import UniqueProductIdentifierDtoService
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from dao import DaoUniqueProductIdentifiersRepository
+from dto import ErrorResponse
+from model import UniqueProductIdentifiers, db_helper, settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class AggregationBatcher:
+    """
+    Групповая запись аггрегации кодов продукции. Запросы аггрегации ставятся в очередь и ждут future,
+    фоновая задача собирает их в пачку за max_delay секунд или до max_batch_size запросов
+    и выполняет пачку одним UPDATE ... FROM unnest(...) в одной транзакции.
+    Пачки выполняются строго по очереди, поэтому результат каждого запроса такой же,
+    как при отдельной транзакции на запрос, а коммитов в БД в разы меньше.
+    Если фоновая задача не запущена, остановлена или упала, аггрегация пишется отдельной транзакцией
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_batch_size: int,
+        max_delay: float,
+        timeout: float,
+    ):
+        """
+        :param session_factory: фабрика асинхронных сессий
+        :param max_batch_size: максимальное количество запросов в одной пачке
+        :param max_delay: сколько секунд ждать наполнения пачки после первого запроса
+        :param timeout: сколько секунд запрос ждет записи своей пачки
+        """
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.dao_obj = DaoUniqueProductIdentifiersRepository()
+        self._pending: list[tuple[tuple[int, str], asyncio.Future]] = []
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self.batches = 0
+        self.requests = 0
+        self.direct_writes = 0
+        self.timeouts = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="aggregation-batcher")
+            self._task.add_done_callback(self.handle_run_done)
+
+    def handle_run_done(self, task: asyncio.Task) -> None:
+        """
+        Метод отвечает ошибкой запросам, которые остались в очереди упавшей фоновой задачи
+        :param task: фоновая задача
+        :return: None
+        """
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.error("Фоновая задача групповой аггрегации упала", exc_info=task.exception())
+        pending, self._pending = self._pending, []
+        for _, future in pending:
+            if not future.done():
+                future.set_result(ErrorResponse(code=503, message="Групповая запись аггрегации недоступна"))
+
+    async def stop(self) -> None:
+        """
+        Метод останавливает фоновую задачу, запросы, которые уже в очереди, записываются до остановки
+        :return: None
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self._has_pending.set()
+        self._batch_full.set()
+        await self._task
+        self._task = None
+        self._stopping = False
+
+    async def aggregate(
+        self,
+        shift_task_id: int,
+        unique_product_code: str,
+    ) -> UniqueProductIdentifiers | ErrorResponse:
+        """
+        Метод ставит аггрегацию кода в очередь и ждет записи пачки, в которую она попала, не дольше timeout секунд.
+        Если фоновая задача не работает, код аггрегируется сразу отдельной транзакцией
+        :param shift_task_id: айди сменного задания
+        :param unique_product_code: уникальный код продукции
+        :return: объект класса UniqueProductIdentifiers или ErrorResponse
+        """
+        pair = (shift_task_id, unique_product_code)
+        if not self.is_running:
+            self.direct_writes += 1
+            async with self.session_factory() as session:
+                results = await self.dao_obj.aggregate_unique_product_code_pairs(session=session, pairs=[pair])
+            return results if isinstance(results, ErrorResponse) else results[0]
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((pair, future))
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._batch_full.set()
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            #  отмененный future пропускается при записи, но пачка с ним может быть уже в работе
+            self.timeouts += 1
+            return ErrorResponse(
+                code=503,
+                message=f"Аггрегация кода {unique_product_code} не подтверждена за {self.timeout} с, проверьте код",
+            )
+
+    async def run(self) -> None:
+        while True:
+            await self._has_pending.wait()
+            if self._stopping and not self._pending:
+                return
+            if len(self._pending) < self.max_batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Метод забирает из очереди до max_batch_size запросов, записывает их одной транзакцией
+        и отдает каждому запросу его результат
+        :return: None
+        """
+        batch = self._pending[:self.max_batch_size]
+        del self._pending[:self.max_batch_size]
+        if len(self._pending) < self.max_batch_size and not self._stopping:
+            self._batch_full.clear()
+        if not self._pending and not self._stopping:
+            self._has_pending.clear()
+        if not batch:
+            return
+
+        try:
+            async with self.session_factory() as session:
+                results = await self.dao_obj.aggregate_unique_product_code_pairs(
+                    session=session,
+                    pairs=[pair for pair, _ in batch],
+                )
+        except Exception as error:
+            logger.exception("Пачка аггрегации кодов не записана")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self.batches += 1
+        self.requests += len(batch)
+        if isinstance(results, ErrorResponse):
+            results = [results] * len(batch)
+        for (_, future), result in zip(batch, results):
+            #  future может быть уже отменен, если клиент не дождался ответа
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "requests": self.requests,
+            "requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "direct_writes": self.direct_writes,
+            "timeouts": self.timeouts,
+            "running": self.is_running,
+        }
+
+
+aggregation_batcher = AggregationBatcher(
+    session_factory=db_helper.session_factory,
+    max_batch_size=settings.aggregation_batch_max_size,
+    max_delay=settings.aggregation_batch_max_delay_ms / 1000,
+    timeout=settings.aggregation_batch_timeout,
+)
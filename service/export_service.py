@@ -0,0 +1,83 @@
+import csv
+import datetime
+import io
+import json
+from typing import AsyncIterator
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from model import db_helper, settings
+
+
+class ExportService:
+    """
+    Класс для потоковой выгрузки результатов запроса в формате NDJSON или CSV.
+    Строки читаются из серверного курсора пачками, в памяти одновременно находится только одна пачка
+    """
+
+    MEDIA_TYPES = {
+        "ndjson": "application/x-ndjson",
+        "csv": "text/csv",
+    }
+
+    @staticmethod
+    def _json_default(value):
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        raise TypeError(f"Тип {type(value)} не сериализуется в JSON")
+
+    def encode_ndjson(self, columns: list[str], rows) -> str:
+        """
+        Метод кодирует пачку строк в NDJSON, по одному JSON объекту на строку
+        :param columns: названия колонок
+        :param rows: пачка строк результата запроса
+        :return: str
+        """
+        return "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=self._json_default) + "\n"
+            for row in rows
+        )
+
+    @staticmethod
+    def encode_csv(rows, header: list[str] | None = None) -> str:
+        """
+        Метод кодирует пачку строк в CSV
+        :param rows: пачка строк результата запроса
+        :param header: заголовок CSV, передается только для первой пачки
+        :return: str
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header is not None:
+            writer.writerow(header)
+        writer.writerows(rows)
+        return buffer.getvalue()
+
+    async def stream(
+        self,
+        stmt: Select,
+        export_format: str,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Асинхронный генератор выгрузки результата запроса.
+        Сессия открывается внутри генератора, так как живет все время отправки ответа
+        :param stmt: объект запроса Select
+        :param export_format: формат выгрузки, ndjson или csv
+        :param session_factory: фабрика сессий, по умолчанию основная БД
+        :return: асинхронный итератор по кускам ответа в байтах
+        """
+        columns = [column.name for column in stmt.selected_columns]
+        session_factory = session_factory or db_helper.session_factory
+
+        async with session_factory() as session:
+            result = await session.stream(stmt.execution_options(yield_per=settings.export_yield_per))
+
+            if export_format == "csv":
+                yield self.encode_csv(rows=[], header=columns).encode()
+                async for rows in result.partitions():
+                    yield self.encode_csv(rows=rows).encode()
+            else:
+                async for rows in result.partitions():
+                    yield self.encode_ndjson(columns=columns, rows=rows).encode()
@@ -0,0 +1,97 @@
+import codecs
+import json
+
+
+class JsonArrayStreamParser:
+    """
+    Класс для инкрементального разбора JSON массива, который приходит кусками.
+    Элементы массива возвращаются по мере поступления данных, в памяти хранится только недоразобранный хвост
+    """
+
+    WHITESPACE = " \t\n\r"
+
+    def __init__(self, max_item_size: int = 1024 * 1024):
+        """
+        :param max_item_size: максимальный размер одного элемента массива в символах
+        """
+        self.max_item_size = max_item_size
+        self._decoder = json.JSONDecoder()
+        self._utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._state = "before_array"
+
+    def _skip_whitespace(self, position: int) -> int:
+        while position < len(self._buffer) and self._buffer[position] in self.WHITESPACE:
+            position += 1
+        return position
+
+    def feed(self, data: bytes, final: bool = False) -> list:
+        """
+        Метод принимает очередной кусок тела запроса и возвращает элементы массива, которые в нем завершились
+        :param data: очередной кусок данных
+        :param final: True, если это последний кусок
+        :return: список разобранных элементов
+        """
+        self._buffer += self._utf8_decoder.decode(data, final)
+        items = []
+        position = 0
+
+        while True:
+            position = self._skip_whitespace(position)
+            if position >= len(self._buffer):
+                break
+            char = self._buffer[position]
+
+            if self._state == "before_array":
+                if char != "[":
+                    raise ValueError("Ожидается JSON массив")
+                position += 1
+                self._state = "before_first_item"
+
+            elif self._state in ("before_first_item", "before_item"):
+                if char == "]" and self._state == "before_first_item":
+                    position += 1
+                    self._state = "done"
+                    continue
+                try:
+                    item, end = self._decoder.raw_decode(self._buffer, position)
+                except json.JSONDecodeError:
+                    #  элемент еще не пришел целиком
+                    if final:
+                        raise ValueError(f"Некорректный JSON в позиции {position}")
+                    if len(self._buffer) - position > self.max_item_size:
+                        raise ValueError("Слишком большой элемент JSON массива")
+                    break
+                #  число или литерал, за которым еще нет разделителя, может продолжиться в следующем куске
+                if not final and not isinstance(item, (dict, list, str)) and (
+                    end == len(self._buffer) or self._buffer[end] not in self.WHITESPACE + ",]"
+                ):
+                    break
+                items.append(item)
+                position = end
+                self._state = "after_item"
+
+            elif self._state == "after_item":
+                if char == ",":
+                    self._state = "before_item"
+                elif char == "]":
+                    self._state = "done"
+                else:
+                    raise ValueError(f"Ожидается ',' или ']' в позиции {position}")
+                position += 1
+
+            else:
+                raise ValueError("Лишние данные после JSON массива")
+
+        self._buffer = self._buffer[position:]
+        return items
+
+    def close(self) -> list:
+        """
+        Метод завершает разбор и проверяет, что массив был закрыт
+        :return: список элементов, оставшихся в буфере
+        """
+        items = self.feed(b"", final=True)
+        if self._state != "done":
+            raise ValueError("JSON массив не завершен")
+        return items
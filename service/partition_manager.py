@@ -0,0 +1,374 @@
+import asyncio
+import datetime
+import logging
+
+from sqlalchemy import column, delete, select, table, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker
+
+from cache import cache_invalidation_publisher, verification_index
+from dao import DaoShiftTaskRepository
+from dto import ErrorResponse
+from model import UniqueProductCode, UniqueProductIdentifiers, db_helper, settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionManager:
+    """
+    Управление месячными секциями таблицы кодов продукции, секционированной по ДатаПартии.
+    Фоновая задача раз в check_interval секунд создает секции на months_ahead месяцев вперед
+    и отсоединяет секции старше retention_months месяцев. Строки с датой вне всех секций попадают в секцию DEFAULT,
+    при следующем обслуживании для их месяцев создаются секции и строки переносятся в них.
+    Отсоединенная секция остается отдельной таблицей, ее можно выгрузить и удалить вручную,
+    а ее коды перестают существовать для приложения: они удаляются из реестра unique_product_codes
+    и из счетчиков кодов сменных заданий.
+    Обслуживание выполняет только один процесс за раз, остальные пропускают его по pg_try_advisory_lock
+    """
+
+    ADVISORY_LOCK_KEY = 7230023
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        session_factory: async_sessionmaker[AsyncSession],
+        table_name: str,
+        months_ahead: int,
+        retention_months: int | None,
+        check_interval: float,
+        lock_timeout: float,
+    ):
+        """
+        :param engine: движок основной БД
+        :param session_factory: фабрика асинхронных сессий основной БД для переноса и отсоединения секций
+        :param table_name: имя секционированной таблицы
+        :param months_ahead: на сколько месяцев вперед создавать секции
+        :param retention_months: через сколько месяцев отсоединять секцию, None - никогда
+        :param check_interval: раз в сколько секунд проверять секции
+        :param lock_timeout: сколько секунд ждать блокировку таблицы при создании и отсоединении секции
+        """
+        self.engine = engine
+        self.session_factory = session_factory
+        self.table_name = table_name
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.check_interval = check_interval
+        self.lock_timeout = lock_timeout
+        self.dao_obj = DaoShiftTaskRepository()
+        self._task: asyncio.Task | None = None
+        self.created: list[str] = []
+        self.detached: list[str] = []
+        self.errors = 0
+        self.last_run_at: datetime.datetime | None = None
+
+    @staticmethod
+    def add_months(month: datetime.date, months: int) -> datetime.date:
+        index = month.year * 12 + month.month - 1 + months
+        return datetime.date(index // 12, index % 12 + 1, 1)
+
+    def partition_name(self, month: datetime.date) -> str:
+        return f"{self.table_name}_p{month:%Y_%m}"
+
+    @property
+    def default_partition_name(self) -> str:
+        return f"{self.table_name}_default"
+
+    def parse_partition_month(self, partition_name: str) -> datetime.date | None:
+        """
+        Метод восстанавливает месяц секции по ее имени
+        :param partition_name: имя секции
+        :return: первый день месяца или None, если это не месячная секция
+        """
+        prefix = f"{self.table_name}_p"
+        if not partition_name.startswith(prefix):
+            return None
+        try:
+            return datetime.datetime.strptime(partition_name[len(prefix):], "%Y_%m").date()
+        except ValueError:
+            return None
+
+    async def list_partitions(self, connection: AsyncConnection) -> list[dict]:
+        """
+        Метод возвращает секции таблицы с их границами
+        :param connection: соединение с БД
+        :return: список словарей {"name": имя секции, "bound": границы секции}
+        """
+        result = await connection.execute(
+            text(
+                "SELECT child.relname AS name, pg_get_expr(child.relpartbound, child.oid) AS bound "
+                "FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :table_name "
+                "ORDER BY child.relname"
+            ),
+            {"table_name": self.table_name},
+        )
+        return [dict(row._mapping) for row in result]
+
+    async def execute_ddl(self, connection: AsyncConnection, statement: str) -> bool:
+        """
+        Метод выполняет DDL секции, ошибка одной секции не мешает обслуживанию остальных
+        :param connection: соединение с БД в режиме AUTOCOMMIT
+        :param statement: запрос DDL
+        :return: True, если запрос выполнен
+        """
+        try:
+            await connection.execute(text(statement))
+        except SQLAlchemyError:
+            self.errors += 1
+            logger.warning("Не удалось выполнить %s", statement, exc_info=True)
+            return False
+        return True
+
+    async def list_default_months(self, connection: AsyncConnection) -> set[datetime.date]:
+        """
+        Метод возвращает месяцы, строки которых попали в секцию DEFAULT.
+        Секция DEFAULT читается целиком, в нормальной работе она пустая или маленькая
+        :param connection: соединение с БД
+        :return: множество первых дней месяцев
+        """
+        result = await connection.execute(
+            text(f"SELECT DISTINCT date_trunc('month', party_data)::date FROM \"{self.default_partition_name}\"")
+        )
+        return set(result.scalars())
+
+    async def move_default_rows(self, name: str, month: datetime.date, next_month: datetime.date) -> bool:
+        """
+        Метод создает секцию месяца, строки которого уже попали в DEFAULT: одной транзакцией
+        создает отдельную таблицу, переносит в нее строки месяца из DEFAULT и присоединяет ее секцией.
+        Обычное создание секции в этом случае невозможно, оно проверяет, что в DEFAULT нет строк с ее датами
+        :param name: имя секции
+        :param month: первый день месяца
+        :param next_month: первый день следующего месяца
+        :return: True, если секция создана
+        """
+        async with self.session_factory() as session:
+            try:
+                await session.execute(text(f"SET LOCAL lock_timeout = '{int(self.lock_timeout * 1000)}ms'"))
+                await session.execute(text(
+                    f'CREATE TABLE "{name}" (LIKE "{self.table_name}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+                ))
+                await session.execute(
+                    text(
+                        f'WITH moved AS (DELETE FROM "{self.default_partition_name}" '
+                        f"WHERE party_data >= :month AND party_data < :next_month RETURNING *) "
+                        f'INSERT INTO "{name}" SELECT * FROM moved'
+                    ),
+                    {"month": month, "next_month": next_month},
+                )
+                #  при присоединении секция получает индексы и внешние ключи секционированной таблицы
+                await session.execute(text(
+                    f'ALTER TABLE "{self.table_name}" ATTACH PARTITION "{name}" '
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+                ))
+                await session.commit()
+            except SQLAlchemyError:
+                await session.rollback()
+                self.errors += 1
+                logger.warning("Не удалось перенести строки секции %s из DEFAULT", name, exc_info=True)
+                return False
+        return True
+
+    async def create_partitions(
+        self,
+        connection: AsyncConnection,
+        first_day: datetime.date,
+        last_day: datetime.date,
+    ) -> list[str]:
+        """
+        Метод создает секцию DEFAULT, месячные секции, покрывающие даты с first_day по last_day,
+        и секции месяцев, строки которых попали в DEFAULT, например с ДатаПартии дальше last_day
+        :param connection: соединение с БД
+        :param first_day: первая дата
+        :param last_day: последняя дата
+        :return: имена созданных секций
+        """
+        existing = {partition["name"] for partition in await self.list_partitions(connection)}
+        created = []
+
+        if self.default_partition_name not in existing:
+            statement = f'CREATE TABLE "{self.default_partition_name}" PARTITION OF "{self.table_name}" DEFAULT'
+            if not await self.execute_ddl(connection, statement):
+                return created
+            created.append(self.default_partition_name)
+
+        default_months = await self.list_default_months(connection)
+        months = set(default_months)
+        month = first_day.replace(day=1)
+        while month <= last_day:
+            months.add(month)
+            month = self.add_months(month, 1)
+
+        for month in sorted(months):
+            next_month = self.add_months(month, 1)
+            name = self.partition_name(month)
+            if name in existing:
+                continue
+            if month in default_months:
+                if await self.move_default_rows(name, month, next_month):
+                    created.append(name)
+                continue
+            #  создание секции проверяет, что в DEFAULT нет строк с ее датами,
+            #  поэтому секции создаются заранее, пока в DEFAULT ничего не попало
+            statement = (
+                f'CREATE TABLE "{name}" PARTITION OF "{self.table_name}" '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+            )
+            if await self.execute_ddl(connection, statement):
+                created.append(name)
+        return created
+
+    async def detach_partition(self, name: str, month: datetime.date, next_month: datetime.date) -> bool:
+        """
+        Метод отсоединяет секцию и одной транзакцией с этим удаляет внешние ключи отсоединенной таблицы,
+        удаляет коды секции из реестра unique_product_codes и пересчитывает счетчики кодов затронутых сменных заданий,
+        сами задания не меняются. Без внешнего ключа на shift_tasks архивация заданий отсоединенных кодов
+        не упирается в отсоединенную таблицу. Коды, уже перенесенные в архив, в секции отсутствуют
+        и остаются в реестре, поэтому повторно загрузить их нельзя.
+        Индекс кодов verification_index очищается во всех процессах и заполняется заново при промахах
+        :param name: имя секции
+        :param month: первый день месяца секции
+        :param next_month: первый день следующего месяца
+        :return: True, если секция отсоединена
+        """
+        async with self.session_factory() as session:
+            try:
+                await session.execute(text(f"SET LOCAL lock_timeout = '{int(self.lock_timeout * 1000)}ms'"))
+                #  DETACH ... CONCURRENTLY недоступен при наличии секции DEFAULT и внутри транзакции,
+                #  поэтому блокировка таблицы ждется не дольше lock_timeout, иначе попытка в следующий раз
+                await session.execute(text(f'ALTER TABLE "{self.table_name}" DETACH PARTITION "{name}"'))
+                #  после отсоединения внешние ключи секционированной таблицы остаются на таблице самостоятельными
+                foreign_keys = (await session.scalars(
+                    text(
+                        "SELECT conname FROM pg_constraint "
+                        "WHERE conrelid = CAST(:name AS regclass) AND contype = 'f'"
+                    ),
+                    {"name": f'"{name}"'},
+                )).all()
+                for foreign_key in foreign_keys:
+                    await session.execute(text(f'ALTER TABLE "{name}" DROP CONSTRAINT "{foreign_key}"'))
+                shift_task_ids = (await session.scalars(text(f'SELECT DISTINCT shift_task_id FROM "{name}"'))).all()
+                await session.execute(
+                    delete(UniqueProductCode).where(
+                        UniqueProductCode.party_data >= month,
+                        UniqueProductCode.party_data < next_month,
+                        UniqueProductCode.unique_product_code.in_(
+                            select(column("unique_product_code")).select_from(table(name))
+                        ),
+                    )
+                )
+                await cache_invalidation_publisher.publish(session=session, clear_verification_index=True)
+            except SQLAlchemyError:
+                await session.rollback()
+                self.errors += 1
+                logger.warning("Не удалось отсоединить секцию %s", name, exc_info=True)
+                return False
+
+            #  пересчет фиксирует всю транзакцию, при ошибке откатывается и отсоединение
+            result = await self.dao_obj.repair_counters(session=session, shift_task_ids=list(shift_task_ids))
+            if isinstance(result, ErrorResponse):
+                self.errors += 1
+                logger.warning("Не удалось отсоединить секцию %s: %s", name, result.message)
+                return False
+
+        verification_index.clear()
+        return True
+
+    async def detach_expired(self, connection: AsyncConnection, today: datetime.date) -> list[str]:
+        """
+        Метод отсоединяет месячные секции, все даты которых старше retention_months месяцев
+        :param connection: соединение с БД
+        :param today: текущая дата
+        :return: имена отсоединенных секций
+        """
+        if self.retention_months is None:
+            return []
+
+        cutoff = self.add_months(today.replace(day=1), -self.retention_months)
+        detached = []
+        for partition in await self.list_partitions(connection):
+            month = self.parse_partition_month(partition["name"])
+            if month is None or self.add_months(month, 1) > cutoff:
+                continue
+            if await self.detach_partition(partition["name"], month, self.add_months(month, 1)):
+                detached.append(partition["name"])
+        return detached
+
+    async def maintain(self, today: datetime.date | None = None) -> dict:
+        """
+        Метод создает недостающие секции и отсоединяет устаревшие
+        :param today: текущая дата, по умолчанию сегодня
+        :return: словарь с созданными и отсоединенными секциями
+        """
+        today = today or datetime.date.today()
+        async with self.engine.connect() as connection:
+            connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            locked = (await connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.ADVISORY_LOCK_KEY},
+            )).scalar()
+            if not locked:
+                return {"skipped": True, "created": [], "detached": []}
+
+            try:
+                await connection.execute(text(f"SET lock_timeout = '{int(self.lock_timeout * 1000)}ms'"))
+                created = await self.create_partitions(
+                    connection,
+                    first_day=today,
+                    last_day=self.add_months(today.replace(day=1), self.months_ahead),
+                )
+                detached = await self.detach_expired(connection, today)
+            finally:
+                await connection.execute(text("RESET lock_timeout"))
+                await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.ADVISORY_LOCK_KEY})
+
+        self.created.extend(created)
+        self.detached.extend(detached)
+        self.last_run_at = datetime.datetime.now()
+        return {"skipped": False, "created": created, "detached": detached}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="partition-manager")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.maintain()
+            except (SQLAlchemyError, OSError):
+                self.errors += 1
+                logger.exception("Обслуживание секций %s не выполнено", self.table_name)
+            await asyncio.sleep(self.check_interval)
+
+    def stats(self) -> dict:
+        return {
+            "table_name": self.table_name,
+            "months_ahead": self.months_ahead,
+            "retention_months": self.retention_months,
+            "created": self.created,
+            "detached": self.detached,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at,
+        }
+
+
+partition_manager = PartitionManager(
+    engine=db_helper.engine,
+    session_factory=db_helper.session_factory,
+    table_name=UniqueProductIdentifiers.__tablename__,
+    months_ahead=settings.partition_months_ahead,
+    retention_months=settings.partition_retention_months,
+    check_interval=settings.partition_check_interval,
+    lock_timeout=settings.partition_lock_timeout,
+)
@@ -0,0 +1,124 @@
+import asyncio
+import datetime
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from dao import DaoShiftTaskRepository
+from dto import ErrorResponse
+from model import db_helper, settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class ShiftTaskArchiver:
+    """
+    Фоновый перенос закрытых сменных заданий и их кодов продукции в архивные таблицы.
+    Каждая пачка переносится отдельной ограниченной по размеру транзакцией, поэтому рабочие таблицы
+    блокируются ненадолго, а размер рабочих таблиц зависит от текущей работы, а не от истории.
+    Архивное задание по-прежнему отдается GET /shift_task/{id}
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        retention_days: int,
+        batch_size: int,
+        max_codes: int,
+        interval: float,
+    ):
+        """
+        :param session_factory: фабрика асинхронных сессий основной БД
+        :param retention_days: через сколько дней после закрытия задание переносится в архив
+        :param batch_size: максимальное количество заданий в одной транзакции
+        :param max_codes: ограничение суммы кодов продукции в одной транзакции
+        :param interval: раз в сколько секунд запускать перенос
+        """
+        self.session_factory = session_factory
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.max_codes = max_codes
+        self.interval = interval
+        self.dao_obj = DaoShiftTaskRepository()
+        self._task: asyncio.Task | None = None
+        self.archived_shift_tasks = 0
+        self.archived_codes = 0
+        self.transactions = 0
+        self.errors = 0
+        self.last_run_at: datetime.datetime | None = None
+
+    async def archive(self) -> dict:
+        """
+        Метод переносит в архив все подходящие задания пачками, пока они не закончатся
+        :return: словарь с количеством перенесенных заданий, кодов и транзакций за этот запуск
+        """
+        closed_before = datetime.datetime.now() - datetime.timedelta(days=self.retention_days)
+        archived = {"shift_tasks": 0, "codes": 0, "transactions": 0}
+        while True:
+            async with self.session_factory() as session:
+                result = await self.dao_obj.archive_closed_shift_tasks(
+                    session=session,
+                    closed_before=closed_before,
+                    batch_size=self.batch_size,
+                    max_codes=self.max_codes,
+                )
+            if isinstance(result, ErrorResponse):
+                self.errors += 1
+                logger.warning("Перенос сменных заданий в архив прерван: %s", result.message)
+                break
+            if not result["shift_tasks"]:
+                break
+            archived["shift_tasks"] += result["shift_tasks"]
+            archived["codes"] += result["codes"]
+            archived["transactions"] += 1
+
+        self.archived_shift_tasks += archived["shift_tasks"]
+        self.archived_codes += archived["codes"]
+        self.transactions += archived["transactions"]
+        self.last_run_at = datetime.datetime.now()
+        return archived
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="shift-task-archiver")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run(self) -> None:
+        while True:
+            #  любая ошибка запуска (блокировка, конфликт сериализации, обрыв соединения) не останавливает задачу,
+            #  перенос повторяется через interval секунд. Отмена задачи при остановке проходит дальше
+            try:
+                await self.archive()
+            except Exception:
+                self.errors += 1
+                logger.exception("Перенос сменных заданий в архив не выполнен")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            "retention_days": self.retention_days,
+            "archived_shift_tasks": self.archived_shift_tasks,
+            "archived_codes": self.archived_codes,
+            "transactions": self.transactions,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at,
+        }
+
+
+shift_task_archiver = ShiftTaskArchiver(
+    session_factory=db_helper.session_factory,
+    retention_days=settings.archive_retention_days,
+    batch_size=settings.archive_batch_size,
+    max_codes=settings.archive_max_codes_per_transaction,
+    interval=settings.archive_interval,
+)
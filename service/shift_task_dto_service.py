@@ -1,25 +1,44 @@
+from pydantic import TypeAdapter
+
 from dto import ShiftTaskDTO
 from model import ShiftTask
 
 
 class ShiftTaskDtoService:
 
+    #  валидатор и сериализатор списка собираются один раз на все запросы
+    shift_task_list_adapter = TypeAdapter(list[ShiftTaskDTO])
+
     @staticmethod
     def get_shift_task_dto(shift_task: ShiftTask) -> ShiftTaskDTO:
 
-        shift_task_dto = ShiftTaskDTO(
-            closing_status=shift_task.closing_status,
-            view_task_to_shift=shift_task.view_task_to_shift,
-            line=shift_task.line,
-            shift=shift_task.shift,
-            team=shift_task.team,
-            party_number=shift_task.party_number,
-            party_data=shift_task.party_data,
-            nomenclature=shift_task.nomenclature,
-            code_ekn=shift_task.code_ekn,
-            id_of_the_rc=shift_task.id_of_the_rc,
-            date_time_shift_start=shift_task.date_time_shift_start,
-            date_time_shift_end=shift_task.date_time_shift_end,
-        )
+        shift_task_dto = ShiftTaskDTO.model_validate(shift_task)
 
         return shift_task_dto
+
+    def get_shift_task_dto_list(self, shift_task_list: list[ShiftTask]) -> list[ShiftTaskDTO]:
+        """
+        Метод строит список ShiftTaskDTO из списка объектов ShiftTask одним вызовом pydantic-core
+        :param shift_task_list: список объектов ShiftTask
+        :return: list[ShiftTaskDTO]
+        """
+        return self.shift_task_list_adapter.validate_python(shift_task_list, from_attributes=True)
+
+    @staticmethod
+    def dump_shift_task_json(shift_task_dto: ShiftTaskDTO, by_alias: bool = True) -> bytes:
+        """
+        Метод сериализует ShiftTaskDTO в JSON
+        :param shift_task_dto: объект ShiftTaskDTO
+        :param by_alias: True - поля на русском языке (serialization_alias), False - внутренние названия полей
+        :return: bytes
+        """
+        return shift_task_dto.model_dump_json(by_alias=by_alias).encode()
+
+    def dump_shift_task_list_json(self, shift_task_dto_list: list[ShiftTaskDTO], by_alias: bool = True) -> bytes:
+        """
+        Метод сериализует список ShiftTaskDTO в JSON
+        :param shift_task_dto_list: список объектов ShiftTaskDTO
+        :param by_alias: True - поля на русском языке (serialization_alias), False - внутренние названия полей
+        :return: bytes
+        """
+        return self.shift_task_list_adapter.dump_json(shift_task_dto_list, by_alias=by_alias)
@@ -0,0 +1,87 @@
+import asyncio
+from contextlib import suppress
+from typing import AsyncIterator, Awaitable, Callable
+
+from dto import ErrorResponse
+from service.json_array_stream_parser import JsonArrayStreamParser
+
+
+class StreamIngestionService:
+    """
+    Класс для загрузки больших JSON массивов без буферизации всего тела запроса.
+    Тело разбирается по мере получения, элементы собираются в пачки фиксированного размера,
+    запись пачки в БД идет параллельно с получением следующей
+    """
+
+    def __init__(self, max_pending_chunks: int = 2):
+        """
+        :param max_pending_chunks: сколько готовых пачек может ждать записи в БД
+        """
+        self.max_pending_chunks = max_pending_chunks
+
+    async def ingest(
+        self,
+        body: AsyncIterator[bytes],
+        parse_item: Callable[[dict], dict],
+        write_chunk: Callable[[list[dict]], Awaitable[dict | ErrorResponse]],
+        chunk_size: int,
+    ) -> dict | ErrorResponse:
+        """
+        Метод разбирает тело запроса и записывает элементы пачками.
+        Каждая пачка записывается в своей транзакции, при ошибке уже записанные пачки остаются в БД
+        :param body: асинхронный итератор по кускам тела запроса
+        :param parse_item: функция проверки и преобразования одного элемента массива
+        :param write_chunk: функция записи пачки, возвращает словарь со счетчиками или ErrorResponse
+        :param chunk_size: размер пачки
+        :return: словарь с количеством полученных элементов и суммой счетчиков записи или ErrorResponse
+        """
+        queue: asyncio.Queue[list[dict] | None] = asyncio.Queue(maxsize=self.max_pending_chunks)
+        received = 0
+
+        async def produce():
+            nonlocal received
+            parser = JsonArrayStreamParser()
+            chunk = []
+            try:
+                async for data in body:
+                    for item in parser.feed(data):
+                        received += 1
+                        chunk.append(parse_item(item))
+                        if len(chunk) >= chunk_size:
+                            await queue.put(chunk)
+                            chunk = []
+                for item in parser.close():
+                    received += 1
+                    chunk.append(parse_item(item))
+                if chunk:
+                    await queue.put(chunk)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                #  запись остановится на конце очереди, а ошибка разбора поднимется из задачи producer
+                await queue.put(None)
+                raise
+            await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        totals = {}
+        try:
+            while (chunk := await queue.get()) is not None:
+                result = await write_chunk(chunk)
+                if isinstance(result, ErrorResponse):
+                    return result
+                for key, value in result.items():
+                    totals[key] = totals.get(key, 0) + value
+        finally:
+            if not producer.done():
+                producer.cancel()
+                with suppress(asyncio.CancelledError):
+                    await producer
+
+        try:
+            await producer
+        except (ValueError, KeyError, TypeError) as exc:
+            response = ErrorResponse(code=422, message=f"Некорректный элемент №{received}: {exc!r}")
+            return response
+
+        return {"received": received, **totals}
@@ -0,0 +1,17 @@
+from dto import UniqueProductIdentifierDTO
+from model import UniqueProductIdentifiers
+
+
+class UniqueProductIdentifierDtoService:
+
+    @staticmethod
+    def get_unique_product_identifier_dto(product: UniqueProductIdentifiers) -> UniqueProductIdentifierDTO:
+
+        product_dto = UniqueProductIdentifierDTO(
+            unique_product_code=product.unique_product_code,
+            shift_task_id=product.shift_task_id,
+            is_aggregated=product.is_aggregated,
+            aggregated_at=product.aggregated_at,
+        )
+
+        return product_dto
@@ -0,0 +1,62 @@
+import asyncio
+import datetime
+import os
+
+import pytest
+
+from model import ShiftTask, db_helper
+
+
+def make_shift_tasks(count: int) -> list[ShiftTask]:
+    return [
+        ShiftTask(
+            id=index,
+            closing_status=False,
+            closed_at=None,
+            view_task_to_shift=f"Задание на смену {index}",
+            work_center="Какой-то рабочий центр",
+            line="Т2",
+            shift="1",
+            team="Бригада №4",
+            party_number=index,
+            party_data=datetime.date(2024, 1, 30),
+            nomenclature="Какая то номенклатура",
+            code_ekn="456678",
+            id_of_the_rc="A",
+            date_time_shift_start=datetime.datetime(2024, 1, 30, 20),
+            date_time_shift_end=datetime.datetime(2024, 1, 31, 8),
+        )
+        for index in range(count)
+    ]
+
+
+@pytest.fixture
+def shift_task() -> ShiftTask:
+    return make_shift_tasks(1)[0]
+
+
+@pytest.fixture
+def shift_task_page() -> list[ShiftTask]:
+    return make_shift_tasks(100)
+
+
+@pytest.fixture(scope="module")
+def loop():
+    """
+    Цикл событий для бенчмарков асинхронных методов на БД.
+    Бенчмарки на БД из настроек model.config запускаются только с переменной окружения BENCHMARK_DB=1,
+    БД должна быть заранее наполнена, например python -m benchmark.load_test
+    """
+    if os.getenv("BENCHMARK_DB") != "1":
+        pytest.skip("нужна наполненная БД, задайте BENCHMARK_DB=1")
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(db_helper.dispose())
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def session(loop):
+    session = db_helper.session_factory()
+    yield session
+    loop.run_until_complete(session.close())
@@ -0,0 +1,59 @@
+import datetime
+
+from sqlalchemy.dialects import postgresql
+
+from dao import DaoShiftTaskRepository
+
+
+dao_obj = DaoShiftTaskRepository()
+SEVERAL_PARAMS = {"closing_status": False, "team": "Бригада №4", "party_data": datetime.date(2024, 1, 30)}
+
+
+def test_build_several_params_query(benchmark):
+    stmt = benchmark(dao_obj.build_several_params_query, several_params=SEVERAL_PARAMS, limit=10, after_id=100)
+    assert stmt is not None
+
+
+def test_build_upsert_query_and_compile(benchmark):
+    def build_and_compile():
+        return dao_obj.build_upsert_query(now=datetime.datetime.now()).compile(dialect=postgresql.dialect())
+
+    compiled = benchmark(build_and_compile)
+    assert "ON CONFLICT" in str(compiled)
+
+
+def test_find_by_id(benchmark, loop, session):
+    first_task = loop.run_until_complete(
+        dao_obj.find_by_several_params(session=session, several_params={}, limit=1)
+    )[0]
+
+    def find_by_id():
+        session.expunge_all()
+        return loop.run_until_complete(dao_obj.find_by_id(session=session, shift_task_id=first_task.id))
+
+    assert benchmark(find_by_id).id == first_task.id
+
+
+def test_find_by_several_params(benchmark, loop, session):
+    first_task = loop.run_until_complete(
+        dao_obj.find_by_several_params(session=session, several_params={}, limit=1)
+    )[0]
+
+    def find_by_several_params():
+        return loop.run_until_complete(
+            dao_obj.find_by_several_params(session=session, several_params={"team": first_task.team}, limit=50)
+        )
+
+    assert len(benchmark(find_by_several_params)) > 0
+
+
+def test_find_ids_by_party_keys(benchmark, loop, session):
+    first_task = loop.run_until_complete(
+        dao_obj.find_by_several_params(session=session, several_params={}, limit=1)
+    )[0]
+    party_key = (first_task.party_number, first_task.party_data)
+
+    def find_ids_by_party_keys():
+        return loop.run_until_complete(dao_obj.find_ids_by_party_keys(session=session, party_keys={party_key}))
+
+    assert benchmark(find_ids_by_party_keys) == {party_key: first_task.id}
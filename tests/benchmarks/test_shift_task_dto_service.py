@@ -0,0 +1,20 @@
+from service import ShiftTaskDtoService
+
+
+dto_obj = ShiftTaskDtoService()
+
+
+def test_get_shift_task_dto(benchmark, shift_task):
+    shift_task_dto = benchmark(dto_obj.get_shift_task_dto, shift_task)
+    assert shift_task_dto.party_number == shift_task.party_number
+
+
+def test_get_shift_task_dto_list(benchmark, shift_task_page):
+    shift_task_dto_list = benchmark(dto_obj.get_shift_task_dto_list, shift_task_page)
+    assert len(shift_task_dto_list) == len(shift_task_page)
+
+
+def test_dump_shift_task_list_json(benchmark, shift_task_page):
+    shift_task_dto_list = dto_obj.get_shift_task_dto_list(shift_task_page)
+    content = benchmark(dto_obj.dump_shift_task_list_json, shift_task_dto_list)
+    assert content.startswith(b"[{")
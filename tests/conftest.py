@@ -0,0 +1,10 @@
+import os
+
+
+#  настройки приложения читаются при импорте модулей, для тестов без БД хватает любого адреса:
+#  соединение с БД открывается только при первом запросе
+os.environ.setdefault("DB_HOST", "127.0.0.1")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("DB_USER", "product_manager")
+os.environ.setdefault("DB_PASS", "0000")
+os.environ.setdefault("DB_NAME", "product_release_control")
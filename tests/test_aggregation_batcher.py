@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from dto import ErrorResponse
+from service import AggregationBatcher
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeDao:
+    def __init__(self, result=None):
+        self.batches = []
+        self.result = result
+
+    async def aggregate_unique_product_code_pairs(self, session, pairs):
+        self.batches.append(list(pairs))
+        if self.result is not None:
+            if isinstance(self.result, Exception):
+                raise self.result
+            return self.result
+        return [f"{shift_task_id}:{code}" for shift_task_id, code in pairs]
+
+
+def make_batcher(
+    dao: FakeDao,
+    max_batch_size: int = 3,
+    max_delay: float = 0.01,
+    timeout: float = 5,
+) -> AggregationBatcher:
+    batcher = AggregationBatcher(
+        session_factory=FakeSession, max_batch_size=max_batch_size, max_delay=max_delay, timeout=timeout,
+    )
+    batcher.dao_obj = dao
+    return batcher
+
+
+async def aggregate_all(batcher: AggregationBatcher, pairs: list[tuple[int, str]]) -> list:
+    batcher.start()
+    try:
+        return await asyncio.gather(
+            *(batcher.aggregate(shift_task_id, code) for shift_task_id, code in pairs),
+            return_exceptions=True,
+        )
+    finally:
+        await batcher.stop()
+
+
+def test_each_request_gets_its_own_result():
+    dao = FakeDao()
+    pairs = [(shift_task_id, f"код-{index}") for index, shift_task_id in enumerate([1, 2, 1, 3, 2, 1, 1])]
+    results = asyncio.run(aggregate_all(make_batcher(dao), pairs))
+
+    assert results == [f"{shift_task_id}:{code}" for shift_task_id, code in pairs]
+    assert [len(batch) for batch in dao.batches] == [3, 3, 1]
+    assert [pair for batch in dao.batches for pair in batch] == pairs
+
+
+def test_batch_error_is_returned_to_every_request():
+    error = ErrorResponse(code=500, message="База данных недоступна")
+    results = asyncio.run(aggregate_all(make_batcher(FakeDao(result=error)), [(1, "a"), (1, "b")]))
+    assert results == [error, error]
+
+
+def test_exception_is_raised_in_every_request():
+    results = asyncio.run(aggregate_all(make_batcher(FakeDao(result=OSError("нет соединения"))), [(1, "a"), (2, "b")]))
+    assert all(isinstance(result, OSError) for result in results)
+
+
+def test_stop_flushes_pending_requests():
+    async def scenario():
+        dao = FakeDao()
+        batcher = make_batcher(dao, max_batch_size=100, max_delay=60)
+        batcher.start()
+        pending = [asyncio.create_task(batcher.aggregate(1, code)) for code in ("a", "b")]
+        await asyncio.sleep(0)
+        await batcher.stop()
+        return await asyncio.gather(*pending), batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == ["1:a", "1:b"]
+    assert stats["batches"] == 1
+    assert stats["requests"] == 2
+
+
+@pytest.mark.parametrize("max_batch_size", [1, 2, 5])
+def test_batches_never_exceed_max_size(max_batch_size):
+    dao = FakeDao()
+    pairs = [(1, str(index)) for index in range(11)]
+    asyncio.run(aggregate_all(make_batcher(dao, max_batch_size=max_batch_size), pairs))
+    assert max(len(batch) for batch in dao.batches) <= max_batch_size
+
+
+def test_not_running_batcher_writes_directly():
+    dao = FakeDao()
+    batcher = make_batcher(dao)
+    assert asyncio.run(batcher.aggregate(1, "a")) == "1:a"
+    assert dao.batches == [[(1, "a")]]
+    assert batcher.stats()["direct_writes"] == 1
+
+
+def test_wait_for_batch_is_bounded():
+    class SlowDao(FakeDao):
+        async def aggregate_unique_product_code_pairs(self, session, pairs):
+            await asyncio.sleep(1)
+            return await super().aggregate_unique_product_code_pairs(session, pairs)
+
+    async def scenario():
+        batcher = make_batcher(SlowDao(), timeout=0.05)
+        batcher.start()
+        try:
+            return await batcher.aggregate(1, "a"), batcher.stats()
+        finally:
+            await batcher.stop()
+
+    result, stats = asyncio.run(scenario())
+    assert isinstance(result, ErrorResponse) and result.code == 503
+    assert stats["timeouts"] == 1
+
+
+def test_crashed_runner_fails_pending_requests_and_falls_back():
+    async def scenario():
+        dao = FakeDao()
+        batcher = make_batcher(dao, max_batch_size=100, max_delay=60)
+
+        async def crash():
+            await asyncio.sleep(0)
+            raise RuntimeError("сбой")
+
+        batcher.run = crash
+        batcher.start()
+        pending = asyncio.create_task(batcher.aggregate(1, "a"))
+        result = await pending
+        return result, await batcher.aggregate(1, "b"), dao.batches
+
+    queued, direct, batches = asyncio.run(scenario())
+    assert isinstance(queued, ErrorResponse) and queued.code == 503
+    assert direct == "1:b"
+    assert batches == [[(1, "b")]]
@@ -0,0 +1,78 @@
+import datetime
+import sys
+
+import pytest
+
+from cache.batch_key_resolver import BatchKeyResolver
+
+
+PARTY_DATA = datetime.date(2024, 1, 30)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    #  имя модуля в пакете cache занято одноименным объектом, поэтому модуль берется из sys.modules
+    monkeypatch.setattr(sys.modules["cache.batch_key_resolver"], "time", clock)
+    return clock
+
+
+def test_known_and_unknown_keys(clock):
+    resolver = BatchKeyResolver(negative_ttl=10, negative_size=100)
+    resolver.remember((1, PARTY_DATA), 11)
+    found, unresolved = resolver.lookup_many({(1, PARTY_DATA), (2, PARTY_DATA)})
+    assert found == {(1, PARTY_DATA): 11}
+    assert unresolved == {(2, PARTY_DATA)}
+
+
+def test_missing_key_is_not_looked_up_until_negative_ttl_expires(clock):
+    resolver = BatchKeyResolver(negative_ttl=10, negative_size=100)
+    resolver.remember_missing([(2, PARTY_DATA)])
+    assert resolver.lookup_many({(2, PARTY_DATA)}) == ({}, set())
+    clock.now += 11
+    assert resolver.lookup_many({(2, PARTY_DATA)}) == ({}, {(2, PARTY_DATA)})
+
+
+def test_remember_overrides_missing(clock):
+    resolver = BatchKeyResolver(negative_ttl=10, negative_size=100)
+    resolver.remember_missing([(2, PARTY_DATA)])
+    resolver.remember((2, PARTY_DATA), 22)
+    assert resolver.lookup_many({(2, PARTY_DATA)}) == ({(2, PARTY_DATA): 22}, set())
+
+
+def test_forget(clock):
+    resolver = BatchKeyResolver(negative_ttl=10, negative_size=100)
+    resolver.remember((1, PARTY_DATA), 11)
+    resolver.forget((1, PARTY_DATA))
+    assert resolver.lookup_many({(1, PARTY_DATA)}) == ({}, {(1, PARTY_DATA)})
+
+
+def test_expired_missing_key_is_deleted_on_lookup(clock):
+    resolver = BatchKeyResolver(negative_ttl=10, negative_size=100)
+    resolver.remember_missing([(2, PARTY_DATA)])
+    clock.now += 11
+    resolver.lookup_many({(2, PARTY_DATA)})
+    assert resolver.stats()["missing_size"] == 0
+
+
+def test_missing_keys_are_evicted_in_lru_order(clock):
+    resolver = BatchKeyResolver(negative_ttl=10, negative_size=2)
+    resolver.remember_missing([(1, PARTY_DATA), (2, PARTY_DATA)])
+    resolver.remember_missing([(1, PARTY_DATA)])
+    resolver.remember_missing([(3, PARTY_DATA)])
+    assert resolver.stats()["missing_size"] == 2
+    assert resolver.lookup_many({(1, PARTY_DATA), (2, PARTY_DATA), (3, PARTY_DATA)}) == ({}, {(2, PARTY_DATA)})
+
+
+def test_zero_negative_size_disables_negative_cache(clock):
+    resolver = BatchKeyResolver(negative_ttl=10, negative_size=0)
+    resolver.remember_missing([(2, PARTY_DATA)])
+    assert resolver.lookup_many({(2, PARTY_DATA)}) == ({}, {(2, PARTY_DATA)})
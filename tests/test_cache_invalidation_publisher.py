@@ -0,0 +1,50 @@
+import datetime
+import json
+
+from cache.cache_invalidation_publisher import CacheInvalidationPublisher
+
+
+def test_small_event_is_one_payload():
+    publisher = CacheInvalidationPublisher(channel="test")
+    payloads = publisher.build_payloads(
+        shift_task_ids=[1, 2],
+        forget=[(1, datetime.date(2024, 1, 30))],
+        remember=[(2, datetime.date(2024, 1, 31), 2)],
+        aggregated=[("код", 1)],
+    )
+    assert len(payloads) == 1
+    assert json.loads(payloads[0]) == {
+        "origin": publisher.origin,
+        "shift_task_ids": [1, 2],
+        "forget": [[1, "2024-01-30"]],
+        "remember": [[2, "2024-01-31", 2]],
+        "aggregated": [["код", 1]],
+    }
+
+
+def test_empty_event_is_not_published():
+    assert CacheInvalidationPublisher(channel="test").build_payloads() == []
+
+
+def test_large_event_is_split_without_losing_items():
+    publisher = CacheInvalidationPublisher(channel="test")
+    shift_task_ids = list(range(3000))
+    aggregated = [(f"уникальный-код-{index:06d}", index) for index in range(3000)]
+    payloads = publisher.build_payloads(shift_task_ids=shift_task_ids, aggregated=aggregated)
+
+    assert len(payloads) > 1
+    events = [json.loads(payload) for payload in payloads]
+    assert all(len(payload) <= publisher.MAX_PAYLOAD_SIZE for payload in payloads)
+    assert all(event["origin"] == publisher.origin for event in events)
+    assert [item for event in events for item in event["shift_task_ids"]] == shift_task_ids
+    assert [tuple(item) for event in events for item in event["aggregated"]] == aggregated
+
+
+def test_clear_verification_index_is_sent_once_even_without_items():
+    publisher = CacheInvalidationPublisher(channel="test")
+    payloads = publisher.build_payloads(clear_verification_index=True)
+    assert [json.loads(payload)["clear_verification_index"] for payload in payloads] == [True]
+
+    payloads = publisher.build_payloads(shift_task_ids=range(2000), clear_verification_index=True)
+    assert len(payloads) > 1
+    assert [json.loads(payload).get("clear_verification_index", False) for payload in payloads].count(True) == 1
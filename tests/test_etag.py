@@ -0,0 +1,27 @@
+import pytest
+
+from exception import ShiftTaskException
+from view.etag import format_etag, parse_if_match
+
+
+@pytest.mark.parametrize(
+    ("if_match", "version"),
+    [
+        (None, None),
+        ("*", None),
+        (" * ", None),
+        ('"3"', 3),
+        ('W/"3"', 3),
+        (" \"12\" ", 12),
+        (format_etag(7), 7),
+    ],
+)
+def test_parse_if_match(if_match, version):
+    assert parse_if_match(if_match) == version
+
+
+@pytest.mark.parametrize("if_match", ['"abc"', '"-1"', '""', '"1", "2"'])
+def test_invalid_if_match(if_match):
+    with pytest.raises(ShiftTaskException) as error:
+        parse_if_match(if_match)
+    assert error.value.status_code == 412
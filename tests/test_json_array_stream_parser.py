@@ -0,0 +1,74 @@
+import json
+import random
+
+import pytest
+
+from service import JsonArrayStreamParser
+
+
+ITEMS = [
+    {"УникальныйКодПродукта": "код-1", "НомерПартии": 1, "ДатаПартии": "2024-01-30"},
+    {"вложенный": {"список": [1, 2.5, None, True], "строка": "с \"кавычками\" и ]скобками["}},
+    12345,
+    -0.5e3,
+    "строка",
+    None,
+    False,
+    [],
+]
+
+
+def parse_in_chunks(body: bytes, chunk_sizes) -> list:
+    parser = JsonArrayStreamParser()
+    items = []
+    position = 0
+    for size in chunk_sizes:
+        items.extend(parser.feed(body[position:position + size]))
+        position += size
+    items.extend(parser.feed(body[position:]))
+    items.extend(parser.close())
+    return items
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_every_split_point(indent):
+    body = json.dumps(ITEMS, ensure_ascii=False, indent=indent).encode()
+    for split in range(len(body) + 1):
+        assert parse_in_chunks(body, [split]) == ITEMS
+
+
+def test_random_chunks_split_utf8_characters():
+    body = json.dumps(ITEMS, ensure_ascii=False).encode()
+    rng = random.Random(0)
+    for _ in range(200):
+        chunk_sizes = [rng.randint(1, 7) for _ in range(len(body))]
+        assert parse_in_chunks(body, chunk_sizes) == ITEMS
+
+
+def test_one_byte_chunks():
+    body = json.dumps(ITEMS, ensure_ascii=False).encode()
+    assert parse_in_chunks(body, [1] * len(body)) == ITEMS
+
+
+def test_number_is_not_returned_before_delimiter():
+    parser = JsonArrayStreamParser()
+    assert parser.feed(b"[12") == []
+    assert parser.feed(b"34, 5") == [1234]
+    assert parser.feed(b"6]") == [56]
+    assert parser.close() == []
+
+
+def test_empty_array():
+    assert parse_in_chunks(b" [ ] ", [2]) == []
+
+
+@pytest.mark.parametrize("body", [b'{"a": 1}', b"[1, 2", b"[1 2]", b"[1] 2", b'[{"a": ]'])
+def test_invalid_body(body):
+    with pytest.raises(ValueError):
+        parse_in_chunks(body, [3])
+
+
+def test_item_size_limit():
+    parser = JsonArrayStreamParser(max_item_size=10)
+    with pytest.raises(ValueError):
+        parser.feed(b'["' + b"x" * 20)
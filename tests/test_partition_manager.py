@@ -0,0 +1,74 @@
+import asyncio
+import datetime
+
+from service.partition_manager import PartitionManager
+
+
+class FakePartitionManager(PartitionManager):
+    """
+    Менеджер секций без БД: запросы DDL и переносы строк из DEFAULT только запоминаются
+    """
+
+    def __init__(self, existing: set[str], default_months: set[datetime.date]):
+        super().__init__(
+            engine=None,
+            session_factory=None,
+            table_name="codes",
+            months_ahead=1,
+            retention_months=None,
+            check_interval=1,
+            lock_timeout=1,
+        )
+        self.existing = existing
+        self.default_months = default_months
+        self.statements = []
+        self.moved = []
+
+    async def list_partitions(self, connection) -> list[dict]:
+        return [{"name": name, "bound": ""} for name in self.existing]
+
+    async def list_default_months(self, connection) -> set[datetime.date]:
+        return self.default_months
+
+    async def execute_ddl(self, connection, statement: str) -> bool:
+        self.statements.append(statement)
+        return True
+
+    async def move_default_rows(self, name: str, month: datetime.date, next_month: datetime.date) -> bool:
+        self.moved.append((name, month, next_month))
+        return True
+
+
+def test_creates_default_and_window_partitions():
+    manager = FakePartitionManager(existing=set(), default_months=set())
+    created = asyncio.run(
+        manager.create_partitions(None, first_day=datetime.date(2024, 12, 15), last_day=datetime.date(2025, 1, 1))
+    )
+    assert created == ["codes_default", "codes_p2024_12", "codes_p2025_01"]
+    assert "FOR VALUES FROM ('2024-12-01') TO ('2025-01-01')" in manager.statements[1]
+    assert manager.moved == []
+
+
+def test_rows_in_default_beyond_window_are_moved_to_new_partition():
+    manager = FakePartitionManager(
+        existing={"codes_default", "codes_p2024_12"},
+        default_months={datetime.date(2025, 6, 1)},
+    )
+    created = asyncio.run(
+        manager.create_partitions(None, first_day=datetime.date(2024, 12, 15), last_day=datetime.date(2025, 1, 1))
+    )
+    assert created == ["codes_p2025_01", "codes_p2025_06"]
+    assert manager.moved == [("codes_p2025_06", datetime.date(2025, 6, 1), datetime.date(2025, 7, 1))]
+    assert all("codes_p2025_06" not in statement for statement in manager.statements)
+
+
+def test_existing_partitions_are_not_created_again():
+    manager = FakePartitionManager(
+        existing={"codes_default", "codes_p2024_12", "codes_p2025_01"},
+        default_months=set(),
+    )
+    created = asyncio.run(
+        manager.create_partitions(None, first_day=datetime.date(2024, 12, 15), last_day=datetime.date(2025, 1, 1))
+    )
+    assert created == []
+    assert manager.statements == []
@@ -0,0 +1,96 @@
+import asyncio
+
+from starlette.requests import Request
+
+from model.read_your_writes_middleware import ReadYourWritesMiddleware
+from model.replica_router import ReplicaRouter
+
+
+class FakeSessionFactory:
+    """
+    Фабрика сессий, сессия которой на любой запрос возвращает заданный LSN
+    """
+
+    def __init__(self, lsn: str | None):
+        self.lsn = lsn
+        self.queries = 0
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def scalar(self, statement):
+        self.queries += 1
+        return self.lsn
+
+
+def make_request(headers: dict[str, str]) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_parse_and_format_lsn():
+    assert ReplicaRouter.parse_lsn("16/B374D848") == (0x16 << 32) | 0xB374D848
+    assert ReplicaRouter.format_lsn(ReplicaRouter.parse_lsn("16/B374D848")) == "16/B374D848"
+    assert ReplicaRouter.parse_lsn("мусор") is None
+    assert ReplicaRouter.parse_lsn(None) is None
+
+
+def test_required_lsn_from_cookie_or_header():
+    assert ReplicaRouter.get_required_lsn(make_request({})) is None
+    assert ReplicaRouter.get_required_lsn(make_request({"cookie": "db_write_lsn=0/10"})) == 16
+    assert ReplicaRouter.get_required_lsn(make_request({"x-db-write-lsn": "0/20", "cookie": "db_write_lsn=0/10"})) == 32
+
+
+def test_reads_without_write_go_to_replicas_round_robin():
+    primary, first, second = FakeSessionFactory("0/0"), FakeSessionFactory("0/0"), FakeSessionFactory("0/0")
+    router = ReplicaRouter(primary, [first, second], sticky_window=5)
+    chosen = [asyncio.run(router.get_read_session_factory()) for _ in range(3)]
+    assert chosen == [first, second, first]
+    assert first.queries == second.queries == 0
+
+
+def test_read_after_write_goes_to_caught_up_replica_or_primary():
+    primary, replica = FakeSessionFactory("0/100"), FakeSessionFactory("0/50")
+    router = ReplicaRouter(primary, [replica], sticky_window=5)
+    assert asyncio.run(router.get_read_session_factory(required_lsn=0x100)) is primary
+    assert router.stats()["lagging_reads"] == 1
+
+    replica.lsn = "0/200"
+    assert asyncio.run(router.get_read_session_factory(required_lsn=0x100)) is replica
+    #  позиция реплики закеширована, следующее чтение не перечитывает ее
+    assert asyncio.run(router.get_read_session_factory(required_lsn=0x100)) is replica
+    assert replica.queries == 2
+
+
+def test_middleware_returns_write_lsn_for_writes_only():
+    primary = FakeSessionFactory("1/A")
+    router = ReplicaRouter(primary, [FakeSessionFactory("0/0")], sticky_window=5)
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def call(method: str) -> dict:
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await ReadYourWritesMiddleware(app, replica_router=router)({"type": "http", "method": method}, None, send)
+        return dict(messages[0]["headers"])
+
+    headers = asyncio.run(call("POST"))
+    assert headers[b"x-db-write-lsn"] == b"1/A"
+    assert headers[b"set-cookie"].startswith(b"db_write_lsn=1/A; Max-Age=5")
+    assert router.wrote_recently()
+    assert asyncio.run(call("GET")) == {}
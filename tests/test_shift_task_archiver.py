@@ -0,0 +1,30 @@
+import asyncio
+
+from sqlalchemy.exc import OperationalError
+
+from service import ShiftTaskArchiver
+
+
+def test_run_survives_database_errors_and_stops_on_cancel():
+    async def scenario():
+        archiver = ShiftTaskArchiver(session_factory=None, retention_days=1, batch_size=1, max_codes=1, interval=0)
+        calls = 0
+
+        async def archive():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise OperationalError("SELECT 1", {}, Exception("lock timeout"))
+            return {"shift_tasks": 0, "codes": 0, "transactions": 0}
+
+        archiver.archive = archive
+        archiver.start()
+        while calls < 3:
+            await asyncio.sleep(0)
+        await archiver.stop()
+        return calls, archiver.errors, archiver._task
+
+    calls, errors, task = asyncio.run(scenario())
+    assert calls >= 3
+    assert errors == 1
+    assert task is None
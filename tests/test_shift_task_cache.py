@@ -0,0 +1,68 @@
+import sys
+
+import pytest
+
+from cache.shift_task_cache import ShiftTaskCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    #  имя модуля в пакете cache занято одноименным объектом, поэтому модуль берется из sys.modules
+    monkeypatch.setattr(sys.modules["cache.shift_task_cache"], "time", clock)
+    return clock
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = ShiftTaskCache(max_size=10, ttl=5)
+    cache.set(1, (b"{}", 1))
+    clock.now += 4.9
+    assert cache.get(1) == (b"{}", 1)
+    clock.now += 0.2
+    assert cache.get(1) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ShiftTaskCache(max_size=2, ttl=60)
+    cache.set(1, (b"1", 1))
+    cache.set(2, (b"2", 1))
+    assert cache.get(1) is not None
+    cache.set(3, (b"3", 1))
+    assert cache.get(2) is None
+    assert cache.get(1) == (b"1", 1)
+    assert cache.get(3) == (b"3", 1)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_by_alias_variants_are_separate_and_invalidated_together(clock):
+    cache = ShiftTaskCache(max_size=10, ttl=60)
+    cache.set(1, (b"ru", 1), by_alias=True)
+    cache.set(1, (b"en", 1), by_alias=False)
+    assert cache.get(1, by_alias=True) == (b"ru", 1)
+    assert cache.get(1, by_alias=False) == (b"en", 1)
+    cache.invalidate(1)
+    assert cache.get(1, by_alias=True) is None
+    assert cache.get(1, by_alias=False) is None
+
+
+def test_read_before_invalidation_is_not_cached(clock):
+    cache = ShiftTaskCache(max_size=10, ttl=60)
+    generation = cache.generation
+    cache.invalidate_many([1])
+    cache.set(1, (b"old", 1), generation=generation)
+    assert cache.get(1) is None
+
+
+def test_zero_size_disables_cache(clock):
+    cache = ShiftTaskCache(max_size=0, ttl=60)
+    cache.set(1, (b"{}", 1))
+    assert cache.get(1) is None
@@ -0,0 +1,43 @@
+import pytest
+
+from metrics import DEFAULT_DAO_METHOD
+from profiling.slow_query_log import SlowQueryLog
+from profiling.slow_query_profiler import SlowQueryProfiler
+
+
+DAO_METHOD = "DaoShiftTaskRepository.find_by_id"
+
+
+@pytest.fixture
+def profiler():
+    return SlowQueryProfiler(engine=None, slow_query_log=SlowQueryLog(max_size=10), threshold_ms=0, sample_rate=1)
+
+
+def test_explains_dao_select(profiler):
+    assert profiler.should_explain("SELECT shift_tasks.id FROM shift_tasks WHERE shift_tasks.id = $1", DAO_METHOD)
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "UPDATE shift_tasks SET version = $1",
+        "SELECT pg_try_advisory_lock($1)",
+        "SELECT pg_advisory_unlock($1)",
+        "SELECT pg_advisory_xact_lock(7230023)",
+        "SELECT pg_notify($1, $2)",
+        "SELECT nextval('unique_product_identifiers_id_seq')",
+        "SELECT unique_product_identifiers.id FROM unique_product_identifiers WHERE id = $1 FOR UPDATE",
+        "SELECT shift_tasks.id FROM shift_tasks FOR NO KEY UPDATE SKIP LOCKED",
+        "SELECT shift_tasks.id FROM shift_tasks\nFOR  SHARE",
+    ],
+)
+def test_skips_statements_with_side_effects(profiler, statement):
+    assert not profiler.should_explain(statement, DAO_METHOD)
+
+
+def test_skips_statements_outside_dao_methods(profiler):
+    assert not profiler.should_explain("SELECT shift_tasks.id FROM shift_tasks", DEFAULT_DAO_METHOD)
+
+
+def test_column_names_do_not_look_like_side_effects(profiler):
+    assert profiler.should_explain("SELECT shift_tasks.update_for_share, nextval_count FROM shift_tasks", DAO_METHOD)
@@ -0,0 +1,26 @@
+from cache.verification_index import VerificationIndex
+
+
+def test_add_and_lookup():
+    index = VerificationIndex(max_codes=10)
+    index.add("код", 5, False)
+    assert index.lookup("код") == (5, False)
+    index.add("код", 5, True)
+    assert index.lookup("код") == (5, True)
+
+
+def test_add_without_overwrite_keeps_existing_code():
+    index = VerificationIndex(max_codes=10)
+    index.add("код", 5, True)
+    assert index.add("код", 5, False, overwrite=False)
+    assert index.lookup("код") == (5, True)
+    index.add("другой код", 6, False, overwrite=False)
+    assert index.lookup("другой код") == (6, False)
+
+
+def test_full_index_does_not_add_codes():
+    index = VerificationIndex(max_codes=1)
+    assert index.add("код", 5, False)
+    assert not index.add("другой код", 6, False)
+    assert index.lookup("другой код") is None
+    assert not index.complete
@@ -1,5 +1,15 @@
 __all__ = (
+    "admin_router",
+    "cache_router",
+    "export_router",
+    "metrics_router",
     "shift_task_router",
+    "unique_product_identifiers_router",
 )
 
+from view.admin_view import router as admin_router
+from view.cache_view import router as cache_router
+from view.export_view import router as export_router
+from view.metrics_view import router as metrics_router
 from view.shift_tasks_view import router as shift_task_router
+from view.unique_product_identifiers_view import router as unique_product_identifiers_router
@@ -0,0 +1,20 @@
+import secrets
+
+from fastapi import Header
+
+from exception import ShiftTaskException
+from model import settings
+
+
+async def require_admin_token(x_admin_token: str | None = Header(default=None)) -> None:
+    """
+    Зависимость для эндпойнтов /admin: пропускает запрос только с верным заголовком X-Admin-Token
+    :param x_admin_token: значение заголовка X-Admin-Token
+    :return: None
+    """
+    if (
+        settings.admin_token is None
+        or x_admin_token is None
+        or not secrets.compare_digest(x_admin_token.encode(), settings.admin_token.encode())
+    ):
+        raise ShiftTaskException(message="Нет доступа", status_code=403)
@@ -0,0 +1,99 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dao import DaoShiftTaskRepository
+from dto import ErrorResponse
+from exception import ShiftTaskException
+from model import db_helper
+from profiling import ProfileFormatter, profile_store, slow_query_log
+from service import aggregation_batcher, partition_manager, shift_task_archiver
+from view.admin_token import require_admin_token
+
+
+router = APIRouter(tags=["admin"], dependencies=[Depends(require_admin_token)])
+dao_obj = DaoShiftTaskRepository()
+
+
+@router.get("/admin/slow_queries")
+async def get_slow_queries(limit: int | None = Query(default=None, ge=1)):
+    return {
+        "stats": slow_query_log.stats(),
+        "entries": slow_query_log.entries(limit=limit),
+    }
+
+
+@router.delete("/admin/slow_queries")
+async def clear_slow_queries():
+    slow_query_log.clear()
+    return {"message": "Журнал медленных запросов очищен"}
+
+
+@router.get("/admin/profiles")
+async def get_profiles():
+    return profile_store.summaries()
+
+
+@router.get("/admin/profiles/{request_id}")
+async def get_profile(
+    request_id: str,
+    profile_format: Literal["collapsed", "speedscope"] = Query(default="collapsed", alias="format"),
+):
+    profile = profile_store.get(request_id)
+    if profile is None:
+        raise ShiftTaskException(message=f"Профиль запроса {request_id} не найден", status_code=404)
+
+    if profile_format == "speedscope":
+        return ProfileFormatter.to_speedscope(profile)
+    return PlainTextResponse(ProfileFormatter.to_collapsed(profile))
+
+
+@router.get("/admin/aggregation_batcher")
+async def get_aggregation_batcher_stats():
+    return aggregation_batcher.stats()
+
+
+@router.get("/admin/replica_router")
+async def get_replica_router_stats():
+    return db_helper.replica_router.stats()
+
+
+@router.get("/admin/partitions")
+async def get_partitions():
+    async with db_helper.engine.connect() as connection:
+        partitions = await partition_manager.list_partitions(connection)
+    return {
+        "stats": partition_manager.stats(),
+        "partitions": partitions,
+    }
+
+
+@router.post("/admin/partitions/maintain")
+async def maintain_partitions():
+    return await partition_manager.maintain()
+
+
+@router.get("/admin/archiver")
+async def get_archiver_stats():
+    return shift_task_archiver.stats()
+
+
+@router.post("/admin/archiver/run")
+async def run_archiver():
+    return await shift_task_archiver.archive()
+
+
+@router.post("/admin/shift_task_counters/repair")
+async def repair_shift_task_counters(
+    shift_task_id: list[int] | None = Query(default=None),
+    session: AsyncSession = Depends(db_helper.session_dependency),
+):
+    response = await dao_obj.repair_counters(session=session, shift_task_ids=shift_task_id)
+    if isinstance(response, ErrorResponse):
+        raise ShiftTaskException(
+            message=response.message,
+            status_code=response.code
+        )
+    return response
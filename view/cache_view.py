@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from cache import batch_key_resolver, cache_invalidation_listener, shift_task_cache, verification_index
+
+
+router = APIRouter(tags=["cache"])
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        "shift_task_cache": shift_task_cache.stats(),
+        "batch_key_resolver": batch_key_resolver.stats(),
+        "verification_index": verification_index.stats(),
+        "cache_invalidation_listener": cache_invalidation_listener.stats(),
+    }
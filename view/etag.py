@@ -0,0 +1,26 @@
+from exception import ShiftTaskException
+
+
+def format_etag(version: int) -> str:
+    """
+    Функция превращает версию сменного задания в значение заголовка ETag
+    :param version: версия сменного задания
+    :return: str
+    """
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: str | None) -> int | None:
+    """
+    Функция достает ожидаемую версию сменного задания из заголовка If-Match.
+    Без заголовка или со значением "*" версия не проверяется
+    :param if_match: значение заголовка If-Match
+    :return: версия или None
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    etag = if_match.strip().removeprefix("W/").strip('"')
+    if not etag.isdigit():
+        raise ShiftTaskException(message=f"Некорректный заголовок If-Match: {if_match}", status_code=412)
+    return int(etag)
@@ -0,0 +1,49 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from dao import DaoShiftTaskRepository, DaoUniqueProductIdentifiersRepository
+from model import db_helper
+from service import ExportService
+from view.shift_task_filters import shift_task_filter_params
+
+
+router = APIRouter(tags=["export"])
+export_service = ExportService()
+
+
+@router.get("/export/shift_tasks")
+async def export_shift_tasks(
+    request: Request,
+    export_format: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    several_params: dict = Depends(shift_task_filter_params),
+):
+    stmt = DaoShiftTaskRepository.build_export_query(several_params=several_params)
+    return StreamingResponse(
+        export_service.stream(
+            stmt=stmt,
+            export_format=export_format,
+            session_factory=await db_helper.replica_router.get_read_session_factory(
+                db_helper.replica_router.get_required_lsn(request),
+            ),
+        ),
+        media_type=ExportService.MEDIA_TYPES[export_format],
+    )
+
+
+@router.get("/export/unique_product_identifiers")
+async def export_unique_product_identifiers(
+    request: Request,
+    export_format: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+    several_params: dict = Depends(shift_task_filter_params),
+):
+    stmt = DaoUniqueProductIdentifiersRepository.build_export_query(several_params=several_params)
+    return StreamingResponse(
+        export_service.stream(
+            stmt=stmt,
+            export_format=export_format,
+            session_factory=await db_helper.replica_router.get_read_session_factory(
+                db_helper.replica_router.get_required_lsn(request),
+            ),
+        ),
+        media_type=ExportService.MEDIA_TYPES[export_format],
+    )
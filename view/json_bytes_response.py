@@ -0,0 +1,8 @@
+from fastapi import Response
+
+
+class JSONBytesResponse(Response):
+    """
+    Ответ с уже сериализованным JSON: тело отдается как есть, без повторной проверки и кодирования в FastAPI
+    """
+    media_type = "application/json"
@@ -0,0 +1,45 @@
+from fastapi import Query
+import datetime
+
+
+async def shift_task_filter_params(
+    closing_status: bool = Query(None),
+    party_number: int = Query(None),
+    party_data: datetime.date = Query(None),
+    shift: str = Query(None, min_length=1, max_length=100),
+    team: str = Query(None, min_length=1, max_length=100),
+    nomenclature: str = Query(None, min_length=1, max_length=100),
+    code_ekn: str = Query(None, min_length=1, max_length=100),
+    id_of_the_rc: str = Query(None, min_length=1, max_length=100),
+    date_time_shift_start: datetime.datetime = Query(None),
+    date_time_shift_end: datetime.datetime = Query(None),
+) -> dict:
+    """
+    Зависимость собирает словарь параметров фильтрации сменных заданий из query параметров запроса.
+    В словарь попадают только переданные параметры
+    :return: dict с параметрами поискового запроса
+    """
+    several_params = {}
+    #  тоже немного хардкодинга
+    if closing_status is not None:
+        several_params["closing_status"] = closing_status
+    if party_number is not None:
+        several_params["party_number"] = party_number
+    if party_data is not None:
+        several_params["party_data"] = party_data
+    if shift is not None:
+        several_params["shift"] = shift
+    if team is not None:
+        several_params["team"] = team
+    if nomenclature is not None:
+        several_params["nomenclature"] = nomenclature
+    if code_ekn is not None:
+        several_params["code_ekn"] = code_ekn
+    if id_of_the_rc is not None:
+        several_params["id_of_the_rc"] = id_of_the_rc
+    if date_time_shift_start is not None:
+        several_params["date_time_shift_start"] = date_time_shift_start
+    if date_time_shift_end is not None:
+        several_params["date_time_shift_end"] = date_time_shift_end
+
+    return several_params
@@ -1,28 +1,58 @@
 from typing import Annotated
-from fastapi import APIRouter, Path, Depends, Query
+from fastapi import APIRouter, Path, Depends, Header, Query, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-import datetime
+from cache import shift_task_cache
 from dao import DaoShiftTaskRepository
+from dto import ErrorResponse, ShiftTaskUpdateDTO
+from dto import shift_task_create_adapter, shift_task_create_list_adapter
 from exception import ShiftTaskException
-from model import db_helper
-from model import ShiftTask
-from service import ShiftTaskDtoService
+from model import db_helper, settings
+from model import ShiftTask, ShiftTaskArchive
+from service import ShiftTaskDtoService, StreamIngestionService
+from view.etag import format_etag, parse_if_match
+from view.json_bytes_response import JSONBytesResponse
+from view.shift_task_filters import shift_task_filter_params
 
 
 router = APIRouter(tags=["shift_tasks"])
 dao_obj = DaoShiftTaskRepository()
 dto_obj = ShiftTaskDtoService()
+stream_ingestion_service = StreamIngestionService()
 
 
-@router.get("/shift_task/{shift_task_id}")
+def parse_shift_task(task: dict) -> dict:
+    """
+    Функция проверяет сменное задание из формата корпоративной системы заказчика
+    и преобразует его в словарь полей ShiftTask
+    :param task: словарь с полями на русском языке
+    :return: dict
+    """
+    return shift_task_create_adapter.validate_python(task)
+
+
+@router.get("/shift_task/{shift_task_id}", response_class=JSONBytesResponse)
 async def get_shift_task_by_id(
     shift_task_id: Annotated[int, Path()],
-    session: AsyncSession = Depends(db_helper.session_dependency),
+    by_alias: bool = Query(default=True),
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
 ):
+    cached_shift_task = shift_task_cache.get(shift_task_id, by_alias=by_alias)
+    if cached_shift_task is not None:
+        content, version = cached_shift_task
+        return JSONBytesResponse(content=content, headers={"ETag": format_etag(version)})
+
+    cache_generation = shift_task_cache.generation
     response = await dao_obj.find_by_id(session=session, shift_task_id=shift_task_id)
-    if isinstance(response, ShiftTask):
-        shift_task = dto_obj.get_shift_task_dto(response)
-        return shift_task
+    if isinstance(response, (ShiftTask, ShiftTaskArchive)):
+        shift_task = dto_obj.dump_shift_task_json(dto_obj.get_shift_task_dto(response), by_alias=by_alias)
+        #  пока реплики могут отставать от недавней записи, прочитанное с реплики не кешируется
+        if not (db_helper.replica_router.is_replica(session) and db_helper.replica_router.wrote_recently()):
+            shift_task_cache.set(
+                shift_task_id, (shift_task, response.version), by_alias=by_alias, generation=cache_generation,
+            )
+        return JSONBytesResponse(content=shift_task, headers={"ETag": format_etag(response.version)})
     else:
         raise ShiftTaskException(
             message=response.message,
@@ -30,16 +60,23 @@ async def get_shift_task_by_id(
         )
 
 
-@router.put("/shift_task/{shift_task_id}")
+@router.put("/shift_task/{shift_task_id}", response_class=JSONBytesResponse)
 async def update_shift_task_by_id(
     shift_task_id: Annotated[int, Path()],
-    update_data: dict,
+    update_data: ShiftTaskUpdateDTO,
+    by_alias: bool = Query(default=True),
+    if_match: str | None = Header(default=None),
     session: AsyncSession = Depends(db_helper.session_dependency),
 ):
-    response = await dao_obj.update_shift_task(session=session, shift_task_id=shift_task_id, update_data=update_data)
+    response = await dao_obj.update_shift_task(
+        session=session,
+        shift_task_id=shift_task_id,
+        update_data=update_data.model_dump(exclude_unset=True, exclude_none=True),
+        expected_version=parse_if_match(if_match),
+    )
     if isinstance(response, ShiftTask):
-        shift_task = dto_obj.get_shift_task_dto(response)
-        return shift_task
+        shift_task = dto_obj.dump_shift_task_json(dto_obj.get_shift_task_dto(response), by_alias=by_alias)
+        return JSONBytesResponse(content=shift_task, headers={"ETag": format_etag(response.version)})
     else:
         raise ShiftTaskException(
             message=response.message,
@@ -47,96 +84,103 @@ async def update_shift_task_by_id(
         )
 
 
-@router.post("/shift_task", status_code=201)
+@router.post(
+    "/shift_task",
+    status_code=201,
+    response_class=JSONBytesResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": shift_task_create_adapter.json_schema(by_alias=True)},
+                },
+            },
+        },
+    },
+)
 async def add_shift_task(
-    shift_task_list: list[dict],
+    request: Request,
+    by_alias: bool = Query(default=True),
     session: AsyncSession = Depends(db_helper.session_dependency),
 ):
-    task_list_to_return = []
-    for task in shift_task_list:
-        response = await dao_obj.create_shift_task(
-            session=session,
-            closing_status=task["СтатусЗакрытия"],
-            view_task_to_shift=task["ПредставлениеЗаданияНаСмену"],
-            line=task["Линия"],
-            shift=task["Смена"],
-            team=task["Бригада"],
-            party_number=task["НомерПартии"],
-            party_data=datetime.datetime.strptime(task["ДатаПартии"], "%Y-%m-%d").date(),
-            nomenclature=task["Номенклатура"],
-            code_ekn=task["КодЕКН"],
-            id_of_the_rc=task["ИдентификаторРЦ"],
-            date_time_shift_start=datetime.datetime.fromisoformat(
-                task["ДатаВремяНачалаСмены"]).replace(tzinfo=None),
-            date_time_shift_end=datetime.datetime.fromisoformat(
-                task["ДатаВремяОкончанияСмены"]).replace(tzinfo=None),
+    #  тело запроса проверяется целиком в pydantic-core, без промежуточного json.loads и циклов на python
+    try:
+        task_list = shift_task_create_list_adapter.validate_json(await request.body())
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+
+    response = await dao_obj.bulk_upsert_shift_tasks(session=session, shift_task_list=task_list)
+
+    if isinstance(response, list):
+        task_list_to_return = dto_obj.get_shift_task_dto_list(response)
+        return JSONBytesResponse(
+            content=dto_obj.dump_shift_task_list_json(task_list_to_return, by_alias=by_alias),
+            status_code=201,
+        )
+    else:
+        raise ShiftTaskException(
+            message=response.message,
+            status_code=response.code
         )
 
-        if isinstance(response, ShiftTask):
-            shift_task = dto_obj.get_shift_task_dto(response)
-            task_list_to_return.append(shift_task)
-        else:
-            raise ShiftTaskException(
-                message=response.message,
-                status_code=response.code
-            )
 
-    return task_list_to_return
+@router.post("/shift_task/stream", status_code=201)
+async def add_shift_task_stream(
+    request: Request,
+    session: AsyncSession = Depends(db_helper.session_dependency),
+):
+    async def write_chunk(task_list: list[dict]) -> dict | ErrorResponse:
+        response = await dao_obj.bulk_upsert_shift_tasks(session=session, shift_task_list=task_list)
+        if isinstance(response, list):
+            return {"written": len(response)}
+        return response
+
+    response = await stream_ingestion_service.ingest(
+        body=request.stream(),
+        parse_item=parse_shift_task,
+        write_chunk=write_chunk,
+        chunk_size=settings.shift_task_batch_size,
+    )
+
+    if isinstance(response, dict):
+        return response
+    else:
+        raise ShiftTaskException(
+            message=response.message,
+            status_code=response.code
+        )
 
 
-@router.get("/shift_task")
+@router.get("/shift_task", response_class=JSONBytesResponse)
 async def get_shift_task_by_several_params(
     offset: int = Query(default=0, ge=0),
-    limit: int = Query(default=10, le=100),
-    closing_status: bool = Query(None),
-    party_number: int = Query(None),
-    party_data: datetime.date = Query(None),
-    shift: str = Query(None, min_length=1, max_length=100),
-    team: str = Query(None, min_length=1, max_length=100),
-    nomenclature: str = Query(None, min_length=1, max_length=100),
-    code_ekn: str = Query(None, min_length=1, max_length=100),
-    id_of_the_rc: str = Query(None, min_length=1, max_length=100),
-    date_time_shift_start: datetime.datetime = Query(None),
-    date_time_shift_end: datetime.datetime = Query(None),
-    session: AsyncSession = Depends(db_helper.session_dependency),
+    limit: int = Query(default=10, ge=1, le=100),
+    after_id: int = Query(None, ge=0),
+    by_alias: bool = Query(default=True),
+    several_params: dict = Depends(shift_task_filter_params),
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
 ):
-    several_params = {}
-    #  тоже немного хардкодинга
-    if closing_status is not None:
-        several_params["closing_status"] = closing_status
-    if party_number is not None:
-        several_params["party_number"] = party_number
-    if party_data is not None:
-        several_params["party_data"] = party_data
-    if shift is not None:
-        several_params["shift"] = shift
-    if team is not None:
-        several_params["team"] = team
-    if nomenclature is not None:
-        several_params["nomenclature"] = nomenclature
-    if code_ekn is not None:
-        several_params["code_ekn"] = code_ekn
-    if id_of_the_rc is not None:
-        several_params["id_of_the_rc"] = id_of_the_rc
-    if date_time_shift_start is not None:
-        several_params["date_time_shift_start"] = date_time_shift_start
-    if date_time_shift_end is not None:
-        several_params["date_time_shift_end"] = date_time_shift_end
-
     response = await dao_obj.find_by_several_params(
         session=session,
-        several_params=several_params
+        several_params=several_params,
+        offset=offset,
+        limit=limit,
+        after_id=after_id,
     )
 
     if isinstance(response, list):
-        task_list_to_return = []
-        for task in response:
-            shift_task = dto_obj.get_shift_task_dto(task)
-            task_list_to_return.append(shift_task)
-
-        start = offset
-        end = offset + limit
-        return task_list_to_return[start:end]
+        task_list_to_return = dto_obj.get_shift_task_dto_list(response)
+
+        #  курсор для запроса следующей страницы через after_id
+        headers = {}
+        if len(response) == limit:
+            headers["X-Next-After-Id"] = str(response[-1].id)
+
+        return JSONBytesResponse(
+            content=dto_obj.dump_shift_task_list_json(task_list_to_return, by_alias=by_alias),
+            headers=headers,
+        )
     else:
         raise ShiftTaskException(
             message=response.message,
@@ -0,0 +1,186 @@
+from typing import Annotated
+from fastapi import APIRouter, Body, Depends, Path, Query, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+import time
+from dao import DaoUniqueProductIdentifiersRepository
+from dto import AggregationResultDTO, ErrorResponse, UniqueProductInsertResultDTO
+from dto import VerificationResultDTO
+from dto import unique_product_create_adapter, unique_product_create_list_adapter
+from exception import ShiftTaskException
+from model import db_helper, settings
+from model import UniqueProductIdentifiers
+from service import StreamIngestionService, UniqueProductIdentifierDtoService, aggregation_batcher
+
+
+router = APIRouter(tags=["unique_product_identifiers"])
+dao_obj = DaoUniqueProductIdentifiersRepository()
+dto_obj = UniqueProductIdentifierDtoService()
+stream_ingestion_service = StreamIngestionService()
+
+
+def parse_unique_product(product: dict) -> dict:
+    """
+    Функция проверяет уникальный код продукции из формата корпоративной системы заказчика
+    и преобразует его в словарь полей
+    :param product: словарь с полями на русском языке
+    :return: dict
+    """
+    return unique_product_create_adapter.validate_python(product)
+
+
+@router.post(
+    "/unique_product_identifiers",
+    status_code=201,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": unique_product_create_adapter.json_schema(by_alias=True)},
+                },
+            },
+        },
+    },
+)
+async def add_unique_product_identifiers(
+    request: Request,
+    session: AsyncSession = Depends(db_helper.session_dependency),
+):
+    started_at = time.perf_counter()
+
+    try:
+        product_list = unique_product_create_list_adapter.validate_json(await request.body())
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+
+    response = await dao_obj.bulk_insert_unique_product_identifiers(session=session, product_list=product_list)
+
+    if isinstance(response, dict):
+        elapsed = time.perf_counter() - started_at
+        return UniqueProductInsertResultDTO(
+            inserted=response["inserted"],
+            ignored=response["ignored"],
+            codes_per_second=round(len(product_list) / elapsed, 2) if elapsed > 0 else 0.0,
+        )
+    else:
+        raise ShiftTaskException(
+            message=response.message,
+            status_code=response.code
+        )
+
+
+@router.post("/unique_product_identifiers/stream", status_code=201)
+async def add_unique_product_identifiers_stream(
+    request: Request,
+    session: AsyncSession = Depends(db_helper.session_dependency),
+):
+    started_at = time.perf_counter()
+
+    async def write_chunk(products: list[dict]) -> dict | ErrorResponse:
+        return await dao_obj.bulk_insert_unique_product_identifiers(session=session, product_list=products)
+
+    response = await stream_ingestion_service.ingest(
+        body=request.stream(),
+        parse_item=parse_unique_product,
+        write_chunk=write_chunk,
+        chunk_size=settings.unique_product_batch_size,
+    )
+
+    if isinstance(response, dict):
+        elapsed = time.perf_counter() - started_at
+        return UniqueProductInsertResultDTO(
+            inserted=response.get("inserted", 0),
+            ignored=response.get("ignored", 0),
+            codes_per_second=round(response["received"] / elapsed, 2) if elapsed > 0 else 0.0,
+        )
+    else:
+        raise ShiftTaskException(
+            message=response.message,
+            status_code=response.code
+        )
+
+
+@router.post("/shift_task/{shift_task_id}/aggregate")
+async def aggregate_unique_product_code(
+    shift_task_id: Annotated[int, Path()],
+    unique_product_code: Annotated[str, Body(embed=True, min_length=1, max_length=100)],
+):
+    #  при групповой записи соединение берет только фоновая задача, запрос соединение из пула не держит
+    if settings.aggregation_batching_enabled:
+        response = await aggregation_batcher.aggregate(
+            shift_task_id=shift_task_id,
+            unique_product_code=unique_product_code,
+        )
+    else:
+        async with db_helper.session_factory() as session:
+            response = await dao_obj.aggregate_unique_product_code(
+                session=session,
+                shift_task_id=shift_task_id,
+                unique_product_code=unique_product_code,
+            )
+    if isinstance(response, UniqueProductIdentifiers):
+        product = dto_obj.get_unique_product_identifier_dto(response)
+        return product
+    else:
+        raise ShiftTaskException(
+            message=response.message,
+            status_code=response.code
+        )
+
+
+@router.post("/shift_task/{shift_task_id}/aggregate_batch")
+async def aggregate_unique_product_codes(
+    shift_task_id: Annotated[int, Path()],
+    unique_product_codes: Annotated[list[str], Body(embed=True, min_length=1, max_length=1000)],
+    session: AsyncSession = Depends(db_helper.session_dependency),
+):
+    response = await dao_obj.aggregate_unique_product_codes(
+        session=session,
+        shift_task_id=shift_task_id,
+        unique_product_codes=unique_product_codes,
+    )
+    if isinstance(response, list):
+        results_to_return = []
+        for code, result in zip(unique_product_codes, response):
+            if isinstance(result, UniqueProductIdentifiers):
+                results_to_return.append(AggregationResultDTO(
+                    unique_product_code=code,
+                    code=200,
+                    product=dto_obj.get_unique_product_identifier_dto(result),
+                ))
+            else:
+                results_to_return.append(AggregationResultDTO(
+                    unique_product_code=code,
+                    code=result.code,
+                    message=result.message,
+                ))
+        return results_to_return
+    else:
+        raise ShiftTaskException(
+            message=response.message,
+            status_code=response.code
+        )
+
+
+@router.get("/shift_task/{shift_task_id}/verify")
+async def verify_unique_product_code(
+    shift_task_id: Annotated[int, Path()],
+    unique_product_code: Annotated[str, Query(min_length=1, max_length=100)],
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
+):
+    response = await dao_obj.find_verification_entry(session=session, unique_product_code=unique_product_code)
+    if isinstance(response, tuple):
+        owner_shift_task_id, is_aggregated = response
+        return VerificationResultDTO(
+            unique_product_code=unique_product_code,
+            shift_task_id=shift_task_id,
+            belongs=owner_shift_task_id == shift_task_id,
+            is_aggregated=is_aggregated,
+        )
+    else:
+        raise ShiftTaskException(
+            message=response.message,
+            status_code=response.code
+        )